@@ -1,162 +1,3 @@
-import os
-from dotenv import load_dotenv
-from fasthtml.common import *
-from starlette.staticfiles import StaticFiles
-from starlette.websockets import WebSocket
-
-# Fresh minimal app using FastHTML built-in websocket extension and inline UI
-
-load_dotenv()
-
-import sys
-from pathlib import Path
-_ROOT = Path(__file__).resolve().parent
-if str(_ROOT) not in sys.path:
-    sys.path.insert(0, str(_ROOT))
-
-try:
-    from google import genai as genai_sdk
-    from google.genai import types as genai_types
-except Exception:
-    genai_sdk = None
-    genai_types = None
-
-app, rt = fast_app(exts='ws')
-
-# Serve static for saved recordings only; UI is inline
-_STATIC = os.path.join(_ROOT, "static")
-os.makedirs(os.path.join(_STATIC, "recordings"), exist_ok=True)
-try:
-    app.mount("/static", StaticFiles(directory=_STATIC), name="static")
-except Exception:
-    pass
-
-
-# --- Minimal provider: Gemini consumer API (optional) ---
-class GeminiClient:
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash") -> None:
-        self._client = genai_sdk.Client(api_key=api_key) if genai_sdk else None
-        self._model = model_name
-
-    def transcribe(self, raw: bytes, mime_type: str) -> str:
-        if not self._client:
-            return ""
-        try:
-            parts = [
-                "Transcribe the spoken audio to plain text. Return only the transcript.",
-                genai_types.Part.from_bytes(raw, mime_type=mime_type) if genai_types else {"mime_type": mime_type, "data": raw},
-            ]
-            resp = self._client.models.generate_content(model=self._model, contents=parts)
-            # Try new SDK candidates path first
-            try:
-                cands = getattr(resp, "candidates", None) or []
-                if cands and getattr(cands[0], "content", None) and getattr(cands[0].content, "parts", None):
-                    texts = [getattr(p, "text", "") for p in cands[0].content.parts]
-                    text = " ".join([t.strip() for t in texts if isinstance(t, str) and t.strip()]).strip()
-                    if text:
-                        return text
-            except Exception:
-                pass
-            # Legacy .text
-            txt = getattr(resp, "text", None)
-            if isinstance(txt, str) and txt.strip():
-                return txt.strip()
-            return ""
-        except Exception as e:
-            print(f"Gemini transcribe error: {e}")
-            return ""
-
-
-GEMINI: GeminiClient | None
-try:
-    key = (os.environ.get("GEMINI_API_KEY") or "").strip()
-    GEMINI = GeminiClient(key) if key and genai_sdk else None
-    if GEMINI:
-        print("Gemini client ready (consumer API)")
-    else:
-        print("Gemini client not configured; transcripts will be empty")
-except Exception as e:
-    print(f"Gemini init failed: {e}")
-    GEMINI = None
-
-
-@rt("/")
-def index():
-    # Delegate to modular routes; avoids second app/UI definition
-    from server.routes import build_index as _build
-    return _build()
-
-
-@app.ws("/ws")
-async def ws_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    import base64, asyncio
-    from pathlib import Path
-    session_ts = str(int(__import__('time').time()*1000))
-    seg_dir = Path(_STATIC) / "recordings" / f"session_{session_ts}"
-    seg_dir.mkdir(parents=True, exist_ok=True)
-
-    try:
-        while True:
-            msg = await websocket.receive_json()
-            mtype = msg.get("type") if isinstance(msg, dict) else None
-            if mtype == "hello":
-                await websocket.send_json({"type": "ready"})
-                continue
-            if mtype == "segment":
-                try:
-                    raw = base64.b64decode((msg.get("audio") or "").encode("utf-8"))
-                except Exception:
-                    raw = b""
-                idx = int(msg.get("idx") or 0)
-                mime = (msg.get("mime") or "audio/webm").lower()
-                ext = "ogg" if "ogg" in mime else "webm"
-                p = seg_dir / f"segment_{idx}.{ext}"
-                try:
-                    with open(p, "wb") as f:
-                        f.write(raw)
-                except Exception:
-                    pass
-                # send ack to render row
-                start_ms = int(msg.get("start") or 0)
-                end_ms = int(msg.get("end") or 0)
-                rng = f"{_fmt_ms(start_ms)} – {_fmt_ms(end_ms)}" if start_ms and end_ms else ""
-                await websocket.send_json({"type": "segment_saved", "idx": idx, "url": f"/static/recordings/session_{session_ts}/segment_{idx}.{ext}", "range": rng})
-                # transcribe inline, sequentially
-                text = ""
-                if GEMINI and (msg.get("auto") is None or bool(msg.get("auto", True))):
-                    try:
-                        # try preferred container first, then fallback
-                        order = ["audio/ogg", "audio/webm"] if ext == "ogg" else ["audio/webm", "audio/ogg"]
-                        for mt in order:
-                            text = GEMINI.transcribe(raw, mt)
-                            if text:
-                                break
-                    except Exception as e:
-                        text = ""
-                        print(f"transcribe error idx={idx}: {e}")
-                await websocket.send_json({"type": "transcript", "idx": idx, "text": text, "svc": "gemini"})
-                continue
-    except Exception:
-        try:
-            await websocket.close()
-        except Exception:
-            pass
-
-
-def _fmt_ms(ms: int) -> str:
-    try:
-        if not ms:
-            return "0:00"
-        s = int(round(ms/1000))
-        return f"{s//60}:{(s%60):02d}"
-    except Exception:
-        return ""
-
-
-# Disabled minimal inline server; main app below will serve
-# serve()
-
 import os
 from dotenv import load_dotenv
 from fasthtml.common import *
@@ -188,6 +29,9 @@ from server.services.vertex_gemini import build_vertex_contents, extract_text_fr
 from server.services.vertex_langchain import is_available as lc_vertex_available, transcribe_segment_via_langchain
 from server.services.gemini_api import extract_text_from_gemini_response
 from server.sse_bus import stream as sse_stream
+from server import provider_clients
+from server import disk_writer
+from server.services.transcription import PRIORITY_LIVE, PRIORITY_INTERACTIVE, provider_slot, run_blocking, set_job_class, set_segment_deadline, remaining_s, scheduler as transcription_scheduler
 # inline helper for base64 decode (avoid import cycle)
 def _b64_to_bytes(data_url_or_b64: str) -> bytes:
     import base64
@@ -209,9 +53,7 @@ def _b64_to_bytes(data_url_or_b64: str) -> bytes:
 from typing import Any, List, Dict
 from starlette.responses import JSONResponse, HTMLResponse
 import json
-import os, base64, time
-import tempfile
-import subprocess
+import os, base64, time, asyncio
 from typing import Optional
 
 # --- Credentials Handling (START) ---
@@ -247,12 +89,11 @@ print(f"Current working directory: {os.getcwd()}")
 print(f"Absolute path to static directory: {_STATIC_DIR}")
 
 # Initialize shared clients/state for modular services (Google STT, Gemini API, Vertex)
+# in the background once the server is up, then keep their connections warm
 try:
-    app_state.init_google_speech()
-    app_state.init_gemini_api()
-    app_state.init_vertex()
+    app.router.on_startup.append(provider_clients.on_startup)
 except Exception as e:
-    print(f"Error initializing app_state: {e}")
+    print(f"Error registering provider warm-up: {e}")
 
 """
 app.py: Application bootstrap
@@ -269,6 +110,30 @@ def index() -> Any:
     """Render the index page via server/routes.build_index()."""
     return build_index()
 
+@rt("/healthz")
+def healthz() -> Any:
+    """Liveness: 200 as soon as the server is up; includes provider warm state."""
+    return JSONResponse({"ok": True, "ready": provider_clients.ready(), "providers": provider_clients.status()})
+
+@rt("/healthz/ready")
+def healthz_ready() -> Any:
+    """Readiness: 503 until provider init has finished; lists which providers are warm."""
+    providers = provider_clients.status()
+    warm = sorted(k for k, v in providers.items() if v.get("state") == "warm")
+    ready = provider_clients.ready()
+    return JSONResponse({"ready": ready, "warm": warm, "providers": providers}, status_code=200 if ready else 503)
+
+@rt("/scheduler_stats")
+def scheduler_stats() -> Any:
+    """Transcription scheduler: slots, queued/running calls and queue wait (ms) per priority class."""
+    return JSONResponse(transcription_scheduler.stats())
+
+@rt("/ws_stats")
+def ws_stats() -> Any:
+    """WebSocket outboxes (queue depth, coalesced/dropped events, send latency), queued segment audio in RAM vs spilled, and disk writer counters."""
+    from server import ws_outbox, segment_audio
+    return JSONResponse({**ws_outbox.stats(), "segment_audio": segment_audio.stats(), "disk_writer": disk_writer.stats()})
+
 @rt("/services")
 def list_services() -> Any:
     """Return JSON array of service descriptors for dynamic frontend columns."""
@@ -315,7 +180,8 @@ def update_services_bulk(req: Any) -> Any:
 def settings_bulk(
     aws: str = '', google: str = '', vertex: str = '', gemini: str = '',
     full_summary_prompt: str = '', translation_prompt: str = '', translation_lang: str = '',
-    gemini_api_key: str = '', enable_summarization: str = '', enable_translation: str = ''
+    gemini_api_key: str = '', enable_summarization: str = '', enable_translation: str = '',
+    enable_gemini_streaming: str = ''
 ) -> Any:
     try:
         # Providers
@@ -357,6 +223,10 @@ def settings_bulk(
             app_state.enable_translation = bool(enable_translation)
         except Exception:
             pass
+        try:
+            app_state.enable_gemini_streaming = bool(enable_gemini_streaming)
+        except Exception:
+            pass
         return HTMLResponse("<small style=\"color:#6f6\">Settings saved.</small>")
     except Exception:
         return HTMLResponse("<small style=\"color:#f66\">Save failed.</small>")
@@ -480,7 +350,7 @@ def render_segment_row_route(record: str = '', idx: int = 0) -> Any:
         return HTMLResponse("<tr></tr>")
 
 @rt("/render/full_row", methods=["GET","POST"])
-def render_full_row_route(record: str = '') -> Any:
+async def render_full_row_route(record: str = '') -> Any:
     try:
         rec = record if isinstance(record, dict) else (json.loads(record) if isinstance(record, str) and record else {})
     except Exception:
@@ -490,32 +360,8 @@ def render_full_row_route(record: str = '') -> Any:
         # Match initial provider table structure: service columns + Translation
         header = Tr(*[Th(s["label"]) for s in services], Th("Translation"))
         # Compute summaries using Gemini when enabled and only after Stop
-        from server.services.gemini_api import extract_text_from_gemini_response as _extract
-        summaries = {}
-        if bool(getattr(app_state, 'enable_summarization', True)) and getattr(app_state, 'gemini_model', None) is not None and bool(rec.get('stopTs')):
-            for s in services:
-                key = s["key"]
-                full_text = ((rec.get("fullAppend", {}) or {}).get(key, ""))
-                # Fallback to joined per-segment transcripts if fullAppend is empty
-                if not full_text:
-                    try:
-                        arr = ((rec.get("transcripts", {}) or {}).get(key, []) or [])
-                        if isinstance(arr, list):
-                            full_text = " ".join([str(x) for x in arr if x])
-                    except Exception:
-                        full_text = ""
-                if not full_text:
-                    summaries[key] = ""
-                    continue
-                try:
-                    prompt = (app_state.full_summary_prompt or "Summarize the transcription.")
-                    resp = app_state.gemini_model.generate_content([
-                        {"text": prompt},
-                        {"text": full_text}
-                    ])
-                    summaries[key] = _extract(resp) or ""
-                except Exception:
-                    summaries[key] = full_text
+        from server.services.summarizer import summarize_record
+        summaries = await summarize_record(rec, [s["key"] for s in services])
         try:
             print("[render_full_row_route] summaries keys:", list(summaries.keys()))
             for k, v in summaries.items():
@@ -523,34 +369,19 @@ def render_full_row_route(record: str = '') -> Any:
         except Exception:
             pass
         # First column: leave out download in this simplified table (kept in panel meta)
+        # Full text comes from the server's materialized transcript; posted fullAppend is only a fallback
+        from server.services.summarizer import full_text_for
         cells = []
         for s in services:
             key = s["key"]
             show_summary = bool(getattr(app_state, 'enable_summarization', True)) and bool(rec.get('stopTs'))
-            if show_summary:
-                val = summaries.get(key)
-                if val is None:
-                    val = ((rec.get("fullAppend", {}) or {}).get(key, ""))
-                    if not val:
-                        try:
-                            arr = ((rec.get("transcripts", {}) or {}).get(key, []) or [])
-                            if isinstance(arr, list):
-                                val = " ".join([str(x) for x in arr if x])
-                        except Exception:
-                            val = ""
-            else:
-                val = ((rec.get("fullAppend", {}) or {}).get(key, ""))
-                if not val:
-                    try:
-                        arr = ((rec.get("transcripts", {}) or {}).get(key, []) or [])
-                        if isinstance(arr, list):
-                            val = " ".join([str(x) for x in arr if x])
-                    except Exception:
-                        val = ""
+            val = summaries.get(key) if show_summary else None
+            if val is None:
+                val = full_text_for(rec, key)
             cells.append(Td(val, data_svc=key, cls='marked'))
         # Append Translation cell to keep columns aligned with initial render
         try:
-            tr_val = ((rec.get("fullAppend", {}) or {}).get("translation", ""))
+            tr_val = full_text_for(rec, "translation")
             cells.append(Td(tr_val, data_svc="translation"))
         except Exception:
             cells.append(Td("", data_svc="translation"))
@@ -565,7 +396,7 @@ def render_full_row_route(record: str = '') -> Any:
         return HTMLResponse("<table></table>")
 
 @rt("/render/full_row_json", methods=["POST"])
-def render_full_row_json(record: str = '') -> Any:
+async def render_full_row_json(record: str = '') -> Any:
     try:
         rec = record if isinstance(record, dict) else (json.loads(record) if isinstance(record, str) and record else {})
     except Exception:
@@ -574,31 +405,8 @@ def render_full_row_json(record: str = '') -> Any:
         services = [s for s in registry_list() if s.get("enabled")]
         labels = [s.get("label") or s.get("key") for s in services]
         keys = [s.get("key") for s in services]
-        from server.services.gemini_api import extract_text_from_gemini_response as _extract
-        summaries = {}
-        if bool(getattr(app_state, 'enable_summarization', True)) and getattr(app_state, 'gemini_model', None) is not None and bool(rec.get('stopTs')):
-            for s in services:
-                key = s["key"]
-                full_text = ((rec.get("fullAppend", {}) or {}).get(key, ""))
-                if not full_text:
-                    try:
-                        arr = ((rec.get("transcripts", {}) or {}).get(key, []) or [])
-                        if isinstance(arr, list):
-                            full_text = " ".join([str(x) for x in arr if x])
-                    except Exception:
-                        full_text = ""
-                if not full_text:
-                    summaries[key] = ""
-                    continue
-                try:
-                    prompt = (app_state.full_summary_prompt or "Summarize the transcription.")
-                    resp = app_state.gemini_model.generate_content([
-                        {"text": prompt},
-                        {"text": full_text}
-                    ])
-                    summaries[key] = _extract(resp) or ""
-                except Exception:
-                    summaries[key] = full_text
+        from server.services.summarizer import summarize_record
+        summaries = await summarize_record(rec, keys)
         # Pick a single provider summary string to simplify client rendering
         summary_text = ""
         try:
@@ -611,13 +419,14 @@ def render_full_row_json(record: str = '') -> Any:
                 if val:
                     summary_text = val
                     break
-            # Fallback to any non-empty fullAppend if no summary produced
+            # Fallback to any non-empty full transcript if no summary produced
             if not summary_text:
+                from server.services.summarizer import full_text_for
                 for s in services:
                     k = s.get("key")
                     if not k:
                         continue
-                    val = (((rec.get("fullAppend", {}) or {}).get(k, "")) or "").strip()
+                    val = (full_text_for(rec, k) or "").strip()
                     if val:
                         summary_text = val
                         break
@@ -634,6 +443,26 @@ def render_full_row_json(record: str = '') -> Any:
     except Exception as e:
         return JSONResponse({"ok": False, "error": f"server_error: {e}"})
 
+@rt("/render/summary_stream", methods=["POST"])
+async def render_summary_stream(record: str = '') -> Any:
+    """Stream the summary as Server-Sent Events: `delta` (Markdown text to append), then `done`."""
+    from starlette.responses import StreamingResponse
+    try:
+        rec = record if isinstance(record, dict) else (json.loads(record) if isinstance(record, str) and record else {})
+    except Exception:
+        rec = {}
+    keys = [s.get("key") for s in registry_list() if s.get("enabled")]
+
+    async def gen():
+        from server.services.summarizer import stream_summary
+        try:
+            async for ev in stream_summary(rec, keys):
+                yield f"event: {ev['type']}\ndata: {json.dumps(ev)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+
+    return StreamingResponse(gen(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @rt("/events")
 async def sse_events() -> Any:
     from starlette.responses import StreamingResponse
@@ -649,8 +478,9 @@ async def test_transcribe(audio_b64: str = "", mime: str = "", services: str = "
             print("HTTP /test_transcribe: no_audio")
             return JSONResponse({"ok": False, "error": "no_audio"})
         # Delegate to centralized transcription helper and optionally filter results
-        from server.services.transcription import transcribe_all
-        full = await transcribe_all(raw, mime)
+        from server.services.long_audio import transcribe_auto
+        set_job_class(PRIORITY_INTERACTIVE, "test_transcribe")
+        full = await transcribe_auto(raw, mime)
         requested = set([s.strip() for s in (services or "").split(",") if s.strip()])
         if requested:
             filtered = { k: v for k, v in full.items() if k.split('_')[0] in requested }
@@ -665,14 +495,43 @@ async def test_transcribe(audio_b64: str = "", mime: str = "", services: str = "
 
 @rt("/segment_upload", methods=["POST"])
 async def segment_upload(recording_id: str = '', audio_b64: str = '', mime: str = '', duration_ms: int = 10000, id: int = 0, idx: int = 0, ts: int = 0) -> Any:
+    rec_id = str(recording_id or '')
+    if not rec_id:
+        rec_id = str(int(time.time()*1000))
+    try:
+        seg_bytes = base64.b64decode((audio_b64 or '').encode('utf-8'))
+    except Exception:
+        seg_bytes = b''
+    # A retried upload of the same segment attaches to the running job (or gets its stored result)
+    from server import segment_store
+    key = segment_store.ingest_key(rec_id, int(idx or 0), seg_bytes)
+    fut, owner = segment_store.claim_ingest(key)
+    if not owner:
+        try:
+            payload = await asyncio.shield(fut)
+            return JSONResponse({**payload, "duplicate": True})
+        except segment_store.IngestAbandoned:
+            # The original job was cancelled; run this upload as a fresh job
+            fut, owner = segment_store.claim_ingest(key)
+            if not owner:
+                return JSONResponse({**(await asyncio.shield(fut)), "duplicate": True})
+    try:
+        payload = await _run_segment_upload(rec_id, seg_bytes, mime, duration_ms, id, idx, ts)
+    except BaseException:
+        segment_store.release_ingest(key)
+        raise
+    if not payload.get("ok"):
+        segment_store.release_ingest(key)
+        return JSONResponse(payload)
+    # Server-side full transcript per provider (read by /render/full_row and the summarizer)
+    segment_store.record_results(rec_id, int(idx or 0), payload.get("results") or {})
+    # Results with provider errors are handed to waiting retries but not kept: a later retry runs again
+    segment_store.complete_ingest(key, payload, keep=not payload.get("errors"))
+    return JSONResponse(payload)
+
+
+async def _run_segment_upload(rec_id: str, seg_bytes: bytes, mime: str, duration_ms: int, id: int, idx: int, ts: int) -> Dict[str, Any]:
     try:
-        rec_id = str(recording_id or '')
-        if not rec_id:
-            rec_id = str(int(time.time()*1000))
-        try:
-            seg_bytes = base64.b64decode((audio_b64 or '').encode('utf-8'))
-        except Exception:
-            seg_bytes = b''
         client_mime = (mime or '').lower()
         ext = 'ogg' if ('ogg' in client_mime) else 'webm'
         root = os.path.join(os.path.abspath('static'), 'recordings')
@@ -683,9 +542,13 @@ async def segment_upload(recording_id: str = '', audio_b64: str = '', mime: str
         os.makedirs(session_dir, exist_ok=True)
         seg_index = int(idx or 0)
         seg_path = os.path.join(session_dir, f'segment_{seg_index}.{ext}')
-        with open(seg_path, 'wb') as f:
-            f.write(seg_bytes)
+        # Written by the disk writer thread, off the event loop
+        await disk_writer.write_file(seg_path, seg_bytes)
         seg_url = f"/static/recordings/session_{safe_rec_id}/segment_{seg_index}.{ext}"
+        # Recording segments are live work: scheduled ahead of test and YouTube calls
+        set_job_class(PRIORITY_LIVE, f"rec_{safe_rec_id}")
+        # Work still running past the segment's deadline is cancelled (the client has shown a timeout)
+        set_segment_deadline(duration_ms)
         try:
             print(f"HTTP segment_upload: saved idx={seg_index} url={seg_url} size={len(seg_bytes)} mime={client_mime}")
         except Exception:
@@ -699,118 +562,145 @@ async def segment_upload(recording_id: str = '', audio_b64: str = '', mime: str
             "mime": client_mime,
             "size": len(seg_bytes)
         }
-        # Dispatch providers sequentially (simple) and collect results
+        # Streaming Gemini output is forwarded as segment_transcript_gemini_partial; the response's result replaces it
+        async def publish_partial(key: str, text: str) -> None:
+            from server.sse_bus import publish as sse_publish
+            await sse_publish({"type": f"segment_transcript_{key}_partial", "idx": seg_index, "id": id, "ts": saved["ts"], "recording_id": rec_id, "transcript": text})
+        # Long segments (180–300 s settings) go through the chunked parallel pipeline
+        from server.services.long_audio import is_long, transcribe_long_file
+        if is_long(duration_ms):
+            from server.services.transcription import enabled_providers
+            providers = enabled_providers()
+            if 'aws' in providers:
+                # AWS batch runs on the whole segment in the background; its result arrives as segment_transcript_aws
+                from server.services import aws_transcribe
+                from server.session_tasks import spawn_background
+                providers = [k for k in providers if k != 'aws']
+                spawn_background(aws_transcribe.transcribe_batch_event(
+                    seg_bytes, client_mime or ext,
+                    {"idx": seg_index, "id": id, "ts": saved["ts"], "recording_id": rec_id},
+                ))
+            long_res = await transcribe_long_file(seg_path, client_mime, providers=providers, on_partial=publish_partial)
+            long_res.pop('chunks', None)
+            results = {k: v for k, v in long_res.items() if not k.endswith('_error')}
+            errors = {k[:-len('_error')]: v for k, v in long_res.items() if k.endswith('_error')}
+            try:
+                from server.services.summarizer import observe_segment
+                observe_segment(rec_id, seg_index, results)
+            except Exception:
+                pass
+            return {"ok": True, "saved": saved, "results": results, "errors": errors}
+        # Dispatch providers concurrently (each under its own scheduler slot) and collect results;
+        # they share the segment deadline, so one provider never spends another's budget
         results = {}
         errors = {}
-        try:
-            if service_enabled('google') and app_state.speech_client is not None:
-                try:
-                    txt = await recognize_google_segment(app_state.speech_client, seg_bytes, ext)
-                except Exception:
-                    import traceback; errors['google'] = traceback.format_exc(); txt = ''
-                results['google'] = txt
-                try: print(f"HTTP segment_upload: google idx={seg_index} len={len(txt or '')}")
-                except Exception: pass
-        except Exception:
-            pass
-        try:
-            if service_enabled('vertex') and app_state.vertex_client is not None:
-                txt = ''
-                try:
+
+        async def run_google() -> None:
+            try:
+                async with provider_slot():
+                    txt = await recognize_google_segment(app_state.speech_client, seg_bytes, ext, timeout=remaining_s())
+            except Exception:
+                import traceback; errors['google'] = traceback.format_exc(); txt = ''
+            results['google'] = txt
+            try: print(f"HTTP segment_upload: google idx={seg_index} len={len(txt or '')}")
+            except Exception: pass
+
+        async def run_vertex() -> None:
+            txt = ''
+            try:
+                def call_vertex() -> str:
                     order = ['audio/ogg','audio/webm'] if ext == 'ogg' else ['audio/webm','audio/ogg']
                     if lc_vertex_available():
+                        out = ''
                         for mt in order:
-                            txt = transcribe_segment_via_langchain(app_state.vertex_client, app_state.vertex_model_name, seg_bytes, mt)
-                            if txt:
+                            out = transcribe_segment_via_langchain(app_state.vertex_client, app_state.vertex_model_name, seg_bytes, mt)
+                            if out:
                                 break
-                    else:
-                        resp = None
-                        last_exc = None
-                        for mt in order:
-                            try:
-                                resp = app_state.vertex_client.models.generate_content(
-                                    model=app_state.vertex_model_name,
-                                    contents=build_vertex_contents(seg_bytes, mt)
-                                )
-                                break
-                            except Exception as ie:
-                                last_exc = ie
-                                continue
-                        if resp is None and last_exc:
-                            raise last_exc
-                        txt = extract_text_from_vertex_response(resp)
-                except Exception:
-                    import traceback; errors['vertex'] = traceback.format_exc(); txt = ''
-                results['vertex'] = txt
-                try: print(f"HTTP segment_upload: vertex idx={seg_index} len={len(txt or '')}")
-                except Exception: pass
-        except Exception:
-            pass
-        try:
-            if service_enabled('gemini') and getattr(app_state, 'gemini_model', None) is not None:
-                txt = ''
-                try:
-                    order = ['audio/ogg','audio/webm'] if ext == 'ogg' else ['audio/webm','audio/ogg']
+                        return out
                     resp = None
                     last_exc = None
                     for mt in order:
                         try:
-                            resp = app_state.gemini_model.generate_content([
-                                {"text": "Transcribe the spoken audio to plain text. Return only the transcript."},
-                                {"mime_type": mt, "data": seg_bytes}
-                            ])
+                            resp = app_state.vertex_client.models.generate_content(
+                                model=app_state.vertex_model_name,
+                                contents=build_vertex_contents(seg_bytes, mt)
+                            )
                             break
                         except Exception as ie:
                             last_exc = ie
                             continue
                     if resp is None and last_exc:
                         raise last_exc
-                    txt = extract_text_from_gemini_response(resp)
-                except Exception:
-                    import traceback; errors['gemini'] = traceback.format_exc(); txt = ''
-                results['gemini'] = txt
-                try: print(f"HTTP segment_upload: gemini idx={seg_index} len={len(txt or '')}")
-                except Exception: pass
+                    return extract_text_from_vertex_response(resp)
+                async with provider_slot():
+                    txt = await run_blocking(call_vertex)
+            except Exception:
+                import traceback; errors['vertex'] = traceback.format_exc(); txt = ''
+            results['vertex'] = txt
+            try: print(f"HTTP segment_upload: vertex idx={seg_index} len={len(txt or '')}")
+            except Exception: pass
+
+        async def run_gemini() -> None:
+            txt = ''
+            try:
+                from server.services.transcription import gemini_streaming_enabled, transcribe_gemini_stream, transcribe_gemini_raise
+                if gemini_streaming_enabled():
+                    txt = await transcribe_gemini_stream(seg_bytes, ext, lambda t: publish_partial('gemini', t))
+                else:
+                    async with provider_slot():
+                        txt = await run_blocking(transcribe_gemini_raise, seg_bytes, ext)
+            except Exception:
+                import traceback; errors['gemini'] = traceback.format_exc(); txt = ''
+            results['gemini'] = txt
+            try: print(f"HTTP segment_upload: gemini idx={seg_index} len={len(txt or '')}")
+            except Exception: pass
+
+        # AWS Transcribe streaming (stream reused across a recording's segments)
+        async def run_aws() -> None:
+            from server.services import aws_transcribe
+            txt = ''
+            try:
+                # The slot is taken inside the recording's stream lock, not while queued behind it
+                txt = await aws_transcribe.recognize_segment(seg_bytes, session_key=f"rec_{safe_rec_id}", slot=provider_slot)
+            except Exception:
+                import traceback; errors['aws'] = traceback.format_exc(); txt = ''
+            results['aws'] = txt
+            try: print(f"HTTP segment_upload: aws idx={seg_index} len={len(txt or '')}")
+            except Exception: pass
+
+        calls = []
+        try:
+            if service_enabled('google') and app_state.speech_client is not None:
+                calls.append(run_google())
+            if service_enabled('vertex') and app_state.vertex_client is not None:
+                calls.append(run_vertex())
+            if service_enabled('gemini') and getattr(app_state, 'gemini_model', None) is not None:
+                calls.append(run_gemini())
+            from server.services import aws_transcribe
+            if service_enabled('aws') and aws_transcribe.is_available():
+                calls.append(run_aws())
         except Exception:
             pass
-        # AWS placeholder
-        try:
-            if service_enabled('aws'):
-                from server.services import aws_transcribe
-                txt = ''
-                try:
-                    txt = aws_transcribe.recognize_segment_placeholder(seg_bytes, media_format=("ogg" if ext=="ogg" else "webm"))
-                except Exception:
-                    import traceback; errors['aws'] = traceback.format_exc(); txt = ''
-                results['aws'] = txt
-                try: print(f"HTTP segment_upload: aws idx={seg_index} len={len(txt or '')}")
-                except Exception: pass
+        await asyncio.gather(*calls)
+        # Translation runs off the request path (batched + cached); the result arrives as segment_transcript_translation
+        try:
+            from server.services.transcription import translation_enabled
+            if translation_enabled():
+                from server.services.translator import schedule_segment_translation
+                base_txt = results.get('google') or results.get('vertex') or results.get('gemini') or ''
+                schedule_segment_translation(base_txt, {"idx": seg_index, "id": id, "ts": saved["ts"], "recording_id": rec_id})
         except Exception:
             pass
-        # Gemini translation per-segment using saved translation prompt/lang (only when enabled)
+        # Feed the rolling summary so Stop only has to merge the last delta
         try:
-            if getattr(app_state, 'enable_translation', False) and getattr(app_state, 'gemini_model', None) is not None:
-                tr_txt = ''
-                try:
-                    # Choose a base transcript to translate
-                    base_txt = results.get('google') or results.get('vertex') or results.get('gemini') or ''
-                    if base_txt:
-                        prompt = (app_state.translation_prompt or 'Translate the following text into the TARGET language.')
-                        lang = (app_state.translation_lang or 'en')
-                        resp = app_state.gemini_model.generate_content([
-                            {"text": f"{prompt}\nTARGET: {lang}"},
-                            {"text": base_txt}
-                        ])
-                        tr_txt = extract_text_from_gemini_response(resp)
-                except Exception:
-                    import traceback; errors['translation'] = traceback.format_exc(); tr_txt = ''
-                results['translation'] = tr_txt
+            from server.services.summarizer import observe_segment
+            observe_segment(rec_id, seg_index, results)
         except Exception:
             pass
-        return JSONResponse({"ok": True, "saved": saved, "results": results, "errors": errors})
+        return {"ok": True, "saved": saved, "results": results, "errors": errors}
     except Exception:
         import traceback
-        return JSONResponse({"ok": False, "saved": None, "results": {}, "errors": {"fatal": traceback.format_exc()}})
+        return {"ok": False, "saved": None, "results": {}, "errors": {"fatal": traceback.format_exc()}}
 
 
 @rt("/export_full", methods=["POST"])
@@ -883,126 +773,42 @@ def export_status_route(job_id: str = '') -> Any:
 
 @rt("/transcribe_youtube", methods=["POST"])
 async def transcribe_youtube(url: str = "") -> Any:
+    """Enqueue a YouTube transcription job; progress and results stream over `/events`.
+
+    A URL already transcribed under the current settings is answered from the
+    cache with { ok, cached, record } and no job is started.
+    """
     try:
         url = (url or "").strip()
         if not url:
             return JSONResponse({"ok": False, "error": "missing_url"})
+        from server import youtube_jobs
         try:
-            import yt_dlp as ydl
+            record = youtube_jobs.cached_record(url)
         except Exception:
-            return JSONResponse({"ok": False, "error": "yt_dlp_not_installed"})
-
-        tmpdir = tempfile.mkdtemp(prefix="yt_")
-        in_path: Optional[str] = None
-        info = None
-        try:
-            opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(tmpdir, 'input.%(ext)s'),
-                'quiet': True,
-                'no_warnings': True,
-            }
-            with ydl.YoutubeDL(opts) as dl:
-                info = dl.extract_info(url, download=True)
-                in_path = dl.prepare_filename(info)
-        except Exception as e:
-            return JSONResponse({"ok": False, "error": f"download_failed: {e}"})
-
-        if not in_path or not os.path.isfile(in_path):
-            return JSONResponse({"ok": False, "error": "download_missing"})
-
-        # Convert to OGG (Opus) for maximum compatibility with providers
-        root = os.path.join(os.path.abspath('static'), 'recordings')
-        os.makedirs(root, exist_ok=True)
-        ts = int(time.time()*1000)
-        safe_id = f"yt_{ts}"
-        out_path = os.path.join(root, f"{safe_id}.ogg")
-        try:
-            # ffmpeg -y -i input -vn -c:a libopus -b:a 96k out.ogg
-            r = subprocess.run(
-                ['ffmpeg','-y','-i', in_path, '-vn', '-c:a', 'libopus', '-b:a', '96k', out_path],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600
-            )
-            if r.returncode != 0 or (not os.path.isfile(out_path)):
-                return JSONResponse({"ok": False, "error": "ffmpeg_failed"})
-        except Exception as e:
-            return JSONResponse({"ok": False, "error": f"ffmpeg_error: {e}"})
-
-        # Read bytes for transcription
+            record = None
+        if record is not None:
+            return JSONResponse({"ok": True, "cached": True, "record": record})
         try:
-            with open(out_path, 'rb') as f:
-                ogg_bytes = f.read()
-        except Exception as e:
-            return JSONResponse({"ok": False, "error": f"read_failed: {e}"})
-
-        # Estimate duration from yt-dlp info when available
-        duration_ms = 0
-        try:
-            dur = int(float(info.get('duration') or 0))
-            duration_ms = dur * 1000
+            import yt_dlp as ydl
         except Exception:
-            duration_ms = 0
-
-        # Transcribe via common helper
+            return JSONResponse({"ok": False, "error": "yt_dlp_not_installed"})
         try:
-            from server.services.transcription import transcribe_all
-            results = await transcribe_all(ogg_bytes, 'audio/ogg')
-        except Exception:
-            results = {}
+            job_id = await youtube_jobs.submit(url)
+        except youtube_jobs.QueueFull:
+            return JSONResponse({"ok": False, "error": "queue_full"})
+        return JSONResponse({"ok": True, "job_id": job_id})
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": f"server_error: {e}"})
 
-        size_bytes = 0
-        try:
-            size_bytes = os.path.getsize(out_path)
-        except Exception:
-            size_bytes = 0
-
-        server_url = f"/static/recordings/{safe_id}.ogg"
-        start_ts = ts
-        stop_ts = ts + (duration_ms or 0)
-        # Assemble a record compatible with frontend renderers
-        transcripts = { 'google': [], 'vertex': [], 'gemini': [], 'aws': [] }
-        for k in list(transcripts.keys()):
-            val = results.get(k)
-            if val is not None:
-                transcripts[k] = [str(val)]
-        if 'translation' in results:
-            try:
-                transcripts['translation'] = [str(results.get('translation') or '')]
-            except Exception:
-                pass
-        full_append = {}
-        for k, v in results.items():
-            if k.endswith('_error'):
-                continue
-            try:
-                full_append[k] = str(v) if v is not None else ''
-            except Exception:
-                full_append[k] = ''
-        record = {
-            'id': f'rec-{start_ts}',
-            'audioUrl': None,
-            'serverUrl': server_url,
-            'serverSizeBytes': size_bytes,
-            'clientSizeBytes': None,
-            'startTs': start_ts,
-            'stopTs': stop_ts,
-            'durationMs': duration_ms,
-            'segments': [
-                {
-                    'idx': 0,
-                    'url': server_url,
-                    'mime': 'audio/ogg',
-                    'size': size_bytes,
-                    'ts': start_ts,
-                    'startMs': start_ts,
-                    'endMs': stop_ts
-                }
-            ],
-            'transcripts': transcripts,
-            'fullAppend': full_append,
-            'timeouts': { 'google': [False], 'vertex': [False], 'gemini': [False], 'aws': [False] },
-        }
-        return JSONResponse({"ok": True, "record": record})
+@rt("/youtube_status", methods=["GET"])
+def youtube_status(job_id: str = '') -> Any:
+    try:
+        from server import youtube_jobs
+        job = youtube_jobs.get_job(job_id)
+        if not job:
+            return JSONResponse({"ok": False, "error": "job_not_found"})
+        return JSONResponse({"ok": True, **job})
     except Exception as e:
         return JSONResponse({"ok": False, "error": f"server_error: {e}"})
 
@@ -13,3 +13,108 @@ SEGMENT_MS_DEFAULT = 10000
 LANGUAGE_CODE = "en-US"
 
 
+# YouTube transcription jobs
+YT_JOB_WORKERS = 2
+YT_JOB_QUEUE_MAX = 8
+YT_STREAM_FIRST_CHUNK_MS = 10000
+YT_STREAM_IDLE_TIMEOUT_S = 120
+YT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # on-disk budget for cached YouTube audio/results
+YT_JOB_TTL_S = 3600  # finished job records (with their results) are kept this long for /youtube_status
+YT_JOB_KEEP_MAX = 200  # and at most this many finished jobs
+
+# Long-audio chunked transcription (Google STT sync recognize caps at ~60 s)
+LONG_AUDIO_THRESHOLD_MS = 60000
+LONG_AUDIO_CHUNK_MS = 45000
+LONG_AUDIO_OVERLAP_MS = 2000
+LONG_AUDIO_SILENCE_SNAP_MS = 6000
+LONG_AUDIO_SILENCE_DB = -35
+LONG_AUDIO_SILENCE_MIN_S = 0.4
+LONG_AUDIO_CONCURRENCY = 6
+LONG_AUDIO_STREAM_WINDOW = 8  # streamed chunks whose audio is loaded at once; the rest wait on disk
+
+# AWS Transcribe streaming (one stream reused per session)
+AWS_STREAM_SAMPLE_RATE = 16000
+AWS_STREAM_FRAME_MS = 100
+AWS_STREAM_PAD_MS = 1200  # trailing silence so the utterance finalizes at the segment boundary
+AWS_STREAM_SETTLE_S = 2.0
+AWS_STREAM_RESULT_TIMEOUT_S = 15.0
+AWS_STREAM_IDLE_CLOSE_S = 15.0
+
+# AWS Transcribe batch (S3 upload + StartTranscriptionJob, one shared poller)
+AWS_BATCH_PART_BYTES = 8 * 1024 * 1024
+AWS_BATCH_UPLOAD_CONCURRENCY = 4
+AWS_BATCH_POLL_MIN_S = 2.0
+AWS_BATCH_POLL_MAX_S = 20.0
+AWS_BATCH_POLL_BACKOFF = 1.5
+AWS_BATCH_JOB_TIMEOUT_S = 1800
+
+# Transcript summarization
+SUMMARY_ROLLING_MIN_CHARS = 1500  # fold into the running summary once this much new text is pending
+SUMMARY_ROLLING_TTL_S = 6 * 3600
+SUMMARY_SINGLE_PASS_TOKENS = 8000  # above this, summarize hierarchically
+SUMMARY_CHUNK_TOKENS = 4000
+SUMMARY_CONCURRENCY = 4
+SUMMARY_CACHE_MAX = 512
+SUMMARY_CALL_TIMEOUT_S = 60.0
+SUMMARY_REUSE_SIMILARITY = 0.9  # providers whose transcripts are this similar share one summary
+
+# Translation stage (micro-batched, cached)
+TRANSLATION_BATCH_WINDOW_MS = 300
+TRANSLATION_BATCH_MAX_ITEMS = 8
+TRANSLATION_BATCH_MAX_CHARS = 12000
+TRANSLATION_CACHE_MAX = 2048
+TRANSLATION_MAX_INFLIGHT = 4  # batches translated concurrently
+TRANSLATION_TIMEOUT_S = 30.0  # per Gemini request (batch or single fallback)
+
+# Provider connection warm-up / keepalive
+PROVIDER_WARMUP_TIMEOUT_S = 10.0
+PROVIDER_KEEPALIVE_S = 240.0  # re-touch pooled connections before the HTTP keepalive expiry
+PROVIDER_HTTP_KEEPALIVE_S = 300.0
+
+# Gemini streaming transcription (segment_transcript_gemini_partial events)
+GEMINI_PARTIAL_INTERVAL_MS = 400
+GEMINI_STREAM_TIMEOUT_S = 300.0
+
+# Transcription scheduler (provider calls in flight across all sessions)
+SCHED_MAX_CONCURRENCY = 12
+SCHED_LIVE_RESERVED = 4  # slots batch (YouTube) work never takes
+
+# Segment deadlines: provider work for a segment is dropped/cancelled after
+# max(SEGMENT_SLA_MIN_S, segment length x SEGMENT_SLA_FACTOR + SEGMENT_SLA_GRACE_S)
+SEGMENT_SLA_FACTOR = 1.0
+SEGMENT_SLA_GRACE_S = 2.0
+SEGMENT_SLA_MIN_S = 10.0
+
+# WebSocket disconnect: cancel the session's outstanding provider calls (default),
+# or let them finish for up to WS_DRAIN_TIMEOUT_S and persist results without sending
+WS_DRAIN_ON_DISCONNECT = False
+WS_DRAIN_TIMEOUT_S = 30.0
+# Resumable WS sessions (hello with session_id) are kept this long after a drop before the above applies
+WS_RESUME_GRACE_S = 120.0
+
+# Idempotent segment ingest: (recording_id, idx, content hash) -> result, for retried uploads
+INGEST_CACHE_MAX = 4096
+
+# Server-side full transcripts (segment_store), per recording
+FULL_TRANSCRIPT_TTL_S = 6 * 3600  # per-recording full transcripts untouched this long are dropped
+FULL_TRANSCRIPT_KEEP_MAX = 256  # and at most this many recordings are kept (least recently used go first)
+
+# WebSocket outbound queue (one writer per connection; control messages first)
+WS_OUTBOX_MAX = 256
+WS_SLOW_SEND_MS = 250.0
+WS_OUTBOX_FLUSH_S = 1.0  # on disconnect/end_stream, time allowed to send what is queued
+
+# WS transcript reorder buffer: per provider, results are released in segment order;
+# a missing segment is skipped after WS_REORDER_TIMEOUT_S or once WS_REORDER_WINDOW results wait behind it
+WS_REORDER_ENABLED = True
+WS_REORDER_WINDOW = 8
+WS_REORDER_TIMEOUT_S = 5.0
+
+# Queued WS segment payloads kept in RAM up to this total; beyond it provider jobs re-read the saved file per call
+SEGMENT_MEMORY_BUDGET_MB = 64
+
+# Disk writer thread (recordings and segment files): batch size, open append handles,
+# and fsync interval before acknowledging (0 = flush only, as before)
+DISK_WRITER_BATCH_BYTES = 4 * 1024 * 1024
+DISK_WRITER_MAX_OPEN = 64
+DISK_WRITER_FSYNC_MS = 0
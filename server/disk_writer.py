@@ -0,0 +1,241 @@
+"""
+server/disk_writer.py
+
+Dedicated disk writer thread for recordings and segment files.
+
+The ingest paths (WS chunks/segments, `/segment_upload`) used to open, write,
+flush and close files on the event loop, so a slow disk stalled every socket.
+Callers now enqueue commands and get an asyncio future that resolves when the
+write is done; the event loop itself never makes a blocking write call.
+
+- `append(path, data)`: appends; consecutive appends to the same file in a
+  batch are coalesced into one write on a cached append handle;
+- `write_file(path, data)`: replaces the whole file (e.g. a segment);
+- `close(path)`: flushes and closes the cached handle; resolves to the size.
+
+Each batch is flushed before its futures resolve. With DISK_WRITER_FSYNC_MS > 0
+writes are group-committed: dirty files are fsynced at most once per interval
+and acknowledgements wait for that fsync. 0 keeps the previous behaviour
+(flush only, durability left to the OS).
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from server.config import DISK_WRITER_BATCH_BYTES, DISK_WRITER_FSYNC_MS, DISK_WRITER_MAX_OPEN
+
+# (op, path, data, loop, future)
+Command = Tuple[str, str, bytes, Optional[asyncio.AbstractEventLoop], Optional[asyncio.Future]]
+
+_q: "queue.Queue[Command]" = queue.Queue()
+_thread: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+_stats: Dict[str, int] = {"commands": 0, "batches": 0, "writes": 0, "coalesced": 0, "fsyncs": 0, "errors": 0}
+
+
+def _settle(fut: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+        # Fire-and-forget appends may never be awaited
+        fut.exception()
+    else:
+        fut.set_result(result)
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self._open: "OrderedDict[str, Any]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._last_fsync = time.monotonic()
+        self._unacked: List[Tuple[Command, Any, Optional[BaseException]]] = []
+
+    def _handle(self, path: str) -> Any:
+        f = self._open.get(path)
+        if f is None:
+            f = open(path, "ab")
+            self._open[path] = f
+            while len(self._open) > DISK_WRITER_MAX_OPEN:
+                old_path, old = self._open.popitem(last=False)
+                try:
+                    if DISK_WRITER_FSYNC_MS > 0 and old_path in self._dirty:
+                        old.flush()
+                        os.fsync(old.fileno())
+                        _stats["fsyncs"] += 1
+                    old.close()
+                except Exception:
+                    pass
+        else:
+            self._open.move_to_end(path)
+        return f
+
+    def _close(self, path: str, sync: bool = True) -> None:
+        f = self._open.pop(path, None)
+        if f is not None:
+            try:
+                # Group commit: writes acknowledged with this batch must be on disk, not just closed
+                if sync and DISK_WRITER_FSYNC_MS > 0 and path in self._dirty:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    _stats["fsyncs"] += 1
+            finally:
+                f.close()
+        self._dirty.discard(path)
+
+    def _append(self, path: str, chunks: List[bytes]) -> None:
+        f = self._handle(path)
+        f.write(b"".join(chunks) if len(chunks) > 1 else chunks[0])
+        self._dirty.add(path)
+        _stats["writes"] += 1
+        _stats["coalesced"] += len(chunks) - 1
+
+    def _write_file(self, path: str, data: bytes) -> None:
+        # The old content is about to be truncated: no point syncing it
+        self._close(path, sync=False)
+        # Kept open (as an append handle) so the next sync() flushes and fsyncs it with the batch
+        f = self._handle(path)
+        f.truncate(0)
+        f.write(data)
+        self._dirty.add(path)
+        _stats["writes"] += 1
+
+    def fsync_due_in(self) -> Optional[float]:
+        """Seconds until unacknowledged writes must be fsynced; None when nothing is waiting."""
+        if not self._unacked:
+            return None
+        return max(0.0, DISK_WRITER_FSYNC_MS / 1000.0 - (time.monotonic() - self._last_fsync))
+
+    def sync(self) -> None:
+        """Flush dirty files; fsync them when the interval is due; then acknowledge."""
+        for path in list(self._dirty):
+            f = self._open.get(path)
+            if f is not None:
+                f.flush()
+        if DISK_WRITER_FSYNC_MS > 0:
+            if self.fsync_due_in():
+                return
+            for path in list(self._dirty):
+                f = self._open.get(path)
+                if f is not None:
+                    os.fsync(f.fileno())
+                    _stats["fsyncs"] += 1
+            self._last_fsync = time.monotonic()
+        self._dirty.clear()
+        acks, self._unacked = self._unacked, []
+        for (_, _, _, loop, fut), result, err in acks:
+            if loop is not None and fut is not None:
+                try:
+                    loop.call_soon_threadsafe(_settle, fut, result, err)
+                except RuntimeError:
+                    # Loop already closed (shutdown)
+                    pass
+
+    def run_batch(self, batch: List[Command]) -> None:
+        """Run commands in order per file, merging runs of appends; acknowledged by sync()."""
+        pending: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        acks: List[Tuple[Command, Any, Optional[BaseException]]] = []
+        waiting: Dict[str, List[Command]] = {}
+
+        def flush_appends(path: str) -> None:
+            chunks = pending.pop(path, None)
+            cmds = waiting.pop(path, [])
+            if not chunks:
+                return
+            err: Optional[BaseException] = None
+            try:
+                self._append(path, chunks)
+            except Exception as e:
+                err = e
+                _stats["errors"] += 1
+                print(f"Disk writer append failed ({path}): {e}")
+            acks.extend((c, None, err) for c in cmds)
+
+        for cmd in batch:
+            op, path, data, _, _ = cmd
+            if op == "append":
+                pending.setdefault(path, []).append(data)
+                waiting.setdefault(path, []).append(cmd)
+                continue
+            flush_appends(path)
+            result: Any = None
+            err = None
+            try:
+                if op == "write_file":
+                    self._write_file(path, data)
+                elif op == "close":
+                    self._close(path)
+                    result = os.path.getsize(path) if os.path.exists(path) else 0
+            except Exception as e:
+                err = e
+                _stats["errors"] += 1
+                print(f"Disk writer {op} failed ({path}): {e}")
+            acks.append((cmd, result, err))
+        for path in list(pending):
+            flush_appends(path)
+        self._unacked.extend(acks)
+        try:
+            self.sync()
+        except Exception as e:
+            _stats["errors"] += 1
+            print(f"Disk writer sync failed: {e}")
+
+
+def _run() -> None:
+    writer = _Writer()
+    while True:
+        try:
+            batch = [_q.get(timeout=writer.fsync_due_in())]
+        except queue.Empty:
+            # Group commit interval elapsed with no new writes: fsync and acknowledge what is waiting
+            try:
+                writer.sync()
+            except Exception as e:
+                _stats["errors"] += 1
+                print(f"Disk writer sync failed: {e}")
+            continue
+        size = len(batch[0][2])
+        # Drain what is already queued, up to the batch byte limit
+        while size < DISK_WRITER_BATCH_BYTES:
+            try:
+                cmd = _q.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(cmd)
+            size += len(cmd[2])
+        _stats["batches"] += 1
+        _stats["commands"] += len(batch)
+        writer.run_batch(batch)
+
+
+def _submit(op: str, path: str, data: bytes = b"") -> asyncio.Future:
+    global _thread
+    if _thread is None:
+        with _start_lock:
+            if _thread is None:
+                _thread = threading.Thread(target=_run, name="disk-writer", daemon=True)
+                _thread.start()
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    _q.put((op, path, bytes(data), loop, fut))
+    return fut
+
+
+def append(path: str, data: bytes) -> asyncio.Future:
+    return _submit("append", path, data)
+
+
+def write_file(path: str, data: bytes) -> asyncio.Future:
+    return _submit("write_file", path, data)
+
+
+def close(path: str) -> asyncio.Future:
+    return _submit("close", path)
+
+
+def stats() -> Dict[str, int]:
+    return {**_stats, "queued": _q.qsize()}
@@ -0,0 +1,70 @@
+"""
+server/event_codec.py
+
+Encode-once UI events.
+
+An event delivered to a WebSocket and to every SSE subscriber used to be
+serialized once per channel (and parsed again per subscriber to find its
+type). `Event` wraps the message dict and encodes it lazily, at most once:
+`text()` for WebSocket `send_text`, `sse_frame()` for the `/events` stream.
+orjson is used when installed, with the stdlib json module as fallback.
+"""
+import functools
+import json
+from typing import Any, Callable, Dict, Optional
+
+
+@functools.lru_cache(maxsize=None)
+def _orjson_dumps() -> Optional[Callable[[Any], bytes]]:
+    try:
+        import orjson  # optional, faster encoder
+        return orjson.dumps
+    except Exception:
+        return None
+
+
+def dumps(message: Any) -> bytes:
+    fast = _orjson_dumps()
+    if fast is not None:
+        try:
+            return fast(message)
+        except Exception:
+            # e.g. non-str keys; the stdlib encoder is more permissive
+            pass
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class Event:
+    __slots__ = ("message", "_json", "_text", "_sse")
+
+    def __init__(self, message: Dict[str, Any]) -> None:
+        self.message = message
+        self._json: Optional[bytes] = None
+        self._text: Optional[str] = None
+        self._sse: Optional[bytes] = None
+
+    @property
+    def type(self) -> str:
+        return str(self.message.get("type") or "") if isinstance(self.message, dict) else ""
+
+    def json_bytes(self) -> bytes:
+        if self._json is None:
+            self._json = dumps(self.message)
+        return self._json
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.json_bytes().decode("utf-8")
+        return self._text
+
+    def sse_frame(self) -> bytes:
+        """`event: <type>` (when set) plus `data: <json>`, ready to write to every subscriber."""
+        if self._sse is None:
+            ev = self.type
+            head = f"event: {ev}\n".encode("utf-8") if ev else b""
+            self._sse = head + b"data: " + self.json_bytes() + b"\n\n"
+        return self._sse
+
+
+def as_event(message: Any) -> Event:
+    return message if isinstance(message, Event) else Event(message)
@@ -0,0 +1,206 @@
+"""
+server/provider_clients.py
+
+Provider client construction, connection pooling and warm-up.
+
+- Google STT uses a gRPC channel with keepalive pings, so the HTTP/2
+  connection survives idle gaps between segments.
+- google.genai clients (Gemini API and Vertex) get an HTTP connection pool
+  with a long keepalive expiry (the httpx default is 5 s).
+- `warm_up` runs in the background at boot (and after a key change): it opens
+  each enabled provider's connection with a cheap, non-billable call (channel
+  ready / model metadata), so the first segment does not pay for TLS, channel
+  setup or auth token fetches.
+- `keepalive_loop` repeats the metadata call every PROVIDER_KEEPALIVE_S so
+  pooled connections stay open during quiet periods.
+
+`on_startup` also creates the clients: `AppState.init_providers` runs in a
+worker thread after the port is bound, so the server starts serving (and
+answering `/healthz`) before any provider SDK is imported. `ready()` turns true
+once init has finished; `status()` reports per-provider warm state.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from server.config import PROVIDER_WARMUP_TIMEOUT_S, PROVIDER_KEEPALIVE_S, PROVIDER_HTTP_KEEPALIVE_S
+
+_GRPC_KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+_status: Dict[str, Dict[str, Any]] = {}
+_keepalive_task: Optional[asyncio.Task] = None
+# Server loop, captured at startup: key changes arrive from sync routes in the threadpool
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_initialized = False
+
+
+def _set_status(key: str, state: str, **extra: Any) -> None:
+    entry = _status.setdefault(key, {})
+    entry.update(extra)
+    entry["state"] = state
+    entry["updated"] = time.time()
+
+
+def mark_cold(key: str) -> None:
+    _set_status(key, "cold")
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    return {k: dict(v) for k, v in _status.items()}
+
+
+def ready() -> bool:
+    return _initialized
+
+
+def build_speech_client(speech_module: Any) -> Any:
+    """SpeechClient on a keepalive gRPC channel (falls back to the default transport)."""
+    try:
+        transport_cls = speech_module.SpeechClient.get_transport_class("grpc")
+        channel = transport_cls.create_channel(options=_GRPC_KEEPALIVE_OPTIONS)
+        client = speech_module.SpeechClient(transport=transport_cls(channel=channel))
+        client._warm_channel = channel  # kept for warm-up (channel_ready_future)
+        return client
+    except Exception as e:
+        print(f"Speech keepalive channel unavailable, using default transport: {e}")
+        return speech_module.SpeechClient()
+
+
+def build_genai_client(genai_sdk: Any, genai_types: Any, **kwargs: Any) -> Any:
+    """google.genai Client with a pooled, long-lived HTTP connection when the SDK supports it."""
+    if genai_types is not None:
+        try:
+            import httpx
+
+            limits = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=PROVIDER_HTTP_KEEPALIVE_S)
+            http_options = genai_types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits})
+            return genai_sdk.Client(http_options=http_options, **kwargs)
+        except Exception:
+            pass
+    return genai_sdk.Client(**kwargs)
+
+
+def _touch_speech(client: Any) -> None:
+    import grpc
+
+    channel = getattr(client, "_warm_channel", None)
+    if channel is None:
+        channel = client.transport.grpc_channel
+    grpc.channel_ready_future(channel).result(timeout=PROVIDER_WARMUP_TIMEOUT_S)
+
+
+def _touch_genai(client: Any, model_name: str) -> None:
+    client.models.get(model=model_name)
+
+
+def _touch_gemini(model: Any, model_name: str) -> None:
+    client = getattr(model, "_client", None)
+    if client is not None:
+        _touch_genai(client, model_name)
+        return
+    import google.generativeai as gm
+
+    gm.get_model(f"models/{model_name}")
+
+
+def _touchers() -> Dict[str, Any]:
+    from server.state import app_state
+
+    out: Dict[str, Any] = {}
+    if app_state.speech_client is not None:
+        out["google"] = lambda: _touch_speech(app_state.speech_client)
+    if getattr(app_state, "gemini_model", None) is not None:
+        out["gemini"] = lambda: _touch_gemini(app_state.gemini_model, app_state.gemini_model_name)
+    if getattr(app_state, "vertex_client", None) is not None:
+        out["vertex"] = lambda: _touch_genai(app_state.vertex_client, app_state.vertex_model_name)
+    return out
+
+
+async def warm_up(keys: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Open connections for configured providers concurrently; never raises."""
+    touchers = _touchers()
+    if keys is not None:
+        touchers = {k: v for k, v in touchers.items() if k in keys}
+
+    async def one(key: str, fn: Any) -> None:
+        _set_status(key, "warming")
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(fn), timeout=PROVIDER_WARMUP_TIMEOUT_S + 1)
+            _set_status(key, "warm", warmup_ms=int((time.perf_counter() - t0) * 1000), error=None)
+        except Exception as e:
+            _set_status(key, "error", error=str(e) or type(e).__name__)
+
+    await asyncio.gather(*[one(k, fn) for k, fn in touchers.items()])
+    return status()
+
+
+def schedule_warm_up(keys: Optional[List[str]] = None) -> None:
+    """Warm in the background (settings saves, startup); safe to call from a worker thread."""
+    from server.session_tasks import spawn_background
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Sync route handlers run in the threadpool: hand the warm-up to the server loop
+        loop = _loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(lambda: spawn_background(warm_up(keys)))
+            except RuntimeError:
+                pass
+        return
+    spawn_background(warm_up(keys))
+
+
+async def keepalive_loop() -> None:
+    while True:
+        await asyncio.sleep(PROVIDER_KEEPALIVE_S)
+        try:
+            await warm_up()
+        except Exception:
+            pass
+
+
+def start_keepalive() -> None:
+    global _keepalive_task
+    if _keepalive_task is None or _keepalive_task.done():
+        try:
+            _keepalive_task = asyncio.get_running_loop().create_task(keepalive_loop())
+        except RuntimeError:
+            pass
+
+
+async def init_and_warm() -> None:
+    global _initialized
+    from server.state import app_state
+
+    t0 = time.perf_counter()
+    try:
+        await asyncio.to_thread(app_state.init_providers)
+    except Exception as e:
+        print(f"Provider init failed: {e}")
+    try:
+        # AWS credential chain (files, IMDS/STS) is resolved once here, not per segment on the event loop
+        from server.services import aws_transcribe
+        await asyncio.to_thread(aws_transcribe.resolve_credentials)
+    except Exception as e:
+        print(f"AWS credential resolution failed: {e}")
+    _initialized = True
+    print(f"Providers initialized in {int((time.perf_counter() - t0) * 1000)} ms")
+    await warm_up()
+    start_keepalive()
+
+
+async def on_startup() -> None:
+    """Startup hook: init and warm providers in the background; does not block serving."""
+    global _loop
+    from server.session_tasks import spawn_background
+
+    _loop = asyncio.get_running_loop()
+    spawn_background(init_and_warm())
@@ -0,0 +1,120 @@
+"""
+server/reorder.py
+
+Per-session reorder buffer for segment transcripts.
+
+Provider tasks finish out of order, so `segment_transcript_<provider>` for idx 7
+can be ready before idx 6. `Sequencer` holds completed results per provider and
+releases them in idx order, so the client can append to the full transcript
+instead of re-sorting and rebuilding it.
+
+- `expect(provider, idx)` when a segment is dispatched to a provider;
+- `push(provider, idx, msg)` when its result is ready (False: not expected any
+  more, e.g. skipped; the caller sends it straight away, marked `late`);
+- `settle(provider, idx)` when the provider task ends, so a task that failed
+  without a result does not hold back later segments.
+
+A held result never waits more than `timeout_s` for an earlier segment, and at
+most `window` results are held per provider; past either limit the missing
+segment is skipped and the rest are released. Released messages carry
+`"ordered": true`.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from server.config import WS_REORDER_TIMEOUT_S, WS_REORDER_WINDOW
+
+Release = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Sequencer:
+    def __init__(self, release: Release, window: int = WS_REORDER_WINDOW, timeout_s: float = WS_REORDER_TIMEOUT_S) -> None:
+        self._release = release
+        self.window = max(1, int(window))
+        self.timeout_s = float(timeout_s)
+        self._expected: Dict[str, List[int]] = {}
+        self._held: Dict[str, Dict[int, Tuple[Dict[str, Any], float]]] = {}
+        self._settled: Set[Tuple[str, int]] = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.released = 0
+        self.skipped = 0
+
+    def expect(self, provider: str, idx: int) -> None:
+        pending = self._expected.setdefault(provider, [])
+        if idx not in pending:
+            pending.append(idx)
+            pending.sort()
+
+    def push(self, provider: str, idx: int, msg: Dict[str, Any]) -> bool:
+        if idx not in self._expected.get(provider, ()):
+            return False
+        self._held.setdefault(provider, {})[idx] = (msg, time.monotonic())
+        self._wake.set()
+        return True
+
+    def settle(self, provider: str, idx: int) -> None:
+        """Provider task finished; if it produced no result the segment stops blocking later ones."""
+        if idx in self._expected.get(provider, ()) and idx not in self._held.get(provider, {}):
+            self._settled.add((provider, idx))
+            self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop releasing; held results are dropped (their text is already persisted by the provider task)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _next_ready(self) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """Next message to release (if any) and, otherwise, when the earliest skip is due."""
+        due: Optional[float] = None
+        now = time.monotonic()
+        for provider, pending in self._expected.items():
+            held = self._held.get(provider, {})
+            while pending:
+                head = pending[0]
+                if head in held:
+                    pending.pop(0)
+                    msg, _ = held.pop(head)
+                    msg["ordered"] = True
+                    return msg, None
+                if (provider, head) in self._settled:
+                    self._settled.discard((provider, head))
+                    pending.pop(0)
+                    continue
+                if not held:
+                    break
+                oldest = min(arrived for _, arrived in held.values())
+                if len(held) >= self.window or now - oldest >= self.timeout_s:
+                    # Head-of-line segment is stuck: give up on it and release what is behind it
+                    pending.pop(0)
+                    self.skipped += 1
+                    continue
+                at = oldest + self.timeout_s
+                due = at if due is None else min(due, at)
+                break
+        return None, due
+
+    async def _run(self) -> None:
+        while True:
+            msg, due = self._next_ready()
+            if msg is not None:
+                self.released += 1
+                try:
+                    await self._release(msg)
+                except Exception:
+                    pass
+                continue
+            self._wake.clear()
+            try:
+                if due is None:
+                    await self._wake.wait()
+                else:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, due - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
@@ -23,6 +23,15 @@ import time
 from server.services.gemini_api import extract_text_from_gemini_response
 
 
+def _refresh_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Record posted back by refresh-full: ids only when the server has its full transcript (segment_store)."""
+    from server.segment_store import full_texts
+
+    if full_texts(record.get("startTs")):
+        return {k: record.get(k) for k in ("id", "startTs", "stopTs")}
+    return record
+
+
 def build_segment_modal() -> Any:
     return build_settings_modal()
 
@@ -245,9 +254,10 @@ def build_panel_html(record: Dict[str, Any]) -> str:
     # Provider table (one column per enabled service); live text filled via WS
     # Add Translation column header at end. Use 'marked' class for client-side markdown rendering.
     full_header = Tr(*[Th(s["label"], style="border:0;padding:0") for s in services], Th("Translation", style="border:0;padding:0"))
-    full_cells: List[Any] = [Td(((record.get("fullAppend", {}) or {}).get(s["key"], "")), data_svc=s["key"], cls='marked') for s in services]
+    from server.services.summarizer import full_text_for
+    full_cells: List[Any] = [Td(full_text_for(record, s["key"]), data_svc=s["key"], cls='marked') for s in services]
     # Placeholder translation cell for full row (can be empty or computed later)
-    full_cells.append(Td(((record.get("fullAppend", {}) or {}).get("translation", "")), data_svc="translation"))
+    full_cells.append(Td(full_text_for(record, "translation"), data_svc="translation"))
     provider_table = Table(
         THead(full_header),
         TBody(Tr(*full_cells, id=f"fullrow-{record.get('id','')}") ),
@@ -263,7 +273,7 @@ def build_panel_html(record: Dict[str, Any]) -> str:
         hx_trigger="load, refresh-full",
         hx_target="this",
         hx_swap="innerHTML",
-        hx_vals=json.dumps({"record": record})
+        hx_vals=json.dumps({"record": _refresh_record(record)})
     )
 
     # Segments table
@@ -437,6 +447,7 @@ def render_full_row(req) -> Any:
     except Exception:
         record = {}
     try:
+        from server.services.summarizer import full_text_for
         services = [s for s in services_json() if s.get("enabled")]
         # Match the provider table built in build_panel_html: service columns + Translation
         # Summary table shows only provider columns (no Translation column here)
@@ -446,15 +457,7 @@ def render_full_row(req) -> Any:
         if getattr(app_state, 'enable_summarization', True) and app_state.gemini_model is not None:
             for s in services:
                 key = s["key"]
-                full_text = ((record.get("fullAppend", {}) or {}).get(key, ""))
-                # Fallback: if fullAppend is empty, derive from per-segment transcripts
-                if not full_text:
-                    try:
-                        seg_arr = ((record.get("transcripts", {}) or {}).get(key, []) or [])
-                        if isinstance(seg_arr, list):
-                            full_text = " ".join([str(x) for x in seg_arr if x])
-                    except Exception:
-                        full_text = ""
+                full_text = full_text_for(record, key)
                 if not full_text:
                     summaries[key] = ""
                     continue
@@ -484,7 +487,7 @@ def render_full_row(req) -> Any:
             except Exception:
                 pass
             if val is None:
-                val = ((record.get("fullAppend", {}) or {}).get(key, ""))
+                val = full_text_for(record, key)
             full_cells.append(Td(val or "", data_svc=key, cls='marked'))
         full_row = TBody(Tr(*full_cells, id=f"fullrow-{record.get('id','')}") )
         table = Table(full_header, full_row, border="0", cellpadding="4", cellspacing="0", style="border-collapse:collapse; border:0; width:100%")
@@ -0,0 +1,79 @@
+"""
+server/segment_audio.py
+
+Segment payloads for queued provider work, under a process-wide memory budget.
+
+A WS segment is written to `session_<ts>/segment_<n>.<ext>` before its provider
+tasks are dispatched. `SegmentAudio` keeps the bytes in RAM while the total
+held stays within SEGMENT_MEMORY_BUDGET_MB; beyond that it keeps only the path
+and `read()` loads the file when a provider call actually starts. A backlog of
+queued segments is then bounded by disk rather than RAM; only calls in flight
+(bounded by the scheduler) hold audio in memory.
+
+Each `read()` of a spilled segment is a fresh copy into RAM, once per provider
+call (up to four per segment), released when that call drops it. The provider
+SDKs all take `bytes`, so mapping the file would not avoid the copy.
+"""
+import asyncio
+import threading
+from typing import Dict, Optional
+
+from server.config import SEGMENT_MEMORY_BUDGET_MB
+
+_lock = threading.Lock()
+_held_bytes = 0
+_stats: Dict[str, int] = {"in_memory": 0, "spilled": 0, "disk_reads": 0}
+
+
+def _reserve(n: int) -> bool:
+    global _held_bytes
+    with _lock:
+        if _held_bytes + n > SEGMENT_MEMORY_BUDGET_MB * 1024 * 1024:
+            return False
+        _held_bytes += n
+        return True
+
+
+def _unreserve(n: int) -> None:
+    global _held_bytes
+    with _lock:
+        _held_bytes = max(0, _held_bytes - n)
+
+
+class SegmentAudio:
+    def __init__(self, path: str, data: bytes) -> None:
+        self.path = path
+        self.size = len(data)
+        self._data: Optional[bytes] = data if _reserve(self.size) else None
+        _stats["in_memory" if self._data is not None else "spilled"] += 1
+
+    @property
+    def spilled(self) -> bool:
+        return self._data is None
+
+    def read(self) -> bytes:
+        """The payload; a spilled segment is re-read from its file into a new bytes object per call."""
+        if self._data is not None:
+            return self._data
+        _stats["disk_reads"] += 1
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    async def read_async(self) -> bytes:
+        """read(), with the disk read of a spilled segment off the event loop."""
+        if self._data is not None:
+            return self._data
+        return await asyncio.to_thread(self.read)
+
+    def release(self) -> None:
+        """All provider work for the segment is done: return its share of the budget."""
+        if self._data is not None:
+            self._data = None
+            # Later reads (e.g. a late retry) go to the file
+            _unreserve(self.size)
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        held = _held_bytes
+    return {**_stats, "held_bytes": held, "budget_bytes": int(SEGMENT_MEMORY_BUDGET_MB * 1024 * 1024)}
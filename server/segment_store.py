@@ -4,15 +4,92 @@ server/segment_store.py
 In-memory segment table for the current process. Provides simple helpers to
 insert a segment record and append/update transcripts for the same row.
 
+Full transcripts are materialized per recording and provider as append-only
+pieces in segment order (`FullTranscript`); text is joined only when read, so
+a long recording does not re-copy its transcript on every segment. Recordings
+not written for FULL_TRANSCRIPT_TTL_S are dropped, and at most
+FULL_TRANSCRIPT_KEEP_MAX are kept (least recently written first).
+
+The ingest table makes uploads idempotent: a segment is identified by
+(recording_id, idx, sha256 of its bytes), and a retried upload attaches to the
+running job or gets the stored result instead of calling providers again.
+
 This can be swapped to SQLite or another DB later without changing callers.
 """
-from typing import Dict, Any, Optional
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import hashlib
 import itertools
+import time
+
+from server.config import INGEST_CACHE_MAX, FULL_TRANSCRIPT_TTL_S, FULL_TRANSCRIPT_KEEP_MAX
 
 
 _id_counter = itertools.count(1)
 _segments: Dict[int, Dict[str, Any]] = {}
 
+class FullTranscript:
+    """One provider's transcript for a recording: pieces ordered by segment idx, joined on demand."""
+
+    __slots__ = ("_idx", "_pieces", "_ends", "_text")
+
+    def __init__(self) -> None:
+        self._idx: List[int] = []
+        self._pieces: List[str] = []
+        self._ends: List[int] = []  # cached end offset of each piece in text(); valid prefix only
+        self._text: Optional[str] = None
+
+    def add(self, idx: int, text: str, replace: bool = False) -> None:
+        """Set segment idx's piece; if it already has one, replace it or append to it."""
+        text = (text or "").strip()
+        if not text:
+            return
+        idx = int(idx)
+        pos = bisect_left(self._idx, idx)
+        if pos < len(self._idx) and self._idx[pos] == idx:
+            self._pieces[pos] = text if replace else f"{self._pieces[pos]} {text}"
+        else:
+            # Segments usually arrive in order, so this is an append
+            self._idx.insert(pos, idx)
+            self._pieces.insert(pos, text)
+        del self._ends[pos:]
+        self._text = None
+
+    def __len__(self) -> int:
+        return len(self._pieces)
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = " ".join(self._pieces)
+        return self._text
+
+    def offsets(self) -> List[Tuple[int, int, int]]:
+        """(idx, start, end) character span of each segment's piece in text()."""
+        ends = self._ends
+        for i in range(len(ends), len(self._pieces)):
+            start = ends[i - 1] + 1 if i else 0
+            ends.append(start + len(self._pieces[i]))
+        return [(self._idx[i], ends[i] - len(self._pieces[i]), ends[i]) for i in range(len(ends))]
+
+    def pieces_after(self, idx: int) -> List[Tuple[int, str]]:
+        """Pieces for segments after idx, for clients that append instead of re-reading the whole text."""
+        pos = bisect_left(self._idx, int(idx) + 1)
+        return list(zip(self._idx[pos:], self._pieces[pos:]))
+
+
+# recording_id -> provider -> FullTranscript, least recently written first
+_full: "OrderedDict[str, Dict[str, FullTranscript]]" = OrderedDict()
+_full_touched: Dict[str, float] = {}
+
+IngestKey = Tuple[str, int, str]
+_ingest: "OrderedDict[IngestKey, asyncio.Future]" = OrderedDict()
+
+
+class IngestAbandoned(RuntimeError):
+    """The job a duplicate upload attached to was cancelled before it produced a result."""
+
 
 def insert_segment(recording_id: str, idx: int, url: str, mime: str, size: int, client_id: Optional[int], ts: int, start_ms: int, end_ms: int) -> Dict[str, Any]:
     seg_id = next(_id_counter)
@@ -44,6 +121,7 @@ def append_transcript(segment_id: int, provider: str, text: str) -> Optional[Dic
         prev = row.get("transcripts", {}).get(provider, "")
         joined = (prev + (" " if prev and text else "") + (text or "")).strip()
         row.setdefault("transcripts", {})[provider] = joined
+        add_full_piece(row.get("recording_id"), provider, row.get("idx") or 0, text)
     except Exception:
         pass
     return row
@@ -53,3 +131,79 @@ def get_segment(segment_id: int) -> Optional[Dict[str, Any]]:
     return _segments.get(int(segment_id))
 
 
+def add_full_piece(recording_id: Any, provider: str, idx: int, text: str, replace: bool = False) -> None:
+    if not recording_id or not provider or not (text or "").strip():
+        return
+    rec = str(recording_id)
+    _full.setdefault(rec, {}).setdefault(provider, FullTranscript()).add(idx, text, replace=replace)
+    _full.move_to_end(rec)
+    _full_touched[rec] = time.time()
+    _prune_full()
+
+
+def _prune_full(now: Optional[float] = None) -> None:
+    """Drop recordings not written for FULL_TRANSCRIPT_TTL_S, then the least recent beyond FULL_TRANSCRIPT_KEEP_MAX."""
+    cutoff = (now if now is not None else time.time()) - FULL_TRANSCRIPT_TTL_S
+    while _full:
+        rec = next(iter(_full))
+        if len(_full) <= FULL_TRANSCRIPT_KEEP_MAX and _full_touched.get(rec, 0.0) >= cutoff:
+            break
+        _full.pop(rec, None)
+        _full_touched.pop(rec, None)
+
+
+def record_results(recording_id: str, idx: int, results: Dict[str, Any]) -> None:
+    """Set one segment's provider results in the recording's full transcripts (a re-run replaces them)."""
+    for provider, text in (results or {}).items():
+        if isinstance(text, str):
+            add_full_piece(recording_id, provider, idx, text, replace=True)
+
+
+def get_full(recording_id: Any, provider: str) -> Optional[FullTranscript]:
+    return (_full.get(str(recording_id or "")) or {}).get(provider)
+
+
+def full_texts(recording_id: Any) -> Dict[str, str]:
+    return {k: ft.text() for k, ft in (_full.get(str(recording_id or "")) or {}).items()}
+
+
+def ingest_key(recording_id: str, idx: int, data: bytes) -> IngestKey:
+    return (str(recording_id or ""), int(idx or 0), hashlib.sha256(data or b"").hexdigest())
+
+
+def claim_ingest(key: IngestKey) -> Tuple[asyncio.Future, bool]:
+    """Future for this segment's result and whether the caller owns the job.
+
+    The first caller gets owner=True and must finish with `complete_ingest` or
+    `release_ingest`; later callers await the future (with asyncio.shield, so a
+    retry that gives up does not cancel the shared result).
+    """
+    fut = _ingest.get(key)
+    if fut is not None:
+        _ingest.move_to_end(key)
+        return fut, False
+    fut = asyncio.get_running_loop().create_future()
+    _ingest[key] = fut
+    # Evict the oldest finished entries; in-flight jobs are never dropped
+    if len(_ingest) > INGEST_CACHE_MAX:
+        for old_key in [k for k, f in _ingest.items() if f.done()][:len(_ingest) - INGEST_CACHE_MAX]:
+            _ingest.pop(old_key, None)
+    return fut, True
+
+
+def complete_ingest(key: IngestKey, result: Dict[str, Any], keep: bool = True) -> None:
+    """Resolve waiters with the job's result; keep=False lets a later retry run again (e.g. after provider errors)."""
+    fut = _ingest.get(key)
+    if fut is not None and not fut.done():
+        fut.set_result(result)
+    if not keep:
+        _ingest.pop(key, None)
+
+
+def release_ingest(key: IngestKey, error: Optional[BaseException] = None) -> None:
+    """Forget an unfinished job (failed or cancelled) so the next upload of the segment runs it."""
+    fut = _ingest.pop(key, None)
+    if fut is not None and not fut.done():
+        fut.set_exception(error or IngestAbandoned("segment job abandoned"))
+        # Mark retrieved so an un-awaited future does not log "exception was never retrieved"
+        fut.exception()
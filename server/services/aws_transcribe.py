@@ -1,34 +1,704 @@
 """
 server/services/aws_transcribe.py
 
-AWS Transcribe per-segment helper (planned).
+AWS Transcribe provider: streaming for live segments, batch for long audio.
 
-Approaches:
-- Streaming Transcribe via AWS WebSocket (convert audio to PCM or supported format)
-- Batch Transcribe: upload segment to S3 and call StartTranscriptionJob with the S3 URI
+Segments are converted to 16 kHz mono PCM with ffmpeg and sent as AudioEvent
+messages over Transcribe's WebSocket streaming API (SigV4 presigned URL,
+AWS event-stream framing). One stream is kept open per session (a WebSocket
+connection or a recording id) and reused across its segments:
 
-For now, this is a minimal scaffold to preserve wiring and UI columns.
+- each segment is followed by a short run of silence so Transcribe finalizes
+  the utterance at the segment boundary;
+- final results are attributed to the segment whose stream-time window
+  contains their StartTime;
+- if AWS closes the stream (e.g. after ~15 s without audio), the next segment
+  reconnects transparently.
+
+Set AWS_TRANSCRIBE_STREAM_ENDPOINT (e.g. ws://127.0.0.1:8765) to point at the
+local stand-in server in utils/aws_transcribe_standin.py.
+
+Batch mode (long uploads, YouTube chunks) uploads to S3 with concurrent
+multipart uploads and calls StartTranscriptionJob. All outstanding jobs are
+tracked by one poller task that lists job statuses in batches (one
+ListTranscriptionJobs page covers up to 100 jobs) and backs off while nothing
+changes. Requires AWS_TRANSCRIBE_BUCKET; AWS_S3_ENDPOINT_URL and
+AWS_TRANSCRIBE_ENDPOINT_URL point the clients at a local stand-in (e.g. moto);
+utils/aws_batch_standin.py replaces both clients in-process for tests.
 """
-from typing import Optional
+import asyncio
+import contextlib
+import datetime
+import functools
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+import urllib.request
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from server.config import (
+    LANGUAGE_CODE,
+    AWS_STREAM_SAMPLE_RATE,
+    AWS_STREAM_FRAME_MS,
+    AWS_STREAM_PAD_MS,
+    AWS_STREAM_SETTLE_S,
+    AWS_STREAM_RESULT_TIMEOUT_S,
+    AWS_STREAM_IDLE_CLOSE_S,
+    AWS_BATCH_PART_BYTES,
+    AWS_BATCH_UPLOAD_CONCURRENCY,
+    AWS_BATCH_POLL_MIN_S,
+    AWS_BATCH_POLL_MAX_S,
+    AWS_BATCH_POLL_BACKOFF,
+    AWS_BATCH_JOB_TIMEOUT_S,
+)
+from server.session_tasks import spawn_background
+
+# Segment audio, or an async loader for it (e.g. SegmentAudio.read_async) called once a slot is held
+Audio = Union[bytes, Callable[[], Awaitable[bytes]]]
+
+
+@functools.lru_cache(maxsize=None)
+def _boto3() -> Any:
+    """boto3, imported on first use rather than at startup, or None if missing."""
+    try:
+        import boto3
+        return boto3
+    except Exception:
+        return None
+
 
-try:
-    import boto3
-except Exception:
-    boto3 = None
+@functools.lru_cache(maxsize=None)
+def _websockets() -> Any:
+    try:
+        import websockets
+        return websockets
+    except Exception:
+        return None
+
+
+def _region() -> str:
+    return os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
+
+
+_creds_lock = threading.Lock()
+_creds_source: Any = None
+_creds_resolved = False
+
+
+def resolve_credentials() -> bool:
+    """Resolve boto3's credential chain once; blocking (file reads, IMDS/STS), so call it off the event loop.
+
+    The resolved object is kept: botocore's RefreshableCredentials (assumed
+    roles, instance profiles) refreshes itself when it is about to expire.
+    """
+    global _creds_source, _creds_resolved
+    with _creds_lock:
+        if not _creds_resolved:
+            boto3 = _boto3()
+            if boto3 is not None:
+                try:
+                    _creds_source = boto3.Session().get_credentials()
+                except Exception:
+                    _creds_source = None
+            _creds_resolved = True
+    return has_credentials()
+
+
+def _env_credentials() -> Optional[Tuple[str, str, Optional[str]]]:
+    ak = os.environ.get("AWS_ACCESS_KEY_ID")
+    sk = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if ak and sk:
+        return ak, sk, os.environ.get("AWS_SESSION_TOKEN")
+    return None
+
+
+def has_credentials() -> bool:
+    """Non-blocking: whether credentials are known (the boto3 chain counts once resolve_credentials has run)."""
+    return _creds_source is not None or _env_credentials() is not None
+
+
+def _credentials() -> Optional[Tuple[str, str, Optional[str]]]:
+    """(access_key, secret_key, session_token) from boto3's chain, else the environment.
+
+    May block on first use or on refresh; runs in worker threads.
+    """
+    resolve_credentials()
+    if _creds_source is not None:
+        try:
+            frozen = _creds_source.get_frozen_credentials()
+            return frozen.access_key, frozen.secret_key, frozen.token
+        except Exception:
+            pass
+    return _env_credentials()
 
 
 def is_available() -> bool:
-    return boto3 is not None
+    return _websockets() is not None and has_credentials()
+
+
+# --- AWS event-stream framing ---
+
+_HEADER_TYPES_FIXED = {2: 1, 3: 2, 4: 4, 5: 8, 8: 8, 9: 16}
+
+
+def encode_event(headers: Dict[str, str], payload: bytes) -> bytes:
+    """Encode one event-stream message (string headers only)."""
+    hbytes = b""
+    for name, value in headers.items():
+        n = name.encode("utf-8")
+        v = value.encode("utf-8")
+        hbytes += struct.pack(">B", len(n)) + n + struct.pack(">BH", 7, len(v)) + v
+    total = 12 + len(hbytes) + len(payload) + 4
+    prelude = struct.pack(">II", total, len(hbytes))
+    prelude += struct.pack(">I", zlib.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + hbytes + payload
+    return message + struct.pack(">I", zlib.crc32(message) & 0xFFFFFFFF)
+
+
+def decode_event(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """Decode one event-stream message into (headers, payload); raises ValueError on bad framing."""
+    if len(data) < 16:
+        raise ValueError("short_message")
+    total, hlen, pcrc = struct.unpack(">III", data[:12])
+    if total != len(data):
+        raise ValueError("bad_length")
+    if zlib.crc32(data[:8]) & 0xFFFFFFFF != pcrc:
+        raise ValueError("bad_prelude_crc")
+    if zlib.crc32(data[:-4]) & 0xFFFFFFFF != struct.unpack(">I", data[-4:])[0]:
+        raise ValueError("bad_message_crc")
+    headers: Dict[str, Any] = {}
+    pos = 12
+    end = 12 + hlen
+    while pos < end:
+        nlen = data[pos]
+        name = data[pos + 1:pos + 1 + nlen].decode("utf-8")
+        pos += 1 + nlen
+        htype = data[pos]
+        pos += 1
+        if htype in (0, 1):
+            value: Any = htype == 0
+        elif htype in (6, 7):
+            vlen = struct.unpack(">H", data[pos:pos + 2])[0]
+            raw = data[pos + 2:pos + 2 + vlen]
+            value = raw.decode("utf-8") if htype == 7 else raw
+            pos += 2 + vlen
+        elif htype in _HEADER_TYPES_FIXED:
+            size = _HEADER_TYPES_FIXED[htype]
+            value = data[pos:pos + size]
+            pos += size
+        else:
+            raise ValueError("bad_header_type")
+        headers[name] = value
+    return headers, data[end:-4]
+
+
+def audio_event(pcm: bytes) -> bytes:
+    return encode_event({
+        ":content-type": "application/octet-stream",
+        ":event-type": "AudioEvent",
+        ":message-type": "event",
+    }, pcm)
+
+
+# --- SigV4 presigned URL ---
+
+def _sign(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def presigned_url(language_code: str = LANGUAGE_CODE, sample_rate: int = AWS_STREAM_SAMPLE_RATE,
+                  region: Optional[str] = None, expires: int = 300) -> str:
+    """SigV4 query-signed URL for the Transcribe streaming WebSocket endpoint."""
+    creds = _credentials()
+    if creds is None:
+        raise RuntimeError("aws_credentials_missing")
+    access_key, secret_key, token = creds
+    region = region or _region()
+    override = os.environ.get("AWS_TRANSCRIBE_STREAM_ENDPOINT", "").rstrip("/")
+    if override:
+        scheme, host = override.split("://", 1)
+    else:
+        scheme, host = "wss", f"transcribestreaming.{region}.amazonaws.com:8443"
+    path = "/stream-transcription-websocket"
+    now = datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    datestamp = now.strftime("%Y%m%d")
+    scope = f"{datestamp}/{region}/transcribe/aws4_request"
+    params = {
+        "language-code": language_code,
+        "media-encoding": "pcm",
+        "sample-rate": str(sample_rate),
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{scope}",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(expires),
+        "X-Amz-SignedHeaders": "host",
+    }
+    if token:
+        params["X-Amz-Security-Token"] = token
+    query = "&".join(f"{quote(k, safe='~')}={quote(v, safe='~')}" for k, v in sorted(params.items()))
+    canonical = "\n".join(["GET", path, query, f"host:{host}", "", "host", hashlib.sha256(b"").hexdigest()])
+    to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode("utf-8")).hexdigest()])
+    key = _sign(("AWS4" + secret_key).encode("utf-8"), datestamp)
+    key = _sign(key, region)
+    key = _sign(key, "transcribe")
+    key = _sign(key, "aws4_request")
+    signature = hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{scheme}://{host}{path}?{query}&X-Amz-Signature={signature}"
+
+
+# --- Audio conversion ---
+
+async def to_pcm16(raw: bytes, sample_rate: int = AWS_STREAM_SAMPLE_RATE) -> bytes:
+    """Decode any container ffmpeg understands to mono signed 16-bit little-endian PCM."""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-loglevel', 'error', '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1',
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate(raw)
+    if proc.returncode != 0:
+        raise RuntimeError(f"pcm_convert_failed: {(err or b'').decode('utf-8', 'replace')[:200]}")
+    return out
+
+
+# --- Streaming session ---
+
+class AwsStreamSession:
+    """One Transcribe stream reused across the segments of a session (segments are serialized)."""
+
+    def __init__(self, language_code: str = LANGUAGE_CODE, sample_rate: int = AWS_STREAM_SAMPLE_RATE) -> None:
+        self.language_code = language_code
+        self.sample_rate = sample_rate
+        self.last_used = time.time()
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._finals: List[Tuple[int, int, str]] = []
+        self._changed = asyncio.Event()
+        self._offset_ms = 0
+        self._error: Optional[str] = None
+        # Set when a segment is cancelled part-way (segment deadline); the next one starts a fresh stream
+        self._stale = False
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    async def _connect(self) -> None:
+        await self._disconnect()
+        # Credentials may need resolving or refreshing (network); sign off the event loop
+        url = await asyncio.to_thread(presigned_url, self.language_code, self.sample_rate)
+        self._ws = await _websockets().connect(url, max_size=None)
+        self._finals = []
+        self._offset_ms = 0
+        self._error = None
+        self._stale = False
+        self._reader = asyncio.create_task(self._read_loop(self._ws))
+
+    async def _disconnect(self) -> None:
+        ws, reader = self._ws, self._reader
+        self._ws = None
+        self._reader = None
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        if reader is not None and not reader.done():
+            reader.cancel()
+            try:
+                await reader
+            except BaseException:
+                pass
+
+    async def _read_loop(self, ws) -> None:
+        try:
+            async for message in ws:
+                if isinstance(message, str):
+                    continue
+                try:
+                    headers, payload = decode_event(message)
+                except Exception:
+                    continue
+                if headers.get(":message-type") == "exception":
+                    try:
+                        detail = json.loads(payload or b"{}").get("Message", "")
+                    except Exception:
+                        detail = ""
+                    self._error = f"{headers.get(':exception-type', 'aws_error')}: {detail}"
+                    break
+                if headers.get(":event-type") != "TranscriptEvent":
+                    continue
+                try:
+                    results = (json.loads(payload).get("Transcript") or {}).get("Results") or []
+                except Exception:
+                    results = []
+                for r in results:
+                    if r.get("IsPartial"):
+                        continue
+                    alts = r.get("Alternatives") or []
+                    text = (alts[0].get("Transcript") if alts else "") or ""
+                    if text:
+                        self._finals.append((int(float(r.get("StartTime") or 0) * 1000),
+                                             int(float(r.get("EndTime") or 0) * 1000), text))
+                self._changed.set()
+        except Exception as e:
+            if not self._error:
+                self._error = str(e)
+        finally:
+            self._changed.set()
+
+    async def _send_pcm(self, pcm: bytes) -> None:
+        frame = max(2, int(self.sample_rate * 2 * AWS_STREAM_FRAME_MS / 1000))
+        for i in range(0, len(pcm), frame):
+            await self._ws.send(audio_event(pcm[i:i + frame]))
+        self._offset_ms += int(len(pcm) * 1000 / (self.sample_rate * 2))
 
+    async def transcribe_pcm(self, pcm: Audio, slot: Optional[Callable[[], Any]] = None, convert: bool = False) -> str:
+        """Send one segment of PCM on the shared stream and return its final transcript.
 
-def transcribe_segment_via_aws(segment_bytes: bytes, media_format: str = "webm", language_code: str = "en-US") -> str:
+        `slot` (e.g. `provider_slot`) is entered only once the session lock is
+        held, so segments queued behind this stream do not each hold a scheduler
+        slot while they wait. `pcm` may be an async loader, called under the
+        slot; with convert=True it is container audio decoded by to_pcm16.
+        """
+        async with self._lock:
+            async with (slot() if slot is not None else contextlib.nullcontext()):
+                self.last_used = time.time()
+                if callable(pcm):
+                    pcm = await pcm()
+                if convert:
+                    pcm = await to_pcm16(pcm, self.sample_rate)
+                if not self.connected or self._stale:
+                    await self._connect()
+                try:
+                    return await self._transcribe_locked(pcm)
+                except asyncio.CancelledError:
+                    # Stream time and pending finals are unknown after a partial send or wait
+                    self._stale = True
+                    raise
+
+    async def _transcribe_locked(self, pcm: bytes) -> str:
+        """Body of transcribe_pcm; the caller holds the session lock."""
+        seg_start = self._offset_ms
+        pad = bytes(int(self.sample_rate * 2 * AWS_STREAM_PAD_MS / 1000) & ~1)
+        try:
+            await self._send_pcm(pcm + pad)
+        except Exception:
+            # Stream closed by AWS between segments: reconnect once and resend
+            await self._connect()
+            seg_start = self._offset_ms
+            await self._send_pcm(pcm + pad)
+        seg_end = self._offset_ms
+        speech_end = seg_end - AWS_STREAM_PAD_MS
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + AWS_STREAM_RESULT_TIMEOUT_S
+        while self.connected and loop.time() < deadline:
+            if any(end >= speech_end for (start, end, _) in self._finals if start < seg_end):
+                break
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=AWS_STREAM_SETTLE_S)
+            except asyncio.TimeoutError:
+                break
+
+        mine = [f for f in self._finals if seg_start - 50 <= f[0] < seg_end]
+        self._finals = [f for f in self._finals if f[0] >= seg_end]
+        if not mine and self._error:
+            raise RuntimeError(self._error)
+        return " ".join(t for (_, _, t) in sorted(mine)).strip()
+
+    async def transcribe(self, raw: Audio, slot: Optional[Callable[[], Any]] = None) -> str:
+        return await self.transcribe_pcm(raw, slot=slot, convert=True)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._ws is not None:
+                try:
+                    await self._ws.send(audio_event(b""))
+                except Exception:
+                    pass
+            await self._disconnect()
+
+
+_sessions: Dict[str, AwsStreamSession] = {}
+
+
+def get_session(key: str) -> AwsStreamSession:
+    """Shared stream for a session key; idle entries are dropped on access."""
+    now = time.time()
+    for k, s in list(_sessions.items()):
+        if k != key and now - s.last_used > AWS_STREAM_IDLE_CLOSE_S and not s.connected:
+            _sessions.pop(k, None)
+    sess = _sessions.get(key)
+    if sess is None:
+        sess = AwsStreamSession()
+        _sessions[key] = sess
+    return sess
+
+
+async def close_session(key: str) -> None:
+    sess = _sessions.pop(key, None)
+    if sess is not None:
+        try:
+            await sess.close()
+        except Exception:
+            pass
+
+
+async def recognize_segment(segment_bytes: Audio, session_key: str = "", slot: Optional[Callable[[], Any]] = None) -> str:
+    """Transcribe one segment; reuses the session's stream when session_key is given.
+
+    Pass the scheduler's `provider_slot` as `slot` rather than wrapping the
+    call: it is then taken after the session's earlier segments are done.
     """
-    Placeholder: AWS Transcribe requires files accessible via S3 or streaming.
-    To integrate properly: upload `segment_bytes` to S3, then call
-    `start_transcription_job` and poll `get_transcription_job`.
+    if session_key:
+        return await get_session(session_key).transcribe(segment_bytes, slot=slot)
+    sess = AwsStreamSession()
+    try:
+        return await sess.transcribe(segment_bytes, slot=slot)
+    finally:
+        await sess.close()
+
+
+# --- Batch mode ---
+
+_JOB_PREFIX = f"ai-seg-{os.getpid()}-{int(time.time())}"
+_job_counter = itertools.count(1)
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+_MEDIA_FORMATS = ("ogg", "webm", "wav", "mp3", "flac", "m4a", "mp4", "amr")
+
+
+def _bucket() -> str:
+    return os.environ.get("AWS_TRANSCRIBE_BUCKET", "")
+
+
+def batch_available() -> bool:
+    return _boto3() is not None and bool(_bucket()) and has_credentials()
+
+
+def _client(service: str) -> Any:
+    """Cached boto3 client; endpoint overrides allow a local S3/Transcribe stand-in.
 
-    Returns an empty string for now to avoid blocking.
+    Creating a client resolves credentials and loads service models; call it from a worker thread.
     """
-    return ""
+    cli = _clients.get(service)
+    if cli is None:
+        with _clients_lock:
+            cli = _clients.get(service)
+            if cli is None:
+                env = "AWS_S3_ENDPOINT_URL" if service == "s3" else "AWS_TRANSCRIBE_ENDPOINT_URL"
+                cli = _boto3().client(service, region_name=_region(), endpoint_url=os.environ.get(env) or None)
+                _clients[service] = cli
+    return cli
+
+
+def media_format(ext_or_mime: str) -> str:
+    m = (ext_or_mime or "").lower()
+    for fmt in _MEDIA_FORMATS:
+        if fmt in m:
+            return fmt
+    if "mpeg" in m:
+        return "mp3"
+    return "webm"
+
+
+async def upload_s3(key: str, data: bytes, part_bytes: int = AWS_BATCH_PART_BYTES,
+                    concurrency: int = AWS_BATCH_UPLOAD_CONCURRENCY) -> None:
+    """Upload to the batch bucket; payloads above part_bytes use concurrent multipart parts."""
+    s3 = await asyncio.to_thread(_client, "s3")
+    bucket = _bucket()
+    if len(data) <= part_bytes:
+        await asyncio.to_thread(s3.put_object, Bucket=bucket, Key=key, Body=data)
+        return
+    upload = await asyncio.to_thread(s3.create_multipart_upload, Bucket=bucket, Key=key)
+    upload_id = upload["UploadId"]
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def part(num: int, offset: int) -> Dict[str, Any]:
+        async with sem:
+            resp = await asyncio.to_thread(
+                s3.upload_part, Bucket=bucket, Key=key, UploadId=upload_id,
+                PartNumber=num, Body=data[offset:offset + part_bytes],
+            )
+        return {"PartNumber": num, "ETag": resp["ETag"]}
+
+    try:
+        parts = await asyncio.gather(*[part(i + 1, off) for i, off in enumerate(range(0, len(data), part_bytes))])
+        await asyncio.to_thread(
+            s3.complete_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+        )
+    except BaseException:
+        try:
+            await asyncio.to_thread(s3.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            pass
+        raise
+
+
+def _list_statuses(prefix: str, wanted: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Job summaries for our prefix, newest first; stops paging once every wanted job is seen."""
+    tc = _client("transcribe")
+    out: Dict[str, Dict[str, Any]] = {}
+    remaining = set(wanted)
+    token = None
+    while True:
+        kwargs: Dict[str, Any] = {"JobNameContains": prefix, "MaxResults": 100}
+        if token:
+            kwargs["NextToken"] = token
+        resp = tc.list_transcription_jobs(**kwargs)
+        for summ in resp.get("TranscriptionJobSummaries") or []:
+            name = summ.get("TranscriptionJobName")
+            out[name] = summ
+            remaining.discard(name)
+        token = resp.get("NextToken")
+        if not token or not remaining:
+            return out
+
+
+def _read_transcript(job_name: str, output_key: str) -> str:
+    try:
+        body = _client("s3").get_object(Bucket=_bucket(), Key=output_key)["Body"].read()
+    except Exception:
+        # Some stand-ins ignore OutputKey; fall back to the job's transcript URI
+        job = _client("transcribe").get_transcription_job(TranscriptionJobName=job_name)["TranscriptionJob"]
+        with urllib.request.urlopen(job["Transcript"]["TranscriptFileUri"], timeout=30) as resp:
+            body = resp.read()
+    data = json.loads(body)
+    transcripts = (data.get("results") or {}).get("transcripts") or []
+    return " ".join((t.get("transcript") or "") for t in transcripts).strip()
+
+
+def _cleanup(job_name: str, keys: List[str]) -> None:
+    for key in keys:
+        try:
+            _client("s3").delete_object(Bucket=_bucket(), Key=key)
+        except Exception:
+            pass
+    try:
+        _client("transcribe").delete_transcription_job(TranscriptionJobName=job_name)
+    except Exception:
+        pass
+
+
+class BatchPoller:
+    """Tracks every outstanding batch job from a single task with batched status checks."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, job_name: str, input_key: str, output_key: str) -> "asyncio.Future[str]":
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[job_name] = {
+            "future": fut,
+            "input_key": input_key,
+            "output_key": output_key,
+            "deadline": time.time() + AWS_BATCH_JOB_TIMEOUT_S,
+        }
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return fut
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _run(self) -> None:
+        interval = AWS_BATCH_POLL_MIN_S
+        while self._pending:
+            await asyncio.sleep(interval)
+            try:
+                statuses = await asyncio.to_thread(_list_statuses, _JOB_PREFIX, list(self._pending.keys()))
+            except Exception as e:
+                print(f"AWS batch poll error: {e}")
+                interval = min(interval * AWS_BATCH_POLL_BACKOFF, AWS_BATCH_POLL_MAX_S)
+                continue
+            changed = False
+            for name, info in list(self._pending.items()):
+                summ = statuses.get(name) or {}
+                status = summ.get("TranscriptionJobStatus")
+                fut = info["future"]
+                if status == "COMPLETED":
+                    changed = True
+                    self._pending.pop(name, None)
+                    spawn_background(self._deliver(name, info))
+                elif status == "FAILED":
+                    changed = True
+                    self._pending.pop(name, None)
+                    if not fut.done():
+                        fut.set_exception(RuntimeError(f"aws_job_failed: {summ.get('FailureReason', '')}"))
+                    spawn_background(asyncio.to_thread(_cleanup, name, [info["input_key"]]))
+                elif time.time() > info["deadline"] or fut.done():
+                    self._pending.pop(name, None)
+                    if not fut.done():
+                        fut.set_exception(RuntimeError("aws_job_timeout"))
+                    spawn_background(asyncio.to_thread(_cleanup, name, [info["input_key"]]))
+            interval = AWS_BATCH_POLL_MIN_S if changed else min(interval * AWS_BATCH_POLL_BACKOFF, AWS_BATCH_POLL_MAX_S)
+
+    async def _deliver(self, name: str, info: Dict[str, Any]) -> None:
+        fut = info["future"]
+        try:
+            text = await asyncio.to_thread(_read_transcript, name, info["output_key"])
+            if not fut.done():
+                fut.set_result(text)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        finally:
+            await asyncio.to_thread(_cleanup, name, [info["input_key"], info["output_key"]])
+
+
+_poller = BatchPoller()
+
+
+async def transcribe_batch(raw: bytes, ext_or_mime: str = "webm", language_code: str = LANGUAGE_CODE) -> str:
+    """Upload audio, start a batch job and wait for the shared poller to deliver its transcript."""
+    fmt = media_format(ext_or_mime)
+    job_name = f"{_JOB_PREFIX}-{next(_job_counter)}"
+    input_key = f"transcribe/inputs/{job_name}.{fmt}"
+    output_key = f"transcribe/outputs/{job_name}.json"
+    await upload_s3(input_key, raw)
+    tc = await asyncio.to_thread(_client, "transcribe")
+    await asyncio.to_thread(
+        tc.start_transcription_job,
+        TranscriptionJobName=job_name,
+        LanguageCode=language_code,
+        MediaFormat=fmt,
+        Media={"MediaFileUri": f"s3://{_bucket()}/{input_key}"},
+        OutputBucketName=_bucket(),
+        OutputKey=output_key,
+    )
+    return await _poller.track(job_name, input_key, output_key)
+
 
+async def transcribe_batch_event(raw: bytes, ext_or_mime: str, event: Dict[str, Any]) -> None:
+    """Run a batch job in the background and publish the result as segment_transcript_aws."""
+    from server.sse_bus import publish as sse_publish
 
+    msg = {"type": "segment_transcript_aws", **event}
+    try:
+        msg["transcript"] = await transcribe_batch(raw, ext_or_mime)
+    except Exception as e:
+        msg["error"] = str(e)
+    try:
+        from server.segment_store import add_full_piece
+        add_full_piece(event.get("recording_id"), "aws", event.get("idx") or 0, msg.get("transcript") or "", replace=True)
+    except Exception:
+        pass
+    try:
+        await sse_publish(msg)
+    except Exception:
+        pass
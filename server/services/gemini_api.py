@@ -4,8 +4,13 @@ server/services/gemini_api.py
 Helpers for extracting text from Gemini consumer API responses across SDKs:
 - google-generativeai (legacy): response.text
 - google.genai (new): response.candidates[0].content.parts[].text
+
+`stream_gemini_text` runs a streaming generate call (either SDK) in a worker
+thread and yields its text deltas as they arrive.
 """
-from typing import Any, List
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 
 
 def _from_candidates(resp: Any) -> str:
@@ -59,3 +64,63 @@ def extract_text_from_gemini_response(resp: Any) -> str:
     return ""
 
 
+def _iter_stream_text(model: Any, parts: List[Dict[str, Any]]) -> Iterator[str]:
+    """Sync iterator of text deltas from the SDK's streaming call."""
+    if hasattr(model, "generate_content_stream"):
+        stream = model.generate_content_stream(parts)
+    else:
+        stream = model.generate_content(parts, stream=True)
+    for chunk in stream:
+        try:
+            text = getattr(chunk, "text", None)
+        except Exception:
+            text = None
+        if text is None:
+            text = extract_text_from_gemini_response(chunk)
+        if text:
+            yield text
+
+
+async def stream_gemini_text(model: Any, parts: List[Dict[str, Any]], timeout_s: float,
+                             on_abandon: Optional[Callable[["asyncio.Future[Any]"], None]] = None) -> AsyncIterator[str]:
+    """Async iterator over text deltas; the blocking SDK iterator runs in a worker thread.
+
+    Raises asyncio.TimeoutError if the whole call takes longer than timeout_s.
+    on_abandon(worker) is called if the consumer stops while the thread is still
+    blocked in the SDK (e.g. so the scheduler keeps its slot counted).
+    """
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def pump() -> None:
+        try:
+            for delta in _iter_stream_text(model, parts):
+                if stop.is_set():
+                    break  # consumer gave up (cancelled or deadline); stop reading the response
+                loop.call_soon_threadsafe(q.put_nowait, delta)
+        except Exception as e:
+            loop.call_soon_threadsafe(q.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(q.put_nowait, done)
+
+    worker = loop.run_in_executor(None, pump)
+    deadline = loop.time() + timeout_s
+    try:
+        while True:
+            item = await asyncio.wait_for(q.get(), timeout=max(0.1, deadline - loop.time()))
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        if worker.done():
+            try:
+                worker.result()
+            except Exception:
+                pass
+        elif on_abandon is not None:
+            on_abandon(worker)
@@ -5,11 +5,15 @@ Async per-segment recognizer for Google STT.
 We prefer WEBM_OPUS or OGG_OPUS to match the browser segment container.
 """
 import asyncio
-from typing import Optional
-from google.cloud import speech
+from typing import Any, Optional
+
+async def recognize_segment(client: Any, segment_bytes: bytes, mime_ext: str, language_code: str = "en-US",
+                            timeout: Optional[float] = None) -> str:
+    """timeout (seconds) is passed to the gRPC call as its deadline, so late work stops server-side."""
+    from google.cloud import speech  # imported on first use; the client already loaded it
 
-async def recognize_segment(client: speech.SpeechClient, segment_bytes: bytes, mime_ext: str, language_code: str = "en-US") -> str:
     loop = asyncio.get_running_loop()
+    kwargs = {"timeout": max(0.1, timeout)} if timeout is not None else {}
 
     def do_recognize_webm():
         cfg = speech.RecognitionConfig(
@@ -18,7 +22,7 @@ async def recognize_segment(client: speech.SpeechClient, segment_bytes: bytes, m
             sample_rate_hertz=48000,
         )
         audio = speech.RecognitionAudio(content=segment_bytes)
-        return client.recognize(config=cfg, audio=audio)
+        return client.recognize(config=cfg, audio=audio, **kwargs)
 
     def do_recognize_ogg():
         cfg = speech.RecognitionConfig(
@@ -27,7 +31,7 @@ async def recognize_segment(client: speech.SpeechClient, segment_bytes: bytes, m
             sample_rate_hertz=48000,
         )
         audio = speech.RecognitionAudio(content=segment_bytes)
-        return client.recognize(config=cfg, audio=audio)
+        return client.recognize(config=cfg, audio=audio, **kwargs)
 
     if mime_ext == "ogg":
         resp = await loop.run_in_executor(None, do_recognize_ogg)
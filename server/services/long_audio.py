@@ -0,0 +1,397 @@
+"""
+server/services/long_audio.py
+
+Long-audio mode: cut an input file into fixed or silence-aligned chunks with a
+small overlap, transcribe the chunks in parallel across providers under one
+concurrency limit, and stitch each provider's chunk transcripts back in order
+while dropping the words duplicated by the overlap.
+
+Used by `/transcribe_youtube` jobs, `/test_transcribe` and `/segment_upload`
+when a segment is longer than LONG_AUDIO_THRESHOLD_MS (180–300 s settings).
+
+With `on_partial`, Gemini chunks use streaming generation and the stitched
+text of the leading finished chunks plus the first unfinished chunk's partial
+text is passed on as it grows (in-order prefix, so partials never go back).
+"""
+import asyncio
+import os
+import re
+import tempfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from server.config import (
+    LONG_AUDIO_THRESHOLD_MS,
+    LONG_AUDIO_CHUNK_MS,
+    LONG_AUDIO_OVERLAP_MS,
+    LONG_AUDIO_SILENCE_SNAP_MS,
+    LONG_AUDIO_SILENCE_DB,
+    LONG_AUDIO_SILENCE_MIN_S,
+    LONG_AUDIO_CONCURRENCY,
+    LONG_AUDIO_STREAM_WINDOW,
+)
+from server.services.transcription import (
+    enabled_providers,
+    gemini_streaming_enabled,
+    transcribe_gemini_stream,
+    transcribe_provider,
+    translation_enabled,
+)
+from server.services.translator import translate
+
+
+Chunk = Dict[str, Any]
+OnChunk = Callable[[Chunk], Awaitable[None]]
+OnPartial = Callable[[str, str], Awaitable[None]]  # (provider key, text so far)
+
+_SILENCE_RE = re.compile(rb"silence_(start|end): (-?[0-9.]+)")
+_WORD_NORM_RE = re.compile(r"[^\w']+", re.UNICODE)
+
+
+def is_long(duration_ms: Optional[int]) -> bool:
+    try:
+        return int(duration_ms or 0) > LONG_AUDIO_THRESHOLD_MS
+    except Exception:
+        return False
+
+
+async def probe_duration_ms(path: str) -> int:
+    """Return media duration in ms via ffprobe (0 if unknown)."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1', path,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        return int(float(out.decode().strip() or 0) * 1000)
+    except Exception:
+        return 0
+
+
+async def detect_silences(path: str) -> List[Tuple[int, int]]:
+    """Return (start_ms, end_ms) silence intervals using ffmpeg silencedetect."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-nostats', '-i', path,
+            '-af', f'silencedetect=noise={LONG_AUDIO_SILENCE_DB}dB:d={LONG_AUDIO_SILENCE_MIN_S}',
+            '-f', 'null', '-',
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+        _, err = await proc.communicate()
+    except Exception:
+        return []
+    silences: List[Tuple[int, int]] = []
+    start: Optional[int] = None
+    for kind, val in _SILENCE_RE.findall(err or b""):
+        ms = int(float(val) * 1000)
+        if kind == b"start":
+            start = max(0, ms)
+        elif start is not None:
+            silences.append((start, ms))
+            start = None
+    return silences
+
+
+def plan_chunks(duration_ms: int, chunk_ms: int = LONG_AUDIO_CHUNK_MS, overlap_ms: int = LONG_AUDIO_OVERLAP_MS,
+                silences: Optional[List[Tuple[int, int]]] = None,
+                snap_ms: int = LONG_AUDIO_SILENCE_SNAP_MS) -> List[Tuple[int, int]]:
+    """Split [0, duration_ms) into chunks of about chunk_ms.
+
+    Each cut is moved to the middle of the nearest silence within snap_ms of
+    the fixed grid point when silences are known. Every chunk after the first
+    starts overlap_ms before the previous cut.
+    """
+    if duration_ms <= 0:
+        return []
+    cuts: List[int] = []
+    pos = 0
+    while duration_ms - pos > chunk_ms:
+        target = pos + chunk_ms
+        cut = target
+        if silences:
+            best = None
+            for s_start, s_end in silences:
+                mid = (s_start + s_end) // 2
+                if abs(mid - target) <= snap_ms and mid > pos + overlap_ms:
+                    if best is None or abs(mid - target) < abs(best - target):
+                        best = mid
+            if best is not None:
+                cut = best
+        cuts.append(cut)
+        pos = cut
+    bounds: List[Tuple[int, int]] = []
+    prev = 0
+    for cut in cuts + [duration_ms]:
+        start = max(0, prev - overlap_ms) if bounds else 0
+        bounds.append((start, cut))
+        prev = cut
+    return bounds
+
+
+async def cut_chunk(path: str, start_ms: int, end_ms: int) -> bytes:
+    """Return the [start_ms, end_ms) slice of path as OGG/Opus bytes."""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-nostats', '-loglevel', 'error',
+        '-ss', f"{start_ms/1000:.3f}", '-t', f"{(end_ms-start_ms)/1000:.3f}", '-i', path,
+        '-vn', '-ac', '1', '-c:a', 'libopus', '-b:a', '64k', '-f', 'ogg', 'pipe:1',
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError("ffmpeg_cut_failed")
+    return out
+
+
+def _norm_words(text: str) -> List[str]:
+    return [w for w in (_WORD_NORM_RE.sub(" ", (text or "").lower())).split() if w]
+
+
+def stitch_texts(texts: List[str], max_overlap_words: int = 40) -> str:
+    """Join chunk transcripts in order, removing words repeated across the overlap.
+
+    For each next chunk, the longest run of (normalized) words that ends the
+    text so far and also starts the next chunk is dropped from the next chunk.
+    Chunks cut without overlap (streamed ingest) pass max_overlap_words=0 so
+    words that really repeat across a boundary are kept.
+    """
+    out_words: List[str] = []
+    out_norm: List[str] = []
+    for text in texts:
+        words = (text or "").split()
+        if not words:
+            continue
+        norm = [(_norm_words(w) or [""])[0] for w in words]
+        k_max = min(max_overlap_words, len(norm), len(out_norm))
+        drop = 0
+        for k in range(k_max, 0, -1):
+            if out_norm[-k:] == norm[:k]:
+                drop = k
+                break
+        out_words.extend(words[drop:])
+        out_norm.extend(norm[drop:])
+    return " ".join(out_words).strip()
+
+
+async def _limited(sem: asyncio.Semaphore, coro_fn, *args):
+    async with sem:
+        return await coro_fn(*args)
+
+
+async def transcribe_chunk(audio: bytes, mime: str, keys: List[str], sem: asyncio.Semaphore,
+                           do_translate: bool = False,
+                           on_gemini_partial: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
+    """Transcribe one chunk across providers (each call holds a semaphore slot)."""
+    results: Dict[str, Any] = {}
+
+    async def one(key: str) -> None:
+        try:
+            if key == "gemini" and on_gemini_partial is not None and gemini_streaming_enabled():
+                results[key] = await _limited(sem, transcribe_gemini_stream, audio, mime, on_gemini_partial)
+            elif key == "aws":
+                # Batch jobs wait on AWS's queue, not on local work; don't hold a slot while polling
+                results[key] = await transcribe_provider(key, audio, mime)
+            else:
+                results[key] = await _limited(sem, transcribe_provider, key, audio, mime)
+        except Exception as e:
+            results[key] = ""
+            results[f"{key}_error"] = str(e)
+
+    await asyncio.gather(*[one(k) for k in keys])
+    if do_translate:
+        base_txt = next((results.get(k) for k in keys if results.get(k)), "")
+        if base_txt:
+            try:
+                # Batched with other chunks' translations and cached; no provider slot needed
+                results['translation'] = await translate(base_txt)
+            except Exception as e:
+                results['translation_error'] = str(e)
+    return results
+
+
+def stitch_results(chunks: List[Chunk], keys: List[str], do_translate: bool = False,
+                   max_overlap_words: int = 40) -> Dict[str, Any]:
+    """Stitch per-chunk results (sorted by idx) into one result dict per provider."""
+    chunks = sorted(chunks, key=lambda c: c["idx"])
+    stitched: Dict[str, Any] = {}
+    for key in list(keys) + (['translation'] if do_translate else []):
+        stitched[key] = stitch_texts([c["results"].get(key, "") for c in chunks], max_overlap_words)
+    for c in chunks:
+        for k, v in c["results"].items():
+            if k.endswith("_error"):
+                stitched.setdefault(k, v)
+    stitched["chunks"] = [{k: v for k, v in c.items() if k != "audio"} for c in chunks]
+    return stitched
+
+
+async def _emit(on_chunk: Optional[OnChunk], chunk: Chunk) -> None:
+    if on_chunk is None:
+        return
+    try:
+        await on_chunk(chunk)
+    except Exception:
+        pass
+
+
+class _PartialPrefix:
+    """Stitched in-order prefix of chunk texts for one provider's partial events."""
+
+    def __init__(self, key: str, count: int, on_partial: OnPartial) -> None:
+        self.key = key
+        self.count = count
+        self.on_partial = on_partial
+        self.texts: Dict[int, str] = {}
+        self.done: Set[int] = set()
+        self.last = ""
+
+    async def update(self, idx: int, text: str, final: bool = False) -> None:
+        self.texts[idx] = text or ""
+        if final:
+            self.done.add(idx)
+        prefix: List[str] = []
+        for i in range(self.count):
+            prefix.append(self.texts.get(i, ""))
+            if i not in self.done:
+                break
+        text = stitch_texts([t for t in prefix if t])
+        if text and text != self.last:
+            self.last = text
+            try:
+                await self.on_partial(self.key, text)
+            except Exception:
+                pass
+
+
+async def transcribe_long_file(path: str, mime: str = "audio/ogg", on_chunk: Optional[OnChunk] = None,
+                               duration_ms: int = 0, providers: Optional[List[str]] = None,
+                               concurrency: int = LONG_AUDIO_CONCURRENCY,
+                               use_silence: bool = True,
+                               on_partial: Optional[OnPartial] = None) -> Dict[str, Any]:
+    """Transcribe a long file chunk-by-chunk in parallel and return stitched results.
+
+    Returns { <provider>: text, ..., 'translation'?: text, 'chunks': [Chunk, ...] }.
+    on_chunk is awaited once per chunk (in completion order) with
+    { idx, start_ms, end_ms, audio, results }. on_partial, if given, is awaited
+    with ("gemini", text so far) while Gemini output streams in.
+    """
+    if not duration_ms:
+        duration_ms = await probe_duration_ms(path)
+    silences = await detect_silences(path) if use_silence else []
+    bounds = plan_chunks(duration_ms, silences=silences)
+    keys = providers if providers is not None else enabled_providers()
+    do_translate = translation_enabled()
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    prefix = _PartialPrefix("gemini", max(1, len(bounds)), on_partial) if (on_partial and "gemini" in keys) else None
+
+    async def run_chunk(idx: int, start_ms: int, end_ms: int) -> Chunk:
+        if bounds:
+            audio = await _limited(sem, cut_chunk, path, start_ms, end_ms)
+            chunk_mime = "audio/ogg"
+        else:
+            # Unknown duration: fall back to a single whole-file chunk
+            with open(path, "rb") as f:
+                audio = f.read()
+            chunk_mime = mime
+        on_gemini_partial = None
+        if prefix is not None:
+            async def on_gemini_partial(text: str) -> None:
+                await prefix.update(idx, text)
+        results = await transcribe_chunk(audio, chunk_mime, keys, sem, do_translate, on_gemini_partial)
+        if prefix is not None:
+            await prefix.update(idx, results.get("gemini", ""), final=True)
+        chunk = {"idx": idx, "start_ms": start_ms, "end_ms": end_ms, "audio": audio, "results": results}
+        await _emit(on_chunk, chunk)
+        return chunk
+
+    chunks = await asyncio.gather(*[run_chunk(i, s, e) for i, (s, e) in enumerate(bounds or [(0, 0)])])
+    return stitch_results(list(chunks), keys, do_translate)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def transcribe_stream(source: AsyncIterator[Chunk], mime: str = "audio/ogg",
+                            on_chunk: Optional[OnChunk] = None, providers: Optional[List[str]] = None,
+                            concurrency: int = LONG_AUDIO_CONCURRENCY,
+                            cached: Optional[Dict[int, Dict[str, Any]]] = None,
+                            window: int = LONG_AUDIO_STREAM_WINDOW) -> Dict[str, Any]:
+    """Transcribe chunks as a producer yields them ({ idx, start_ms, end_ms, path or audio }).
+
+    Each chunk is dispatched to providers as soon as it arrives, so the first
+    transcript does not wait for the rest of the input. At most `window`
+    chunks are in flight; a chunk's file is read (off the event loop) only
+    when it enters the window and dropped once its providers finish, so a
+    long input does not hold every chunk in RAM. Chunks whose idx is in
+    cached reuse those results instead of calling providers. Streamed chunks
+    do not overlap, so their texts are joined in order without de-duplication.
+    """
+    keys = providers if providers is not None else enabled_providers()
+    do_translate = translation_enabled()
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    slots = asyncio.Semaphore(max(1, int(window)))
+
+    async def run_chunk(chunk: Chunk) -> Chunk:
+        chunk = dict(chunk)
+        audio = chunk.pop("audio", None)
+        hit = (cached or {}).get(chunk.get("idx"))
+        if hit is not None:
+            chunk["results"] = dict(hit)
+            chunk["cached"] = True
+        else:
+            async with slots:
+                if audio is None and chunk.get("path"):
+                    audio = await asyncio.to_thread(_read_file, chunk["path"])
+                chunk["results"] = await transcribe_chunk(audio or b"", mime, keys, sem, do_translate)
+                audio = None
+        await _emit(on_chunk, chunk)
+        return chunk
+
+    tasks: List[asyncio.Task] = []
+    try:
+        async for chunk in source:
+            tasks.append(asyncio.create_task(run_chunk(chunk)))
+        chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+    return stitch_results(list(chunks), keys, do_translate, max_overlap_words=0)
+
+
+async def transcribe_long_bytes(raw: bytes, mime: str = "", **kwargs: Any) -> Dict[str, Any]:
+    """Same as transcribe_long_file for in-memory audio (written to a temp file for ffmpeg)."""
+    ext = ".ogg" if "ogg" in (mime or "").lower() else ".webm"
+    fd, path = tempfile.mkstemp(suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        return await transcribe_long_file(path, mime, **kwargs)
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+async def transcribe_auto(raw: bytes, mime: str = "", duration_ms: int = 0) -> Dict[str, Any]:
+    """Use long-audio mode when the clip exceeds the threshold, else a single transcribe_all call."""
+    from server.services.transcription import transcribe_all
+
+    ext = ".ogg" if "ogg" in (mime or "").lower() else ".webm"
+    fd, path = tempfile.mkstemp(suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        if not duration_ms:
+            duration_ms = await probe_duration_ms(path)
+        if not is_long(duration_ms):
+            return await transcribe_all(raw, mime)
+        results = await transcribe_long_file(path, mime, duration_ms=duration_ms)
+        results.pop("chunks", None)
+        return results
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
@@ -0,0 +1,132 @@
+"""
+server/services/stream_ingest.py
+
+Streaming ingest for remote media: yt-dlp writes the download to a pipe,
+ffmpeg reads it from stdin and emits Opus chunks with its segment muxer while
+also writing the full OGG. The segment list goes to ffmpeg's stdout, so each
+chunk is yielded as soon as ffmpeg closes it. Providers can start on the first
+chunk while the rest of the download is still in flight.
+
+No intermediate download or transcode copies are written. The only files are
+the served chunk files and the full recording.
+"""
+import asyncio
+import os
+import sys
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from server.config import LONG_AUDIO_CHUNK_MS, YT_STREAM_FIRST_CHUNK_MS, YT_STREAM_IDLE_TIMEOUT_S
+
+
+def segment_times(duration_ms: int, first_ms: int = YT_STREAM_FIRST_CHUNK_MS,
+                  chunk_ms: int = LONG_AUDIO_CHUNK_MS, cap_ms: int = 6 * 3600 * 1000) -> List[float]:
+    """Cut points (seconds): a short first chunk for fast first results, then regular chunks."""
+    end = duration_ms if duration_ms > 0 else cap_ms
+    times: List[float] = []
+    t = min(first_ms, chunk_ms) if first_ms > 0 else chunk_ms
+    while t < end:
+        times.append(t / 1000.0)
+        t += chunk_ms
+    return times
+
+
+def _ffmpeg_args(input_arg: str, chunk_dir: str, full_path: Optional[str], times: List[float]) -> List[str]:
+    args = ['ffmpeg', '-y', '-nostats', '-loglevel', 'error', '-i', input_arg,
+            # Output 1: segmented mono Opus; the csv list (name,start,end) streams to stdout
+            '-map', '0:a', '-ac', '1', '-c:a', 'libopus', '-b:a', '64k',
+            '-f', 'segment', '-segment_format', 'ogg', '-reset_timestamps', '1',
+            '-segment_list', 'pipe:1', '-segment_list_type', 'csv']
+    if times:
+        args += ['-segment_times', ','.join(f"{t:.3f}" for t in times)]
+    else:
+        args += ['-segment_time', f"{LONG_AUDIO_CHUNK_MS/1000:.3f}"]
+    args.append(os.path.join(chunk_dir, 'chunk_%d.ogg'))
+    if full_path:
+        # Output 2: full recording for playback/download
+        args += ['-map', '0:a', '-c:a', 'libopus', '-b:a', '96k', full_path]
+    return args
+
+
+def _parse_csv_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        name, start_s, end_s = line.decode('utf-8', 'replace').strip().rsplit(',', 2)
+        return {"name": os.path.basename(name), "start_ms": int(float(start_s) * 1000), "end_ms": int(float(end_s) * 1000)}
+    except Exception:
+        return None
+
+
+async def _kill(proc: Optional[asyncio.subprocess.Process]) -> None:
+    if proc is None or proc.returncode is not None:
+        return
+    try:
+        proc.kill()
+    except Exception:
+        pass
+    try:
+        await proc.wait()
+    except Exception:
+        pass
+
+
+async def stream_segments(chunk_dir: str, full_path: Optional[str], url: str = "", path: str = "",
+                          duration_ms: int = 0, skip: Optional[Set[int]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Yield { idx, start_ms, end_ms, name, path } for each finished chunk.
+
+    Reads from yt-dlp over a pipe when url is given, else directly from path.
+    full_path may be None to skip writing the full recording (e.g. when path
+    already is one). The chunk audio is not read here: the consumer loads
+    `path` when it dispatches the chunk. Chunks whose idx is in skip are
+    yielded with path=None.
+    """
+    os.makedirs(chunk_dir, exist_ok=True)
+    times = segment_times(duration_ms)
+    ytdlp = None
+    ffmpeg = None
+    try:
+        if url:
+            r_fd, w_fd = os.pipe()
+            try:
+                ytdlp = await asyncio.create_subprocess_exec(
+                    sys.executable, '-m', 'yt_dlp', '-f', 'bestaudio/best', '--quiet', '--no-warnings',
+                    '--no-part', '-o', '-', url,
+                    stdout=w_fd, stderr=asyncio.subprocess.DEVNULL,
+                )
+                ffmpeg = await asyncio.create_subprocess_exec(
+                    *_ffmpeg_args('pipe:0', chunk_dir, full_path, times),
+                    stdin=r_fd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                )
+            finally:
+                os.close(r_fd)
+                os.close(w_fd)
+        else:
+            ffmpeg = await asyncio.create_subprocess_exec(
+                *_ffmpeg_args(path, chunk_dir, full_path, times),
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            )
+
+        idx = 0
+        while True:
+            try:
+                line = await asyncio.wait_for(ffmpeg.stdout.readline(), timeout=YT_STREAM_IDLE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                raise RuntimeError("ingest_stalled")
+            if not line:
+                break
+            entry = _parse_csv_line(line)
+            if not entry:
+                continue
+            entry["idx"] = idx
+            entry["path"] = None if skip and idx in skip else os.path.join(chunk_dir, entry["name"])
+            idx += 1
+            yield entry
+
+        rc = await ffmpeg.wait()
+        if ytdlp is not None:
+            yrc = await ytdlp.wait()
+            if yrc != 0:
+                raise RuntimeError("download_failed")
+        if rc != 0:
+            raise RuntimeError("ffmpeg_failed")
+    finally:
+        await _kill(ffmpeg)
+        await _kill(ytdlp)
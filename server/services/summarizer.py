@@ -0,0 +1,416 @@
+"""
+server/services/summarizer.py
+
+Transcript summarization with Gemini.
+
+Rolling mode: while a recording is running, `/segment_upload` and the WS
+segment path (`finish_ingest`) feed each segment's provider transcripts to
+`observe_segment`. Once enough new text has
+accumulated for a provider, a background task folds that batch into the
+provider's running summary (map the new batch, reduce it into the summary in
+the same call). On Stop, `summarize_record` only merges the last unfolded delta
+into the running summary, so Stop-to-summary time stays roughly constant
+regardless of session length.
+
+Rolling state is in memory, keyed by the recording id the client sends with
+each segment (its startTs) and then by provider.
+
+Hierarchical mode: transcripts above SUMMARY_SINGLE_PASS_TOKENS are split into
+token-sized chunks on sentence boundaries, the chunks are summarized in
+parallel (SUMMARY_CONCURRENCY), and the partial summaries are reduced in
+groups until they fit one final call. Every intermediate result is cached by
+content hash, so a retry after a failed or timed-out call resumes instead of
+starting over.
+
+On Stop, providers are summarized concurrently, each Gemini call bounded by
+SUMMARY_CALL_TIMEOUT_S. Providers whose transcripts are near-identical (word
+bigram Jaccard >= SUMMARY_REUSE_SIMILARITY) share a single summary.
+
+Streaming: `stream_summary` runs the same final call with the SDK's streaming
+API and yields text deltas, so `/render/summary_stream` can forward them as
+they are generated.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from server.config import (
+    SUMMARY_ROLLING_MIN_CHARS,
+    SUMMARY_ROLLING_TTL_S,
+    SUMMARY_SINGLE_PASS_TOKENS,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_CONCURRENCY,
+    SUMMARY_CACHE_MAX,
+    SUMMARY_CALL_TIMEOUT_S,
+    SUMMARY_REUSE_SIMILARITY,
+)
+from server.state import app_state
+from server.services.gemini_api import extract_text_from_gemini_response, stream_gemini_text
+
+
+FOLD_PROMPT = (
+    "You maintain a running summary of a live transcription. Merge the new transcript excerpt into the "
+    "running summary. Keep it concise and preserve key points, decisions, and action items in order. "
+    "Return plain text only."
+)
+
+MAP_PROMPT = (
+    "Summarize this part of a longer transcription. Keep key points, decisions, action items, names and "
+    "figures in order. Return plain text only."
+)
+REDUCE_PROMPT = (
+    "Combine these consecutive partial summaries of one transcription into a single summary. Remove "
+    "repetition, keep chronological order, and keep key points, decisions, and action items. Return plain text only."
+)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+class _Rolling:
+    """Running summary for one provider of one recording."""
+
+    def __init__(self) -> None:
+        self.summary: str = ""
+        self.segments: Dict[int, str] = {}
+        self.folded: set = set()
+        self.task: Optional[asyncio.Task] = None
+        self.updated: float = time.time()
+
+    def pending(self) -> List[int]:
+        return sorted(i for i in self.segments if i not in self.folded)
+
+    def pending_chars(self) -> int:
+        return sum(len(self.segments[i]) for i in self.pending())
+
+
+_rolling: Dict[str, Dict[str, _Rolling]] = {}
+
+
+def enabled() -> bool:
+    return bool(getattr(app_state, 'enable_summarization', True)) and getattr(app_state, 'gemini_model', None) is not None
+
+
+def _generate(parts: List[Dict[str, Any]]) -> str:
+    resp = app_state.gemini_model.generate_content(parts)
+    return extract_text_from_gemini_response(resp) or ""
+
+
+async def generate(parts: List[Dict[str, Any]]) -> str:
+    """Run one Gemini call off the event loop, bounded by SUMMARY_CALL_TIMEOUT_S."""
+    return await asyncio.wait_for(asyncio.to_thread(_generate, parts), timeout=SUMMARY_CALL_TIMEOUT_S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Gemini on English text)."""
+    return len(text or "") // 4 + 1
+
+
+def chunk_text(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """Pack sentences into chunks of at most max_tokens; oversized sentences are split on words."""
+    max_chars = max(1, max_tokens) * 4
+    pieces: List[str] = []
+    for sentence in _SENTENCE_RE.split((text or "").strip()):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        cur: List[str] = []
+        size = 0
+        for w in words:
+            if cur and size + len(w) + 1 > max_chars:
+                pieces.append(" ".join(cur))
+                cur, size = [], 0
+            cur.append(w)
+            size += len(w) + 1
+        if cur:
+            pieces.append(" ".join(cur))
+    chunks: List[str] = []
+    cur_chunk = ""
+    for piece in pieces:
+        if cur_chunk and len(cur_chunk) + len(piece) + 1 > max_chars:
+            chunks.append(cur_chunk)
+            cur_chunk = piece
+        else:
+            cur_chunk = f"{cur_chunk} {piece}" if cur_chunk else piece
+    if cur_chunk:
+        chunks.append(cur_chunk)
+    return chunks
+
+
+async def _cached_generate(prompt: str, text: str) -> str:
+    """Gemini call memoized by model, prompt and input so retries reuse finished work."""
+    model = getattr(app_state, 'gemini_model_name', '')
+    key = hashlib.sha256(f"{model}\0{prompt}\0{text}".encode("utf-8")).hexdigest()
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        return hit
+    out = (await generate([{"text": prompt}, {"text": text}])).strip()
+    if out:
+        _cache[key] = out
+        while len(_cache) > SUMMARY_CACHE_MAX:
+            _cache.popitem(last=False)
+    return out
+
+
+async def _map_all(prompt: str, texts: List[str], sem: asyncio.Semaphore) -> List[str]:
+    async def one(t: str) -> str:
+        async with sem:
+            return await _cached_generate(prompt, t)
+
+    results = await asyncio.gather(*[one(t) for t in texts], return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            # Finished siblings are cached; a retry only redoes the failed ones
+            raise r
+    return list(results)
+
+
+async def condense(text: str, budget_tokens: int = SUMMARY_SINGLE_PASS_TOKENS,
+                   concurrency: int = SUMMARY_CONCURRENCY) -> str:
+    """Reduce text until it fits budget_tokens: map chunk summaries, then reduce them in groups."""
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    parts = await _map_all(MAP_PROMPT, chunk_text(text), sem)
+    while estimate_tokens("\n\n".join(parts)) > budget_tokens and len(parts) > 1:
+        groups = _group_summaries(parts, SUMMARY_CHUNK_TOKENS)
+        if len(groups) == len(parts):
+            # Every summary already fills a group on its own; pair them to make progress
+            groups = ["\n\n".join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+        parts = await _map_all(REDUCE_PROMPT, groups, sem)
+    return "\n\n".join(parts)
+
+
+def _group_summaries(parts: List[str], max_tokens: int) -> List[str]:
+    """Group consecutive partial summaries into reduce inputs of at most max_tokens."""
+    groups: List[str] = []
+    cur: List[str] = []
+    size = 0
+    for p in parts:
+        t = estimate_tokens(p)
+        if cur and size + t > max_tokens:
+            groups.append("\n\n".join(cur))
+            cur, size = [], 0
+        cur.append(p)
+        size += t
+    if cur:
+        groups.append("\n\n".join(cur))
+    return groups
+
+
+def _prune() -> None:
+    cutoff = time.time() - SUMMARY_ROLLING_TTL_S
+    for rec_key in list(_rolling.keys()):
+        states = _rolling[rec_key]
+        if all(st.updated < cutoff and (st.task is None or st.task.done()) for st in states.values()):
+            _rolling.pop(rec_key, None)
+
+
+async def _fold(state: _Rolling) -> None:
+    """Fold pending segments into the running summary until nothing is pending."""
+    while True:
+        idxs = state.pending()
+        if not idxs:
+            return
+        batch = " ".join(state.segments[i] for i in idxs if state.segments[i]).strip()
+        if batch:
+            parts = [{"text": FOLD_PROMPT}]
+            if state.summary:
+                parts.append({"text": f"Running summary:\n{state.summary}"})
+            parts.append({"text": f"New transcript:\n{batch}"})
+            try:
+                state.summary = (await generate(parts)).strip() or state.summary
+            except Exception as e:
+                print(f"Rolling summary fold error: {e}")
+                return
+        state.folded.update(idxs)
+        state.updated = time.time()
+        if state.pending_chars() < SUMMARY_ROLLING_MIN_CHARS:
+            return
+
+
+def observe_segment(record_key: str, idx: int, results: Dict[str, Any]) -> None:
+    """Record one segment's transcripts and fold in the background once a batch is ready."""
+    if not record_key or not enabled():
+        return
+    _prune()
+    states = _rolling.setdefault(str(record_key), {})
+    for key, text in (results or {}).items():
+        if key.endswith("_error") or key == "translation" or not isinstance(text, str):
+            continue
+        state = states.setdefault(key, _Rolling())
+        state.segments[int(idx)] = text.strip()
+        state.updated = time.time()
+        if state.pending_chars() >= SUMMARY_ROLLING_MIN_CHARS and (state.task is None or state.task.done()):
+            try:
+                state.task = asyncio.get_running_loop().create_task(_fold(state))
+            except RuntimeError:
+                pass
+
+
+def full_text_for(rec: Dict[str, Any], key: str) -> str:
+    """Provider transcript for a record.
+
+    The server's materialized transcript (segment_store, keyed by the record's
+    startTs) is authoritative; records the server did not transcribe fall back
+    to the posted fullAppend, else the joined per-segment transcripts.
+    """
+    from server.segment_store import get_full
+
+    ft = get_full(rec.get('startTs'), key)
+    if ft is not None and len(ft):
+        return ft.text()
+    full_text = ((rec.get("fullAppend", {}) or {}).get(key, ""))
+    if not full_text:
+        try:
+            arr = ((rec.get("transcripts", {}) or {}).get(key, []) or [])
+            if isinstance(arr, list):
+                full_text = " ".join([str(x) for x in arr if x])
+        except Exception:
+            full_text = ""
+    return full_text or ""
+
+
+async def _text_parts(text: str, prompt: str) -> List[Dict[str, Any]]:
+    """Final-call input for a plain transcript; long ones are condensed hierarchically first."""
+    condensed = await condense(text)
+    if condensed is not text:
+        prompt = f"{prompt}\nThe input is a sequence of partial summaries of one transcription, in order."
+    return [{"text": prompt}, {"text": condensed}]
+
+
+async def final_parts(record_key: str, key: str, full_text: str, prompt: str) -> List[Dict[str, Any]]:
+    """Input for the final summary call, merging only the unfolded delta when a rolling summary exists."""
+    state = (_rolling.get(str(record_key)) or {}).get(key) if record_key else None
+    if state is not None and state.task is not None and not state.task.done():
+        try:
+            await state.task
+        except Exception:
+            pass
+    if state is None or not state.summary:
+        return await _text_parts(full_text, prompt)
+    delta = " ".join(state.segments[i] for i in state.pending() if state.segments[i]).strip()
+    delta = await condense(delta)
+    parts = [
+        {"text": f"{prompt}\nThe transcript is given as a summary of the earlier part followed by the latest part."},
+        {"text": f"Summary of earlier transcript:\n{state.summary}"},
+    ]
+    if delta:
+        parts.append({"text": f"Latest transcript:\n{delta}"})
+    return parts
+
+
+async def summarize_text(text: str, prompt: str) -> str:
+    """Single call for short transcripts; hierarchical map/reduce then one final call for long ones."""
+    parts = await _text_parts(text, prompt)
+    return await _cached_generate(parts[0]["text"], parts[1]["text"])
+
+
+async def summarize_provider(record_key: str, key: str, full_text: str, prompt: str) -> str:
+    """Final summary for one provider."""
+    parts = await final_parts(record_key, key, full_text, prompt)
+    if len(parts) == 2:
+        return await _cached_generate(parts[0]["text"], parts[1]["text"])
+    return await generate(parts)
+
+
+async def stream_generate(parts: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Async iterator over text deltas of one streaming call, bounded by SUMMARY_CALL_TIMEOUT_S."""
+    async for delta in stream_gemini_text(app_state.gemini_model, parts, SUMMARY_CALL_TIMEOUT_S):
+        yield delta
+
+
+def primary_key(rec: Dict[str, Any], keys: List[str]) -> Optional[str]:
+    """First provider (registry order) with transcript text; its summary is the one shown."""
+    for key in keys:
+        if full_text_for(rec, key).strip():
+            return key
+    return None
+
+
+async def stream_summary(rec: Dict[str, Any], keys: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield {type: 'delta', text} events for the primary provider's summary, then {type: 'done', ...}."""
+    key = primary_key(rec, keys)
+    if key is None:
+        yield {"type": "done", "key": None, "summary_text": ""}
+        return
+    full_text = full_text_for(rec, key)
+    if not enabled() or not bool(rec.get('stopTs')):
+        yield {"type": "done", "key": key, "summary_text": full_text}
+        return
+    prompt = (app_state.full_summary_prompt or "Summarize the transcription.")
+    text = ""
+    try:
+        parts = await final_parts(str(rec.get('startTs') or ''), key, full_text, prompt)
+        async for delta in stream_generate(parts):
+            text += delta
+            yield {"type": "delta", "key": key, "text": delta}
+    except Exception as e:
+        yield {"type": "error", "key": key, "error": str(e)}
+    yield {"type": "done", "key": key, "summary_text": text.strip() or full_text}
+
+
+def _bigrams(text: str) -> set:
+    words = _WORD_RE.findall((text or "").lower())
+    return set(zip(words, words[1:])) if len(words) > 1 else set(words)
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of word bigrams; cheap enough to run on full transcripts."""
+    sa, sb = _bigrams(a), _bigrams(b)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / float(len(sa | sb) or 1)
+
+
+def group_similar(texts: Dict[str, str], threshold: float = SUMMARY_REUSE_SIMILARITY) -> Dict[str, str]:
+    """Map each key to the representative key whose summary it can reuse."""
+    reps: List[str] = []
+    owner: Dict[str, str] = {}
+    for key, text in texts.items():
+        for rep in reps:
+            if similarity(texts[rep], text) >= threshold:
+                owner[key] = rep
+                break
+        else:
+            reps.append(key)
+            owner[key] = key
+    return owner
+
+
+async def summarize_record(rec: Dict[str, Any], keys: List[str]) -> Dict[str, str]:
+    """Summaries per provider key for a stopped record (falls back to the transcript on error).
+
+    Distinct transcripts are summarized concurrently; near-duplicates reuse one summary.
+    """
+    summaries: Dict[str, str] = {}
+    if not enabled() or not bool(rec.get('stopTs')):
+        return summaries
+    prompt = (app_state.full_summary_prompt or "Summarize the transcription.")
+    record_key = str(rec.get('startTs') or '')
+    texts: Dict[str, str] = {}
+    for key in keys:
+        full_text = full_text_for(rec, key)
+        if full_text:
+            texts[key] = full_text
+        else:
+            summaries[key] = ""
+    owner = group_similar(texts)
+    reps = [k for k in texts if owner[k] == k]
+
+    async def one(key: str) -> str:
+        try:
+            return await summarize_provider(record_key, key, texts[key], prompt)
+        except Exception:
+            return ""
+
+    done = dict(zip(reps, await asyncio.gather(*[one(k) for k in reps])))
+    for key in texts:
+        summaries[key] = done.get(owner[key]) or texts[key]
+    return summaries
@@ -5,15 +5,249 @@ Centralized transcription helpers used by both the WebSocket segment flow and
 the Settings modal /test_transcribe endpoint. This consolidates provider calls
 so we have a single source of truth for retries, content construction, and
 response parsing.
+
+Scheduling: every provider call holds a slot from `scheduler` (at most
+SCHED_MAX_CONCURRENCY at once). Waiting calls are served by priority class
+(live > interactive > batch); batch work never takes the last
+SCHED_LIVE_RESERVED slots. Within a class, sessions share slots by weighted
+fair queuing, so one YouTube job with many chunks cannot starve another. The
+caller's class and session are set once per request/job with
+`set_job_class` (a context variable, inherited by tasks and threads it starts).
+
+Deadlines: segment work also carries a deadline (`set_segment_deadline`:
+segment length x SEGMENT_SLA_FACTOR + SEGMENT_SLA_GRACE_S, at least
+SEGMENT_SLA_MIN_S). Queued calls whose deadline has passed are dropped before
+dispatch, and a running call is cancelled at the deadline (Google STT also gets
+it as its gRPC timeout, so the server stops work too). Both raise
+`DeadlineExceeded`. Batch and test work has no deadline.
+
+Sync SDK calls (Vertex, Gemini) run through `run_blocking`: a worker thread
+cannot be stopped, so when its await is cancelled the slot stays counted until
+the thread returns, and SCHED_MAX_CONCURRENCY bounds the calls really in flight.
 """
-from typing import Dict, Any, Optional, List
+import asyncio
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, NamedTuple, Optional, List, Tuple
 
 from server.state import app_state
 from server.services.registry import is_enabled as service_enabled
 from server.services.google_stt import recognize_segment as recognize_google_segment
 from server.services.vertex_gemini import build_vertex_contents, extract_text_from_vertex_response
 from server.services.vertex_langchain import is_available as lc_vertex_available, transcribe_segment_via_langchain
-from server.services.gemini_api import extract_text_from_gemini_response
+from server.services.gemini_api import extract_text_from_gemini_response, stream_gemini_text
+from server.config import (
+    GEMINI_PARTIAL_INTERVAL_MS,
+    GEMINI_STREAM_TIMEOUT_S,
+    SCHED_MAX_CONCURRENCY,
+    SCHED_LIVE_RESERVED,
+    SEGMENT_SLA_FACTOR,
+    SEGMENT_SLA_GRACE_S,
+    SEGMENT_SLA_MIN_S,
+)
+
+
+PRIORITY_LIVE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+_job_class: contextvars.ContextVar = contextvars.ContextVar("transcription_job_class", default=(PRIORITY_INTERACTIVE, "", 1.0))
+
+
+def set_job_class(priority: int, session: str = "", weight: float = 1.0) -> None:
+    """Tag provider calls made from the current task (and tasks it creates) with a class and session."""
+    _job_class.set((priority, session, weight))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The segment's deadline passed before or during a provider call."""
+
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("transcription_deadline", default=None)
+
+
+def set_segment_deadline(duration_ms: Optional[int]) -> float:
+    """Set the deadline (event loop time) for provider calls made for one segment from this context."""
+    budget = max(SEGMENT_SLA_MIN_S, (int(duration_ms or 0) / 1000.0) * SEGMENT_SLA_FACTOR + SEGMENT_SLA_GRACE_S)
+    deadline = asyncio.get_running_loop().time() + budget
+    _deadline.set(deadline)
+    return deadline
+
+
+def remaining_s() -> Optional[float]:
+    """Seconds left before the current deadline (None without one)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+
+class _Waiter(NamedTuple):
+    """Heap entry for a queued call; ordered by (finish, seq)."""
+    finish: float
+    seq: int
+    start: float
+    deadline: Optional[float]
+    fut: asyncio.Future
+
+
+class TranscriptionScheduler:
+    """Priority classes with weighted fair queuing across sessions inside each class."""
+
+    def __init__(self, slots: int, live_reserved: int) -> None:
+        self.slots = max(1, int(slots))
+        self.live_reserved = max(0, min(int(live_reserved), self.slots - 1))
+        self._heaps: List[List[_Waiter]] = [[] for _ in PRIORITY_NAMES]
+        self._vtime = [0.0 for _ in PRIORITY_NAMES]
+        self._finish: Dict[Tuple[int, str], float] = {}
+        self._seq = itertools.count()
+        self._running = [0 for _ in PRIORITY_NAMES]
+        self._submitted = [0 for _ in PRIORITY_NAMES]
+        self._waits: List[Deque[float]] = [deque(maxlen=256) for _ in PRIORITY_NAMES]
+        self._dropped = [0 for _ in PRIORITY_NAMES]  # deadline passed while queued
+        self._expired = [0 for _ in PRIORITY_NAMES]  # cancelled at the deadline while running
+        self._abandoned = [0 for _ in PRIORITY_NAMES]  # threads still running after their await was cancelled
+
+    def _limit(self, priority: int) -> int:
+        return self.slots - self.live_reserved if priority >= PRIORITY_BATCH else self.slots
+
+    def _dispatch(self) -> None:
+        now = asyncio.get_running_loop().time()
+        while sum(self._running) < self.slots:
+            for p, heap in enumerate(self._heaps):
+                while heap and (heap[0].fut.done() or (heap[0].deadline is not None and heap[0].deadline <= now)):
+                    fut = heapq.heappop(heap).fut  # waiter was cancelled, or its deadline passed
+                    if not fut.done():
+                        self._dropped[p] += 1
+                        fut.set_exception(DeadlineExceeded("deadline passed while queued"))
+                if heap and self._running[p] < self._limit(p):
+                    waiter = heapq.heappop(heap)
+                    self._vtime[p] = max(self._vtime[p], waiter.start)
+                    self._running[p] += 1
+                    waiter.fut.set_result(None)
+                    break
+            else:
+                return
+
+    def _release(self, priority: int) -> None:
+        self._running[priority] -= 1
+        self._dispatch()
+
+    async def _acquire(self, priority: int, session: str, weight: float, deadline: Optional[float]) -> None:
+        loop = asyncio.get_running_loop()
+        if deadline is not None and deadline <= loop.time():
+            self._dropped[priority] += 1
+            raise DeadlineExceeded("deadline passed before dispatch")
+        fut = loop.create_future()
+        key = (priority, session)
+        start = max(self._vtime[priority], self._finish.get(key, 0.0))
+        finish = start + 1.0 / max(weight, 0.01)
+        self._finish[key] = finish
+        if len(self._finish) > 1024:
+            self._finish = {k: v for k, v in self._finish.items() if v > self._vtime[k[0]]}
+        heapq.heappush(self._heaps[priority], _Waiter(finish, next(self._seq), start, deadline, fut))
+        self._submitted[priority] += 1
+        self._dispatch()
+        try:
+            if deadline is None:
+                await fut
+            else:
+                async with asyncio.timeout_at(deadline):
+                    await fut
+        except (asyncio.CancelledError, TimeoutError) as e:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._release(priority)
+            if isinstance(e, TimeoutError) and not isinstance(e, DeadlineExceeded):
+                self._dropped[priority] += 1
+                raise DeadlineExceeded("deadline passed while queued") from None
+            raise
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Optional[int] = None, session: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold one provider slot for the duration of the block (class/session default to the context)."""
+        ctx_priority, ctx_session, weight = _job_class.get()
+        p = ctx_priority if priority is None else priority
+        deadline = _deadline.get()
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        await self._acquire(p, ctx_session if session is None else session, weight, deadline)
+        self._waits[p].append((loop.time() - t0) * 1000.0)
+        try:
+            if deadline is None:
+                yield
+            else:
+                timeout = asyncio.timeout_at(deadline)
+                try:
+                    async with timeout:
+                        yield
+                except TimeoutError:
+                    if not timeout.expired():
+                        raise
+                    self._expired[p] += 1
+                    raise DeadlineExceeded("deadline passed during the provider call")
+        finally:
+            self._release(p)
+
+    def hold_until_done(self, fut: "asyncio.Future[Any]", priority: Optional[int] = None) -> None:
+        """Count one more running call of the class until fut (an abandoned worker thread) finishes."""
+        p = _job_class.get()[0] if priority is None else priority
+        self._running[p] += 1
+        self._abandoned[p] += 1
+
+        def done(f: "asyncio.Future[Any]") -> None:
+            if not f.cancelled():
+                f.exception()  # already reported to nobody; mark it retrieved
+            self._abandoned[p] -= 1
+            self._release(p)
+
+        fut.add_done_callback(done)
+
+    def stats(self) -> Dict[str, Any]:
+        classes: Dict[str, Any] = {}
+        for p, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[p])
+            classes[name] = {
+                "queued": sum(1 for w in self._heaps[p] if not w.fut.done()),
+                "running": self._running[p],
+                "abandoned_running": self._abandoned[p],
+                "submitted": self._submitted[p],
+                "dropped_expired": self._dropped[p],
+                "cancelled_at_deadline": self._expired[p],
+                "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+            }
+        return {"slots": self.slots, "live_reserved": self.live_reserved, "classes": classes}
+
+
+scheduler = TranscriptionScheduler(SCHED_MAX_CONCURRENCY, SCHED_LIVE_RESERVED)
+
+
+def provider_slot(priority: Optional[int] = None, session: Optional[str] = None):
+    """Async context manager: `async with provider_slot(): <one provider call>`."""
+    return scheduler.slot(priority, session)
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """`asyncio.to_thread` for a sync provider call made inside `provider_slot()`.
+
+    If the await is cancelled (deadline, disconnect) while the thread is still
+    running, the slot is kept counted until the thread returns.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    fut = loop.run_in_executor(None, functools.partial(ctx.run, fn, *args))
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        if not fut.done():
+            scheduler.hold_until_done(fut)
+        raise
 
 
 def _choose_mime_order(ext_or_mime: str) -> List[str]:
@@ -28,7 +262,9 @@ async def transcribe_google(raw: bytes, ext_or_mime: str) -> str:
         return ""
     try:
         ext = "ogg" if ("ogg" in (ext_or_mime or "").lower()) else "webm"
-        return await recognize_google_segment(app_state.speech_client, raw, ext)
+        return await recognize_google_segment(app_state.speech_client, raw, ext, timeout=remaining_s())
+    except DeadlineExceeded:
+        raise
     except Exception:
         return ""
 
@@ -109,46 +345,120 @@ def transcribe_gemini_raise(raw: bytes, ext_or_mime: str) -> str:
     return ""
 
 
+def gemini_streaming_enabled() -> bool:
+    return bool(getattr(app_state, 'enable_gemini_streaming', False) and getattr(app_state, 'gemini_model', None) is not None)
+
+
+async def transcribe_gemini_stream(raw: bytes, ext_or_mime: str, on_partial: Callable[[str], Awaitable[None]]) -> str:
+    """Like transcribe_gemini_raise, but with streaming generation.
+
+    `on_partial(text_so_far)` is awaited as text arrives, at most every
+    GEMINI_PARTIAL_INTERVAL_MS; the returned final text supersedes the partials.
+    The next container is only tried if the first fails before any text arrived.
+    """
+    if not (service_enabled("gemini") and getattr(app_state, 'gemini_model', None) is not None):
+        return ""
+    loop = asyncio.get_running_loop()
+    interval = GEMINI_PARTIAL_INTERVAL_MS / 1000.0
+    async with provider_slot():
+        last_exc = None
+        for mt in _choose_mime_order(ext_or_mime):
+            text = ""
+            last_sent = 0.0
+            try:
+                async for delta in stream_gemini_text(app_state.gemini_model, [
+                    {"text": "Transcribe the spoken audio to plain text. Return only the transcript."},
+                    {"mime_type": mt, "data": raw}
+                ], GEMINI_STREAM_TIMEOUT_S, on_abandon=functools.partial(scheduler.hold_until_done, priority=_job_class.get()[0])):
+                    text += delta
+                    now = loop.time()
+                    if now - last_sent >= interval and text.strip():
+                        last_sent = now
+                        try:
+                            await on_partial(text.strip())
+                        except Exception:
+                            pass
+                return text.strip()
+            except Exception as e:
+                if text:
+                    raise
+                last_exc = e
+                continue
+        if last_exc:
+            raise last_exc
+        return ""
+
+
+def translate_text(text: str, prompt: Optional[str] = None, lang: Optional[str] = None) -> str:
+    """Translate text with Gemini using the saved translation prompt/language (or the ones given)."""
+    if not text or getattr(app_state, 'gemini_model', None) is None:
+        return ""
+    prompt = prompt or (app_state.translation_prompt or 'Translate the following text into the TARGET language.')
+    lang = lang or (app_state.translation_lang or 'en')
+    resp = app_state.gemini_model.generate_content([
+        {"text": f"{prompt}\nTARGET: {lang}"},
+        {"text": text}
+    ])
+    return extract_text_from_gemini_response(resp)
+
+
+def translation_enabled() -> bool:
+    return bool(getattr(app_state, 'enable_translation', False) and getattr(app_state, 'gemini_model', None) is not None)
+
+
+def enabled_providers() -> List[str]:
+    """Provider keys that are enabled in the registry and have a configured client."""
+    keys: List[str] = []
+    if service_enabled("google") and app_state.speech_client is not None:
+        keys.append("google")
+    if service_enabled("vertex") and app_state.vertex_client is not None:
+        keys.append("vertex")
+    if service_enabled("gemini") and getattr(app_state, 'gemini_model', None) is not None:
+        keys.append("gemini")
+    if service_enabled("aws"):
+        from server.services import aws_transcribe
+        if aws_transcribe.batch_available():
+            keys.append("aws")
+    return keys
+
+
+async def transcribe_provider(key: str, raw: bytes, ext_or_mime: str) -> str:
+    """Run a single provider under a scheduler slot without blocking the event loop (sync SDKs go to a thread)."""
+    if key == "aws":
+        # Batch jobs wait on AWS's own queue, not on local threads or provider quota
+        from server.services import aws_transcribe
+        return await aws_transcribe.transcribe_batch(raw, ext_or_mime)
+    async with provider_slot():
+        if key == "google":
+            return await transcribe_google(raw, ext_or_mime)
+        if key == "vertex":
+            return await run_blocking(transcribe_vertex, raw, ext_or_mime)
+        if key == "gemini":
+            return await run_blocking(transcribe_gemini, raw, ext_or_mime)
+    return ""
+
+
 async def transcribe_all(raw: bytes, mime: str = "") -> Dict[str, Any]:
     """Return a dict of provider -> transcript (or provider_error keys) for enabled services.
 
     Providers tried: google (async), vertex, gemini. Missing/disabled providers return nothing.
     """
     results: Dict[str, Any] = {}
-    # Google (async)
-    try:
-        txt = await transcribe_google(raw, mime)
-        if txt is not None:
-            results["google"] = txt
-    except Exception as e:
-        results["google_error"] = str(e)
-    # Vertex (sync)
-    try:
-        vtxt = transcribe_vertex(raw, mime)
-        if vtxt is not None:
-            results["vertex"] = vtxt
-    except Exception as e:
-        results["vertex_error"] = str(e)
-    # Gemini (sync)
-    try:
-        gtxt = transcribe_gemini(raw, mime)
-        if gtxt is not None:
-            results["gemini"] = gtxt
-    except Exception as e:
-        results["gemini_error"] = str(e)
+    # Each provider goes through the scheduler (sync SDKs run in a thread)
+    for key in ("google", "vertex", "gemini"):
+        try:
+            txt = await transcribe_provider(key, raw, mime)
+            if txt is not None:
+                results[key] = txt
+        except Exception as e:
+            results[f"{key}_error"] = str(e)
     # Translation (only when enabled)
     try:
-        if getattr(app_state, 'enable_translation', False) and getattr(app_state, 'gemini_model', None) is not None:
+        if translation_enabled():
             base_txt = results.get('google') or results.get('vertex') or results.get('gemini') or ''
             if base_txt:
-                prompt = (app_state.translation_prompt or 'Translate the following text into the TARGET language.')
-                lang = (app_state.translation_lang or 'en')
-                resp = app_state.gemini_model.generate_content([
-                    {"text": f"{prompt}\nTARGET: {lang}"},
-                    {"text": base_txt}
-                ])
-                from server.services.gemini_api import extract_text_from_gemini_response as _extract
-                results['translation'] = _extract(resp)
+                from server.services.translator import translate
+                results['translation'] = await translate(base_txt)
     except Exception as e:
         results['translation_error'] = str(e)
     return results
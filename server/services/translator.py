@@ -0,0 +1,211 @@
+"""
+server/services/translator.py
+
+Translation stage, separate from transcription.
+
+- `translate(text)` queues a text for the micro-batcher and awaits its result.
+  Texts that arrive within TRANSLATION_BATCH_WINDOW_MS of each other (up to
+  TRANSLATION_BATCH_MAX_ITEMS / TRANSLATION_BATCH_MAX_CHARS) are sent to Gemini
+  in one request, separated by numbered markers, and split back apart. If the
+  model drops or merges markers, the missing items fall back to single calls.
+  Each batch runs in its own task (at most TRANSLATION_MAX_INFLIGHT at once)
+  and every request is bounded by TRANSLATION_TIMEOUT_S, so one slow or hung
+  call does not hold up translation for other sessions.
+- Results are cached by (text hash, translation_lang, translation_prompt,
+  model), so repeated or overlapping segments are not translated twice. The
+  key and settings are taken when the text is queued, so a settings change
+  while a batch is in flight does not file its result under the new ones.
+- `schedule_segment_translation` runs off the request path and publishes the
+  result as a `segment_transcript_translation` event on `/events`.
+"""
+import asyncio
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.config import (
+    TRANSLATION_BATCH_WINDOW_MS,
+    TRANSLATION_BATCH_MAX_ITEMS,
+    TRANSLATION_BATCH_MAX_CHARS,
+    TRANSLATION_CACHE_MAX,
+    TRANSLATION_MAX_INFLIGHT,
+    TRANSLATION_TIMEOUT_S,
+)
+from server.state import app_state
+from server.services.gemini_api import extract_text_from_gemini_response
+from server.services.transcription import translate_text
+
+
+_MARKER_RE = re.compile(r"<<<(\d+)>>>")
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+# (text, cache key, (prompt, lang), future), all taken when the text is queued
+Item = Tuple[str, str, Tuple[str, str], asyncio.Future]
+
+
+def _settings() -> Tuple[str, str]:
+    prompt = (app_state.translation_prompt or 'Translate the following text into the TARGET language.')
+    lang = (app_state.translation_lang or 'en')
+    return prompt, lang
+
+
+def cache_key(text: str, settings: Optional[Tuple[str, str]] = None) -> str:
+    prompt, lang = settings or _settings()
+    model = getattr(app_state, 'gemini_model_name', '')
+    return hashlib.sha256(f"{model}\0{lang}\0{prompt}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, value: str) -> None:
+    if not value:
+        return
+    _cache[key] = value
+    _cache.move_to_end(key)
+    while len(_cache) > TRANSLATION_CACHE_MAX:
+        _cache.popitem(last=False)
+
+
+def _translate_batch(texts: List[str], prompt: str, lang: str) -> List[Optional[str]]:
+    """One request for several texts; entries the model did not return are None."""
+    if len(texts) == 1:
+        return [translate_text(texts[0], prompt, lang)]
+    body = "\n".join(f"<<<{i}>>>\n{t}" for i, t in enumerate(texts))
+    resp = app_state.gemini_model.generate_content([
+        {"text": (
+            f"{prompt}\nTARGET: {lang}\n"
+            "The input contains several independent items, each preceded by a marker line like <<<0>>>. "
+            "Translate each item separately and return every marker line unchanged, followed by its translation. "
+            "Return nothing else."
+        )},
+        {"text": body}
+    ])
+    out = extract_text_from_gemini_response(resp) or ""
+    found: Dict[int, str] = {}
+    pieces = _MARKER_RE.split(out)
+    # split() yields [prefix, idx, text, idx, text, ...]
+    for j in range(1, len(pieces) - 1, 2):
+        try:
+            found[int(pieces[j])] = pieces[j + 1].strip()
+        except Exception:
+            continue
+    return [found.get(i) or None for i in range(len(texts))]
+
+
+async def _call(fn: Any, *args: Any) -> Any:
+    """Sync Gemini call in a thread, abandoned after TRANSLATION_TIMEOUT_S."""
+    return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=TRANSLATION_TIMEOUT_S)
+
+
+async def _process(items: List[Item]) -> None:
+    """Translate one collected batch (all items share the settings they were queued with)."""
+    prompt, lang = items[0][2]
+    # Same text queued twice in one window is translated once
+    unique = list(OrderedDict.fromkeys(t for t, _, _, _ in items))
+    result: Dict[str, Any] = {}
+    try:
+        async with _slots:
+            outs = await _call(_translate_batch, unique, prompt, lang)
+            missing = [t for t, o in zip(unique, outs) if o is None]
+            singles = await asyncio.gather(*[_call(translate_text, t, prompt, lang) for t in missing], return_exceptions=True)
+        retry = dict(zip(missing, singles))
+        for t, o in zip(unique, outs):
+            result[t] = o if o is not None else retry.get(t, "")
+    except asyncio.CancelledError:
+        for _, _, _, fut in items:
+            fut.cancel()
+        raise
+    except Exception as e:
+        result = {t: e for t in unique}
+    for t, key, _, fut in items:
+        value = result.get(t, "")
+        if isinstance(value, BaseException):
+            if not fut.done():
+                fut.set_exception(value)
+            continue
+        _remember(key, value)
+        if not fut.done():
+            fut.set_result(value)
+
+
+async def _run() -> None:
+    from server.session_tasks import spawn_background
+
+    loop = asyncio.get_running_loop()
+    while True:
+        batch: List[Item] = [await _queue.get()]
+        chars = len(batch[0][0])
+        deadline = loop.time() + TRANSLATION_BATCH_WINDOW_MS / 1000.0
+        while len(batch) < TRANSLATION_BATCH_MAX_ITEMS and chars < TRANSLATION_BATCH_MAX_CHARS:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(_queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            chars += len(item[0])
+        # One request per settings seen in the window; the collector moves on while they run
+        groups: "OrderedDict[Tuple[str, str], List[Item]]" = OrderedDict()
+        for item in batch:
+            groups.setdefault(item[2], []).append(item)
+        for items in groups.values():
+            spawn_background(_process(items))
+
+
+def _ensure_worker() -> asyncio.Queue:
+    global _queue, _worker, _slots
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, int(TRANSLATION_MAX_INFLIGHT)))
+    if _worker is None or _worker.done():
+        _worker = asyncio.create_task(_run())
+    return _queue
+
+
+async def translate(text: str) -> str:
+    """Translate one text through the cache and the micro-batcher."""
+    text = (text or "").strip()
+    if not text or getattr(app_state, 'gemini_model', None) is None:
+        return ""
+    settings = _settings()
+    key = cache_key(text, settings)
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        return hit
+    fut = asyncio.get_running_loop().create_future()
+    _ensure_worker().put_nowait((text, key, settings, fut))
+    return await fut
+
+
+def schedule_segment_translation(text: str, event: Dict[str, Any]) -> None:
+    """Translate in the background and publish `segment_transcript_translation` with the event fields."""
+    if not (text or "").strip():
+        return
+
+    async def run() -> None:
+        from server.sse_bus import publish as sse_publish
+
+        msg = {"type": "segment_transcript_translation", **event}
+        try:
+            msg["transcript"] = await translate(text)
+        except Exception as e:
+            msg["error"] = str(e)
+        try:
+            from server.segment_store import add_full_piece
+            add_full_piece(event.get("recording_id"), "translation", event.get("idx") or 0, msg.get("transcript") or "", replace=True)
+        except Exception:
+            pass
+        try:
+            await sse_publish(msg)
+        except Exception:
+            pass
+
+    from server.session_tasks import spawn_background
+
+    spawn_background(run())
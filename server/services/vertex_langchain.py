@@ -7,16 +7,21 @@ Currently, LangChain's Vertex integrations focus on text/chat. This adapter
 wraps the Vertex audio transcription using the underlying Vertex client while
 keeping the orchestration entrypoint via LangChain for future prompt flows.
 """
+import importlib.util
 from typing import Optional
 
-try:
-    from langchain_google_vertexai import VertexAI
-except Exception:
-    VertexAI = None  # type: ignore
+_AVAILABLE: Optional[bool] = None
 
 
 def is_available() -> bool:
-    return VertexAI is not None
+    # Checks the package is installed without importing it (langchain is slow to import)
+    global _AVAILABLE
+    if _AVAILABLE is None:
+        try:
+            _AVAILABLE = importlib.util.find_spec("langchain_google_vertexai") is not None
+        except Exception:
+            _AVAILABLE = False
+    return _AVAILABLE
 
 
 def transcribe_segment_via_langchain(vertex_client: object, model_name: str, segment_bytes: bytes, mime_type: str) -> str:
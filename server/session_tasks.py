@@ -0,0 +1,68 @@
+"""
+server/session_tasks.py
+
+Task groups for background work tied to a session.
+
+`asyncio.create_task` only keeps a weak reference to its task, so a task
+nobody holds can be garbage-collected mid-flight, and nothing cancels it when
+its session goes away. `SessionTasks` holds a strong reference to every task it
+spawns until the task finishes, and `close()` either cancels what is still
+running (default) or lets it finish for up to a timeout.
+
+`background` is the process-wide group for fire-and-forget work that has no
+session (translations, AWS batch jobs, provider warm-up).
+"""
+import asyncio
+from typing import Any, Coroutine, Optional, Set
+
+
+class SessionTasks:
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+        self.closed = False
+        self._tasks: Set[asyncio.Task] = set()
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: Optional[str] = None) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Task error ({self.name or 'session'}): {task.exception()}")
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def close(self, drain: bool = False, timeout: float = 0.0) -> int:
+        """Stop the group; returns how many tasks were cancelled.
+
+        drain=True first waits up to `timeout` seconds for outstanding tasks to
+        finish (their results are persisted; sends to the closed client are
+        skipped), then cancels whatever is left.
+        """
+        self.closed = True
+        tasks = list(self._tasks)
+        if drain and tasks and timeout > 0:
+            _, still = await asyncio.wait(tasks, timeout=timeout)
+            tasks = list(still)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
+
+
+background = SessionTasks("background")
+
+
+def spawn_background(coro: Coroutine[Any, Any, Any]) -> Optional[asyncio.Task]:
+    """Fire-and-forget with a held reference; no-op (coroutine closed) without a running loop."""
+    try:
+        return background.spawn(coro)
+    except RuntimeError:
+        coro.close()
+        return None
@@ -3,10 +3,14 @@ server/sse_bus.py
 
 Simple in-memory SSE bus for broadcasting UI events to all connected clients.
 Not multi-tenant secure; sufficient for single-app instance.
+
+Events are encoded once (`server.event_codec.Event`) and the same frame bytes
+are queued to every subscriber.
 """
 import asyncio
-import json
-from typing import AsyncIterator, List
+from typing import AsyncIterator, List, Union
+
+from server.event_codec import Event, as_event
 
 
 _subscribers: List[asyncio.Queue] = []
@@ -28,12 +32,13 @@ async def unsubscribe(q: asyncio.Queue) -> None:
             pass
 
 
-async def publish(message: dict) -> None:
-    data = json.dumps(message)
+async def publish(message: Union[dict, Event]) -> None:
+    """Queue the event's SSE frame (encoded once) for every subscriber."""
+    frame = as_event(message).sse_frame()
     async with _lock:
         for q in list(_subscribers):
             try:
-                q.put_nowait(data)
+                q.put_nowait(frame)
             except Exception:
                 continue
 
@@ -43,18 +48,11 @@ async def stream() -> AsyncIterator[bytes]:
     try:
         while True:
             try:
-                data = await q.get()
+                frame = await q.get()
             except asyncio.CancelledError:
                 break
-            # If payload has a 'type', emit a named SSE event for easier client routing
-            try:
-                obj = json.loads(data)
-                ev = obj.get("type") if isinstance(obj, dict) else None
-            except Exception:
-                ev = None
-            if ev and isinstance(ev, str):
-                yield f"event: {ev}\n".encode("utf-8")
-            yield f"data: {data}\n\n".encode("utf-8")
+            # Frames already carry the named `event:` line (from the payload's 'type') and the data
+            yield frame
     finally:
         await unsubscribe(q)
 
@@ -6,24 +6,76 @@ All initialization occurs here to avoid duplicate global setup across modules.
 """
 import os
 import json
-from typing import Optional, Dict, Any
+import hashlib
+import functools
+from typing import Optional, Dict, Any, Tuple
 
-from google.cloud import speech
+from utils.credentials import ensure_google_credentials_from_env
+from server.config import SAMPLE_RATE_HZ, LANGUAGE_CODE
+from server import provider_clients
 
-try:
-    import google.generativeai as gm
-except Exception:
-    gm = None
 
-try:
-    from google import genai as genai_sdk
-    from google.genai import types as genai_types
-except Exception:
-    genai_sdk = None
-    genai_types = None
+# Provider SDKs are imported on first use (client init), not at import time,
+# so the server can bind its port before the heavy google/grpc modules load.
+@functools.lru_cache(maxsize=None)
+def _speech() -> Any:
+    from google.cloud import speech
+    return speech
 
-from utils.credentials import ensure_google_credentials_from_env
-from server.config import SAMPLE_RATE_HZ, LANGUAGE_CODE
+
+@functools.lru_cache(maxsize=None)
+def _genai() -> Tuple[Any, Any]:
+    try:
+        from google import genai as genai_sdk
+        from google.genai import types as genai_types
+        return genai_sdk, genai_types
+    except Exception:
+        return None, None
+
+
+@functools.lru_cache(maxsize=None)
+def _legacy_gemini() -> Any:
+    try:
+        import google.generativeai as gm
+        return gm
+    except Exception:
+        return None
+
+
+def _key_fingerprint(api_key: Optional[str]) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else ""
+
+
+class _GenaiConsumerAdapter:
+    """Adapter for a google.genai client matching the .generate_content([...]) interface used elsewhere."""
+
+    def __init__(self, client, model_name: str):
+        self._client = client
+        self._model = model_name
+
+    def _normalize(self, contents):
+        _, genai_types = _genai()
+        if genai_types is None:
+            return contents
+        normalized = []
+        for part in contents or []:
+            try:
+                if isinstance(part, dict) and "mime_type" in part and "data" in part:
+                    normalized.append(genai_types.Part.from_bytes(data=part["data"], mime_type=part["mime_type"]))
+                elif isinstance(part, dict) and "text" in part:
+                    normalized.append(part["text"])  # plain text
+                else:
+                    normalized.append(part)
+            except Exception:
+                normalized.append(part)
+        return normalized
+
+    def generate_content(self, contents):
+        return self._client.models.generate_content(model=self._model, contents=self._normalize(contents))
+
+    def generate_content_stream(self, contents):
+        """Iterator of partial responses (each with the next text delta)."""
+        return self._client.models.generate_content_stream(model=self._model, contents=self._normalize(contents))
 
 
 class AppState:
@@ -40,14 +92,17 @@ class AppState:
     """
 
     def __init__(self) -> None:
-        self.speech_client: Optional[speech.SpeechClient] = None
-        self.recognition_config: Optional[speech.RecognitionConfig] = None
-        self.streaming_config: Optional[speech.StreamingRecognitionConfig] = None
+        self.speech_client: Optional[Any] = None
+        self.recognition_config: Optional[Any] = None
+        self.streaming_config: Optional[Any] = None
         self.auth_info: Optional[Dict[str, Any]] = None
 
         self.gemini_model: Optional[object] = None
         self.gemini_api_ready: bool = False
         self.gemini_api_key_masked: str = ""
+        # sha256 of the key the current Gemini client was built with; an unchanged key reuses the client
+        self._gemini_key_fp: str = ""
+        self.gemini_model_name: str = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
         self.vertex_client: Optional[object] = None
         self.vertex_model_name: str = os.environ.get("VERTEX_GEMINI_MODEL", "gemini-2.5-flash")
         # Prompt used to summarize full transcripts per provider
@@ -64,6 +119,8 @@ class AppState:
         # Feature flags
         self.enable_summarization: bool = True
         self.enable_translation: bool = False
+        # Stream Gemini transcripts and forward partial text while a segment is generating
+        self.enable_gemini_streaming: bool = os.environ.get("GEMINI_STREAM_PARTIALS", "1").lower() not in ("0", "false", "no")
 
     def init_google_speech(self) -> None:
         """Initialize Google STT client and masked auth info from env JSON."""
@@ -76,7 +133,8 @@ class AppState:
             with open(credentials_path, 'r') as f:
                 creds_content = f.read()
                 json.loads(creds_content)
-            self.speech_client = speech.SpeechClient()
+            speech = _speech()
+            self.speech_client = provider_clients.build_speech_client(speech)
             self.recognition_config = speech.RecognitionConfig(
                 encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
                 sample_rate_hertz=SAMPLE_RATE_HZ,
@@ -114,38 +172,17 @@ class AppState:
     def init_gemini_api(self) -> None:
         """Initialize consumer Gemini API model if GEMINI_API_KEY is present."""
         gemini_api_key = os.environ.get("GEMINI_API_KEY")
+        genai_sdk, genai_types = _genai()
+        gm = _legacy_gemini()
         # Prefer new google.genai SDK when available; fall back to google.generativeai
         if gemini_api_key:
-            # Adapter for google.genai client to match .generate_content([...]) interface used elsewhere
-            class _GenaiConsumerAdapter:
-                def __init__(self, client, model_name: str):
-                    self._client = client
-                    self._model = model_name
-                def generate_content(self, contents):
-                    # Normalize contents into google.genai types when needed
-                    if genai_types is not None:
-                        normalized = []
-                        for part in contents or []:
-                            try:
-                                if isinstance(part, dict) and "mime_type" in part and "data" in part:
-                                    normalized.append(genai_types.Part.from_bytes(data=part["data"], mime_type=part["mime_type"]))
-                                elif isinstance(part, dict) and "text" in part:
-                                    normalized.append(part["text"])  # plain text
-                                else:
-                                    normalized.append(part)
-                            except Exception:
-                                normalized.append(part)
-                    else:
-                        normalized = contents
-                    return self._client.models.generate_content(model=self._model, contents=normalized)
-
             # Try new SDK first
             if genai_sdk is not None:
                 try:
-                    client = genai_sdk.Client(api_key=gemini_api_key)
-                    # Align with attached gemini.py default model name
-                    self.gemini_model = _GenaiConsumerAdapter(client, "gemini-2.5-flash")
+                    client = provider_clients.build_genai_client(genai_sdk, genai_types, api_key=gemini_api_key)
+                    self.gemini_model = _GenaiConsumerAdapter(client, self.gemini_model_name)
                     self.gemini_api_ready = True
+                    self._gemini_key_fp = _key_fingerprint(gemini_api_key)
                     self.gemini_api_key_masked = (gemini_api_key[:4] + "..." + gemini_api_key[-4:]) if len(gemini_api_key) >= 8 else "***"
                     print("Gemini (google.genai) initialized for parallel transcription.")
                     return
@@ -158,8 +195,9 @@ class AppState:
             if gm is not None:
                 try:
                     gm.configure(api_key=gemini_api_key)
-                    self.gemini_model = gm.GenerativeModel("gemini-2.5-flash")
+                    self.gemini_model = gm.GenerativeModel(self.gemini_model_name)
                     self.gemini_api_ready = True
+                    self._gemini_key_fp = _key_fingerprint(gemini_api_key)
                     self.gemini_api_key_masked = (gemini_api_key[:4] + "..." + gemini_api_key[-4:]) if len(gemini_api_key) >= 8 else "***"
                     print("Gemini (google-generativeai) initialized for parallel transcription.")
                 except Exception as e:
@@ -175,33 +213,25 @@ class AppState:
             print("GEMINI_API_KEY not set; skipping Gemini parallel transcription.")
 
     def set_gemini_api_key(self, api_key: str) -> bool:
-        """Dynamically configure Gemini consumer API with a provided key."""
+        """Dynamically configure Gemini consumer API with a provided key.
+
+        Saving settings with the same key keeps the existing (already warm) client;
+        a new key builds a fresh client and warms it in the background.
+        """
+        fp = _key_fingerprint(api_key)
+        if fp and fp == self._gemini_key_fp and self.gemini_model is not None:
+            return True
+        genai_sdk, genai_types = _genai()
+        gm = _legacy_gemini()
         # Try new google.genai first
         if genai_sdk is not None:
             try:
-                client = genai_sdk.Client(api_key=api_key)
-                class _GenaiConsumerAdapter:
-                    def __init__(self, client, model_name: str):
-                        self._client = client
-                        self._model = model_name
-                    def generate_content(self, contents):
-                        if genai_types is not None:
-                            normalized = []
-                            for part in contents or []:
-                                try:
-                                    if isinstance(part, dict) and "mime_type" in part and "data" in part:
-                                        normalized.append(genai_types.Part.from_bytes(data=part["data"], mime_type=part["mime_type"]))
-                                    elif isinstance(part, dict) and "text" in part:
-                                        normalized.append(part["text"])  # plain text
-                                    else:
-                                        normalized.append(part)
-                                except Exception:
-                                    normalized.append(part)
-                        else:
-                            normalized = contents
-                        return self._client.models.generate_content(model=self._model, contents=normalized)
-                self.gemini_model = _GenaiConsumerAdapter(client, "gemini-2.5-flash")
+                client = provider_clients.build_genai_client(genai_sdk, genai_types, api_key=api_key)
+                self.gemini_model = _GenaiConsumerAdapter(client, self.gemini_model_name)
                 self.gemini_api_ready = True
+                self._gemini_key_fp = fp
+                provider_clients.mark_cold("gemini")
+                provider_clients.schedule_warm_up(["gemini"])
                 self.gemini_api_key_masked = (api_key[:4] + "..." + api_key[-4:]) if isinstance(api_key, str) and len(api_key) >= 8 else "***"
                 return True
             except Exception as e:
@@ -210,8 +240,11 @@ class AppState:
         if gm is not None:
             try:
                 gm.configure(api_key=api_key)
-                self.gemini_model = gm.GenerativeModel("gemini-2.5-flash")
+                self.gemini_model = gm.GenerativeModel(self.gemini_model_name)
                 self.gemini_api_ready = True
+                self._gemini_key_fp = fp
+                provider_clients.mark_cold("gemini")
+                provider_clients.schedule_warm_up(["gemini"])
                 self.gemini_api_key_masked = (api_key[:4] + "..." + api_key[-4:]) if isinstance(api_key, str) and len(api_key) >= 8 else "***"
                 return True
             except Exception as e:
@@ -219,6 +252,7 @@ class AppState:
         self.gemini_model = None
         self.gemini_api_ready = False
         self.gemini_api_key_masked = ""
+        self._gemini_key_fp = ""
         return False
 
     def init_vertex(self) -> None:
@@ -227,10 +261,11 @@ class AppState:
         if not vertex_project and self.auth_info and self.auth_info.get("project_id"):
             vertex_project = str(self.auth_info.get("project_id"))
         vertex_location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+        genai_sdk, genai_types = _genai()
 
         if genai_sdk is not None and vertex_project:
             try:
-                self.vertex_client = genai_sdk.Client(vertexai=True, project=vertex_project, location=vertex_location)
+                self.vertex_client = provider_clients.build_genai_client(genai_sdk, genai_types, vertexai=True, project=vertex_project, location=vertex_location)
                 print(f"Google Gen AI SDK (Vertex backend) initialized for project={vertex_project} location={vertex_location}.")
             except Exception as e:
                 print(f"Error initializing Google Gen AI SDK (Vertex backend): {e}")
@@ -241,6 +276,14 @@ class AppState:
             elif not vertex_project:
                 print("GOOGLE_CLOUD_PROJECT not set and could not infer; skipping Vertex AI Gemini.")
 
+    def init_providers(self) -> None:
+        """Initialize all provider clients (run off the event loop at startup)."""
+        for init in (self.init_google_speech, self.init_gemini_api, self.init_vertex):
+            try:
+                init()
+            except Exception as e:
+                print(f"Error initializing app_state ({init.__name__}): {e}")
+
 app_state = AppState()
 
 
@@ -89,6 +89,11 @@ def build_settings_modal() -> Any:
                 style="margin-bottom:8px;display:grid;grid-template-columns:1fr auto;gap:8px"
             ),
             Div(id="geminiSaveMsg", style="min-height:18px;margin-bottom:8px"),
+            Div(
+                Input(type="checkbox", id="enableGeminiStreaming", name="enable_gemini_streaming", checked=bool(getattr(app_state, 'enable_gemini_streaming', True))),
+                Label("Stream Gemini transcripts (show partial text while generating)", _for="enableGeminiStreaming"),
+                style="display:flex;gap:8px;align-items:center;margin-bottom:8px"
+            ),
             Hr(),
             H5("Transcribe Test"),
             Div(Audio(controls=True, id="testAudio", style="width:100%")),
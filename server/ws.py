@@ -192,7 +192,7 @@ async def ws_handler(websocket: WebSocket) -> None:
                         if transcribe_enabled and service_enabled("aws") and aws_transcribe.is_available():
                             async def do_aws(idx: int, b: bytes, ext: str):
                                 try:
-                                    text = aws_transcribe.recognize_segment_placeholder(b, media_format=("ogg" if ext=="ogg" else "webm"))
+                                    text = await aws_transcribe.recognize_segment(b, session_key=f"ws_{session_ts}")
                                     await websocket.send_json({"type": "segment_transcript_aws", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts})
                                 except Exception as e:
                                     print(f"WS error aws segment: {e}")
@@ -231,29 +231,125 @@ import asyncio
 import json
 import queue
 import time
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 
 from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
-from google.cloud import speech
 
 from server.state import app_state
-from server.config import SAMPLE_RATE_HZ
+from server.config import SAMPLE_RATE_HZ, WS_DRAIN_ON_DISCONNECT, WS_DRAIN_TIMEOUT_S, WS_RESUME_GRACE_S, WS_OUTBOX_FLUSH_S, WS_REORDER_ENABLED
 from server.services.google_stt import recognize_segment as recognize_google_segment
 from server.services.vertex_gemini import build_vertex_contents, extract_text_from_vertex_response
 from server.services.vertex_langchain import is_available as lc_vertex_available, transcribe_segment_via_langchain
 from server.services.gemini_api import extract_text_from_gemini_response
 from server.services.transcription import transcribe_gemini as tx_gemini
-from google import genai as genai_api
+from server.services.transcription import transcribe_gemini_stream as tx_gemini_stream, gemini_streaming_enabled
+from server.services.transcription import PRIORITY_LIVE, provider_slot, run_blocking, set_job_class, set_segment_deadline, remaining_s
+from server.session_tasks import SessionTasks, spawn_background
+from server.ws_outbox import Outbox
+from server.reorder import Sequencer
+from server.segment_audio import SegmentAudio
+from server import disk_writer
+from server.event_codec import Event
 from server.services.registry import is_enabled as service_enabled
 from server.services import aws_transcribe
 from server.sse_bus import publish as sse_publish
-from server.segment_store import insert_segment, append_transcript
+from server.segment_store import insert_segment, append_transcript, get_segment, ingest_key, claim_ingest, complete_ingest, release_ingest
 
 
 def now_ms() -> int:
     return int(round(time.time() * 1000))
 
 
+class WSSession:
+    """State of one WS recording session that outlives a connection, so a client can resume it after a drop."""
+
+    def __init__(self, session_ts: int, session_dir: str, server_ext: str, server_filename: str, server_filepath: str) -> None:
+        self.session_ts = session_ts
+        self.session_id = str(session_ts)
+        # Client's id for the recording (its startTs); server-side transcripts are keyed by it, as on /segment_upload
+        self.recording_id = str(session_ts)
+        self.session_dir = session_dir
+        self.server_ext = server_ext
+        self.server_filename = server_filename
+        self.server_filepath = server_filepath
+        self.segment_index = 0
+        self.received: Dict[int, Optional[int]] = {}  # client idx -> segment_id of saved segments
+        self.tasks = SessionTasks(f"ws_{session_ts}")
+        self.websocket: Optional[WebSocket] = None
+        self.outbox: Optional[Outbox] = None
+        self.sequencer: Optional[Sequencer] = None
+        self.resumable = False
+        self.expiry: Optional[asyncio.Task] = None
+
+    def resume_info(self, last_idx: int) -> Dict[str, Any]:
+        """Segments after the client's last acknowledged idx that the server has, and the gaps among them."""
+        have = sorted(i for i in self.received if i > last_idx)
+        top = have[-1] if have else last_idx
+        missing = [i for i in range(last_idx + 1, top) if i not in self.received]
+        return {"received": have, "missing": missing, "next_idx": top + 1}
+
+
+# Sessions whose client spoke the resume protocol, kept for WS_RESUME_GRACE_S after a disconnect
+_sessions: Dict[str, WSSession] = {}
+
+
+async def _close_session_work(sess: WSSession) -> None:
+    """Cancel (or drain) the session's outstanding provider work and close its AWS stream."""
+    if sess.outbox is not None:
+        await sess.outbox.close()
+    try:
+        pending = sess.tasks.pending
+        cancelled = await sess.tasks.close(drain=WS_DRAIN_ON_DISCONNECT, timeout=WS_DRAIN_TIMEOUT_S)
+        if pending:
+            print(f"WS session {sess.session_id} closed: {pending} provider task(s) outstanding, {cancelled} cancelled")
+    except Exception:
+        pass
+    if sess.sequencer is not None:
+        sess.sequencer.stop()
+    try:
+        await aws_transcribe.close_session(f"ws_{sess.session_ts}")
+    except Exception:
+        pass
+
+
+async def _expire_session(sess: WSSession) -> None:
+    await asyncio.sleep(WS_RESUME_GRACE_S)
+    if sess.websocket is not None:
+        return
+    _sessions.pop(sess.session_id, None)
+    await _close_session_work(sess)
+
+
+def _resume_session(session_id: str, websocket: WebSocket) -> Optional[WSSession]:
+    """Reattach a kept session (cancelling its expiry), or rebuild one from its directory after a restart."""
+    sess = _sessions.get(session_id)
+    if sess is None:
+        if not session_id.isdigit():
+            return None
+        recordings_dir = os.path.join(str(Path(__file__).resolve().parents[1]), "static", "recordings")
+        session_dir = os.path.join(recordings_dir, f"session_{session_id}")
+        if not os.path.isdir(session_dir):
+            return None
+        filename = f"recording_{session_id}.webm"
+        if os.path.exists(os.path.join(recordings_dir, f"recording_{session_id}.ogg")):
+            filename = f"recording_{session_id}.ogg"
+        sess = WSSession(int(session_id), session_dir, filename.rsplit(".", 1)[-1], filename, os.path.join(recordings_dir, filename))
+        # Files survive a restart but the client idx mapping does not: continue numbering, report nothing received
+        indices = []
+        for name in os.listdir(session_dir):
+            try:
+                indices.append(int(name.split("_", 1)[1].split(".", 1)[0]))
+            except Exception:
+                pass
+        sess.segment_index = max(indices) + 1 if indices else 0
+        _sessions[session_id] = sess
+    if sess.expiry is not None:
+        sess.expiry.cancel()
+        sess.expiry = None
+    sess.websocket = websocket
+    return sess
+
+
 async def ws_handler(websocket: WebSocket) -> None:
     requests_q = queue.Queue()
     pcm_requests_q = queue.Queue()
@@ -266,25 +362,94 @@ async def ws_handler(websocket: WebSocket) -> None:
     server_ext = "webm"  # will adjust to 'ogg' if client reports OGG
     server_filename = f"recording_{session_ts}.{server_ext}"
     server_filepath = os.path.join(recordings_dir, server_filename)
-    server_file = open(server_filepath, "ab")
+    # File writes go through the disk writer thread; the empty append just creates the file
+    disk_writer.append(server_filepath, b"")
 
     session_dir = os.path.join(recordings_dir, f"session_{session_ts}")
     os.makedirs(session_dir, exist_ok=True)
     segment_index = 0
-    # Gemini throttling is not required when using the centralized helper, keep simple
+    # Provider calls from this session (and the tasks it starts) are scheduled as live work
+    set_job_class(PRIORITY_LIVE, f"ws_{session_ts}")
+    # Session state kept across reconnects when the client resumes it (hello with session_id)
+    sess = WSSession(session_ts, session_dir, server_ext, server_filename, server_filepath)
+    sess.websocket = websocket
+    # All sends go through one writer per connection; callers never wait on the socket
+    outbox = Outbox(websocket, f"ws_{session_ts}")
+    outbox.start()
+    sess.outbox = outbox
+    # Provider work for this session; cancelled (or drained) when the client disconnects
+    session_tasks = sess.tasks
 
-    async def safe_send_json(payload: dict) -> None:
-        """Attempt to send a JSON message; ignore if socket is closed or send fails."""
+    async def safe_send_json(payload: Union[dict, Event]) -> None:
+        """Queue a JSON message on the connection's outbox; never waits on the socket."""
         try:
-            if websocket.application_state == WebSocketState.DISCONNECTED or websocket.client_state == WebSocketState.DISCONNECTED:
+            # Resolved per send: results of tasks started before a reconnect go to the resumed connection
+            if sess.outbox is None or sess.tasks.closed:
                 return
-            await websocket.send_json(payload)
+            sess.outbox.put(payload)
+        except Exception:
+            pass
+
+    async def emit(msg: dict) -> None:
+        """Encode once; queue the same bytes for this socket and every SSE subscriber."""
+        event = Event(msg)
+        await safe_send_json(event)
+        try:
+            await sse_publish(event)
+        except Exception:
+            pass
+
+    async def emit_ordered(provider: str, idx: int, msg: dict) -> None:
+        """Final per-segment result: released in idx order through the session's sequencer when enabled."""
+        if sess.sequencer is not None and sess.sequencer.push(provider, idx, msg):
+            return
+        if sess.sequencer is not None:
+            msg["late"] = True
+        await emit(msg)
+
+    async def finish_ingest(key: Any, seg_tasks: Dict[str, asyncio.Task], ev: dict, audio: SegmentAudio) -> None:
+        """Resolve the segment's ingest entry once its provider tasks finish; release it if they are cancelled."""
+        try:
+            await asyncio.gather(*seg_tasks.values())
+        except asyncio.CancelledError:
+            release_ingest(key)
+            raise
+        finally:
+            audio.release()
+        # Nothing dispatched (transcription off): do not keep, so a later resend still transcribes
+        complete_ingest(key, {"segment_id": ev.get("segment_id"), "url": ev.get("url"), "idx": ev.get("idx"), "providers": list(seg_tasks)}, keep=bool(seg_tasks))
+        # Feed the rolling summary (as /segment_upload does) so Stop only has to merge the last delta
+        try:
+            row = get_segment(ev["segment_id"]) if ev.get("segment_id") else None
+            transcripts = (row or {}).get("transcripts") or {}
+            results = {prov: transcripts.get(prov) for prov in seg_tasks if transcripts.get(prov)}
+            if results:
+                from server.services.summarizer import observe_segment
+                observe_segment(ev.get("recording_id"), ev.get("idx"), results)
         except Exception:
-            # Swallow any send errors to avoid bubbling up after client disconnects
             pass
 
+    async def replay_ingest(fut: "asyncio.Future", client_id: Any, client_ts: Any) -> None:
+        """Duplicate segment: wait for the original job and send its saved event and transcripts."""
+        try:
+            done = await asyncio.shield(fut)
+        except Exception as e:
+            print(f"WS duplicate segment dropped: {e}")
+            return
+        row = get_segment(done["segment_id"]) if done.get("segment_id") else None
+        transcripts = (row or {}).get("transcripts") or {}
+        await safe_send_json({"type": "segment_saved", "idx": done.get("idx"), "url": done.get("url"), "id": client_id, "ts": client_ts, "status": "ws_duplicate", "segment_id": done.get("segment_id"), "duplicate": True})
+        for prov in done.get("providers") or []:
+            await safe_send_json({"type": f"segment_transcript_{prov}", "idx": done.get("idx"), "transcript": transcripts.get(prov, ""), "id": client_id, "ts": client_ts, "segment_id": done.get("segment_id"), "duplicate": True})
+
+    # Per-session reorder buffer for segment_transcript_* events (see server/reorder.py)
+    if WS_REORDER_ENABLED:
+        sess.sequencer = Sequencer(emit)
+        sess.sequencer.start()
+
     async def receive_from_frontend() -> None:
-        nonlocal segment_index
+        nonlocal segment_index, sess, session_tasks, session_ts, session_dir
+        nonlocal server_ext, server_filename, server_filepath
         try:
             transcribe_enabled = False
             while True:
@@ -315,7 +480,44 @@ async def ws_handler(websocket: WebSocket) -> None:
                     break
 
                 if mtype == "hello":
-                    await safe_send_json({"type": "ready"})
+                    # Resume handshake: {"type": "hello", "resume": true} on first connect, then
+                    # {"type": "hello", "session_id": ..., "last_idx": <last acknowledged client idx>} on reconnect
+                    resumed = False
+                    resume_id = str(message.get("session_id") or "")
+                    if resume_id and resume_id != sess.session_id:
+                        prev = _resume_session(resume_id, websocket)
+                        if prev is not None:
+                            # Drop the empty recording file/dir this connection opened and adopt the earlier session
+                            try:
+                                if await disk_writer.close(server_filepath) == 0:
+                                    os.remove(server_filepath)
+                                os.rmdir(session_dir)
+                            except Exception:
+                                pass
+                            if sess.sequencer is not None:
+                                sess.sequencer.stop()
+                            sess = prev
+                            # Messages still queued for the dropped connection go out on this one
+                            if sess.outbox is not None:
+                                outbox.adopt(sess.outbox)
+                            sess.outbox = outbox
+                            session_tasks = sess.tasks
+                            session_ts, session_dir, segment_index = sess.session_ts, sess.session_dir, sess.segment_index
+                            server_ext, server_filename, server_filepath = sess.server_ext, sess.server_filename, sess.server_filepath
+                            set_job_class(PRIORITY_LIVE, f"ws_{session_ts}")
+                            resumed = True
+                            print(f"WS: resumed session {session_ts} at segment {segment_index}")
+                    # A client that speaks the protocol (resume: true or a session_id) keeps its session for WS_RESUME_GRACE_S after a drop
+                    if message.get("resume") or resume_id:
+                        sess.resumable = True
+                        _sessions[sess.session_id] = sess
+                    if message.get("recording_id"):
+                        sess.recording_id = str(message.get("recording_id"))
+                    try:
+                        last_idx = int(message.get("last_idx", -1))
+                    except Exception:
+                        last_idx = -1
+                    await safe_send_json({"type": "ready", "session_id": sess.session_id, "resumed": resumed, **sess.resume_info(last_idx)})
                     try:
                         await sse_publish({"type": "ready"})
                     except Exception:
@@ -323,50 +525,26 @@ async def ws_handler(websocket: WebSocket) -> None:
                     continue
                 if mtype == "ping":
                     ts = now_ms()
-                    await safe_send_json({"type": "pong", "ts": ts})
-                    try:
-                        await sse_publish({"type": "pong", "ts": ts})
-                    except Exception:
-                        pass
+                    await emit({"type": "pong", "ts": ts})
                     continue
                 if mtype == "ping_start":
-                    await safe_send_json({"type": "ack", "what": "start"})
-                    try:
-                        await sse_publish({"type": "ack", "what": "start"})
-                    except Exception:
-                        pass
+                    await emit({"type": "ack", "what": "start"})
                     continue
                 if mtype == "ping_stop":
-                    await safe_send_json({"type": "ack", "what": "stop"})
-                    try:
-                        await sse_publish({"type": "ack", "what": "stop"})
-                    except Exception:
-                        pass
+                    await emit({"type": "ack", "what": "stop"})
                     continue
                 if mtype == "transcribe":
                     transcribe_enabled = bool(message.get("enabled", False))
-                    await safe_send_json({"type": "ack", "what": "transcribe", "enabled": transcribe_enabled})
-                    try:
-                        await sse_publish({"type": "ack", "what": "transcribe", "enabled": transcribe_enabled})
-                    except Exception:
-                        pass
+                    await emit({"type": "ack", "what": "transcribe", "enabled": transcribe_enabled})
                     if transcribe_enabled:
                         auth_msg = {
                             "type": "auth",
                             "ready": bool(app_state.speech_client and app_state.streaming_config),
                             "info": app_state.auth_info or {}
                         }
-                        await safe_send_json(auth_msg)
-                        try:
-                            await sse_publish(auth_msg)
-                        except Exception:
-                            pass
+                        await emit(auth_msg)
                         status_msg = {"type": "status", "message": "Transcribing... awaiting results"}
-                        await safe_send_json(status_msg)
-                        try:
-                            await sse_publish(status_msg)
-                        except Exception:
-                            pass
+                        await emit(status_msg)
                     continue
                 if mtype == "full_upload" and message.get("audio"):
                     try:
@@ -378,44 +556,34 @@ async def ws_handler(websocket: WebSocket) -> None:
                         except Exception:
                             new_ext = "webm"
                         # If ext changes, update filename/filepath before writing
-                        nonlocal server_ext, server_filename, server_filepath
                         if new_ext != server_ext:
+                            # Release the handle on the file opened under the old extension
+                            disk_writer.close(server_filepath)
                             server_ext = new_ext
                             server_filename = f"recording_{session_ts}.{server_ext}"
                             server_filepath = os.path.join(recordings_dir, server_filename)
-                        try:
-                            if not server_file.closed:
-                                server_file.close()
-                        except Exception:
-                            pass
-                        with open(server_filepath, "wb") as sf:
-                            sf.write(decoded_full)
+                            sess.server_ext, sess.server_filename, sess.server_filepath = server_ext, server_filename, server_filepath
+                        await disk_writer.write_file(server_filepath, decoded_full)
                         saved_url = f"/static/recordings/{server_filename}"
                         saved = {"type": "saved", "url": saved_url, "size": len(decoded_full)}
-                        await safe_send_json(saved)
-                        try:
-                            await sse_publish(saved)
-                        except Exception:
-                            pass
+                        await emit(saved)
                     except Exception as e:
                         print(f"WS error full_upload: {e}")
                     continue
                 if "end_stream" in message and message["end_stream"]:
+                    # Explicit end: nothing to resume, release the session's work on disconnect as usual
+                    sess.resumable = False
+                    _sessions.pop(sess.session_id, None)
                     try:
-                        if not server_file.closed:
-                            server_file.flush(); server_file.close()
                         saved_url = f"/static/recordings/{server_filename}"
                         size_bytes = 0
                         try:
-                            size_bytes = os.path.getsize(server_filepath)
+                            # Resolves once every queued chunk is written and the file is closed
+                            size_bytes = await disk_writer.close(server_filepath)
                         except Exception:
                             pass
                         saved = {"type": "saved", "url": saved_url, "size": size_bytes}
-                        await safe_send_json(saved)
-                        try:
-                            await sse_publish(saved)
-                        except Exception:
-                            pass
+                        await emit(saved)
                     except Exception as e:
                         print(f"WS error end_stream save: {e}")
                     break
@@ -423,20 +591,35 @@ async def ws_handler(websocket: WebSocket) -> None:
                 audio_data_b64 = message.get("audio")
                 pcm_b64 = message.get("pcm16")
                 if mtype == "segment" and audio_data_b64:
+                    ingest = None
+                    seg_audio = None
                     try:
                         seg_bytes = base64.b64decode(audio_data_b64)
                         client_mime = (message.get("mime") or "").lower()
                         seg_ext = "ogg" if ("ogg" in client_mime) else "webm"
-                        seg_path = os.path.join(session_dir, f"segment_{segment_index}.{seg_ext}")
-                        with open(seg_path, "wb") as sf:
-                            sf.write(seg_bytes)
-                        seg_url = f"/static/recordings/session_{session_ts}/segment_{segment_index}.{seg_ext}"
                         client_id = message.get("id")
                         client_ts = message.get("ts") or now_ms()
+                        # A resend (e.g. after reconnect) replays the original job's results instead of re-transcribing
+                        try:
+                            client_idx = int(message["idx"] if message.get("idx") is not None else client_id)
+                        except Exception:
+                            client_idx = segment_index
+                        if message.get("recording_id"):
+                            sess.recording_id = str(message.get("recording_id"))
+                        key = ingest_key(sess.recording_id, client_idx, seg_bytes)
+                        fut, owner = claim_ingest(key)
+                        if not owner:
+                            session_tasks.spawn(replay_ingest(fut, client_id, client_ts))
+                            continue
+                        ingest = key
+                        seg_path = os.path.join(session_dir, f"segment_{segment_index}.{seg_ext}")
+                        # Written by the disk writer thread; segment_saved goes out once the file is on disk
+                        await disk_writer.write_file(seg_path, seg_bytes)
+                        seg_url = f"/static/recordings/session_{session_ts}/segment_{segment_index}.{seg_ext}"
                         # Insert into in-memory segment table and get segment_id
                         try:
                             row = insert_segment(
-                                recording_id=str(session_ts),
+                                recording_id=sess.recording_id,
                                 idx=segment_index,
                                 url=seg_url,
                                 mime=client_mime,
@@ -449,6 +632,7 @@ async def ws_handler(websocket: WebSocket) -> None:
                             segment_id = row.get("segment_id")
                         except Exception:
                             segment_id = None
+                        sess.received[client_idx] = segment_id
                         ev = {
                             "type": "segment_saved",
                             "idx": segment_index,
@@ -459,50 +643,55 @@ async def ws_handler(websocket: WebSocket) -> None:
                             "ext": seg_ext,
                             "mime": client_mime,
                             "size": len(seg_bytes),
-                            "segment_id": segment_id
+                            "segment_id": segment_id,
+                            "client_idx": client_idx,
+                            "recording_id": sess.recording_id
                         }
-                        await safe_send_json(ev)
-                        try:
-                            await sse_publish(ev)
-                        except Exception:
-                            pass
+                        await emit(ev)
+                        # Payload for the provider tasks: in RAM within SEGMENT_MEMORY_BUDGET_MB, else re-read from seg_path
+                        seg_audio = SegmentAudio(seg_path, seg_bytes)
+                        # Provider tasks created below inherit this segment's deadline
+                        set_segment_deadline(int(message.get("duration_ms") or 10000))
+                        seg_tasks: Dict[str, asyncio.Task] = {}
+                        # The do_* tasks outlive this iteration: per-segment ids are passed in, not read from the loop's variables
                         # Dispatch Google STT per-segment
                         if transcribe_enabled and service_enabled("google") and app_state.speech_client is not None:
-                            async def do_google(idx: int, b: bytes, ext: str):
+                            async def do_google(idx: int, audio: SegmentAudio, ext: str, segment_id: Optional[int], client_id: Any, client_ts: int):
                                 try:
-                                    text = await recognize_google_segment(app_state.speech_client, b, ext)
+                                    async with provider_slot():
+                                        # Spilled segments are read back from disk only once a slot is held
+                                        b = await audio.read_async()
+                                        text = await recognize_google_segment(app_state.speech_client, b, ext, timeout=remaining_s())
                                     try:
                                         print(f"WS google idx={idx} text_len={len(text or '')}")
                                     except Exception:
                                         pass
                                     try:
-                                        if ev.get("segment_id") and text:
-                                            append_transcript(int(ev["segment_id"]), "google", text)
+                                        if segment_id and text:
+                                            append_transcript(int(segment_id), "google", text)
                                     except Exception:
                                         pass
                                     # Emit only provider-specific event to avoid duplicates on the frontend
-                                    msg = {"type": "segment_transcript_google", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": ev.get("segment_id")}
-                                    await safe_send_json(msg)
-                                    try:
-                                        await sse_publish(msg)
-                                    except Exception:
-                                        pass
+                                    msg = {"type": "segment_transcript_google", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                    await emit_ordered("google", idx, msg)
                                 except Exception as e:
                                     print(f"WS error google segment: {e}")
-                            asyncio.create_task(do_google(segment_index, seg_bytes, seg_ext))
+                            seg_tasks["google"] = session_tasks.spawn(do_google(segment_index, seg_audio, seg_ext, segment_id, client_id, client_ts))
                         # Dispatch Vertex per-segment if available
                         if transcribe_enabled and service_enabled("vertex") and app_state.vertex_client is not None:
                             print(f"WS dispatch: vertex idx={segment_index} ext={seg_ext}")
-                            async def do_vertex(idx: int, b: bytes, ext: str):
+                            async def do_vertex(idx: int, audio: SegmentAudio, ext: str, segment_id: Optional[int], client_id: Any, client_ts: int):
                                 try:
-                                    order = ["audio/ogg", "audio/webm"] if ext == "ogg" else ["audio/webm", "audio/ogg"]
-                                    text = ""
-                                    if lc_vertex_available():
-                                        for mt in order:
-                                            text = transcribe_segment_via_langchain(app_state.vertex_client, app_state.vertex_model_name, b, mt)
-                                            if text:
-                                                break
-                                    else:
+                                    def call_vertex() -> str:
+                                        b = audio.read()
+                                        order = ["audio/ogg", "audio/webm"] if ext == "ogg" else ["audio/webm", "audio/ogg"]
+                                        text = ""
+                                        if lc_vertex_available():
+                                            for mt in order:
+                                                text = transcribe_segment_via_langchain(app_state.vertex_client, app_state.vertex_model_name, b, mt)
+                                                if text:
+                                                    break
+                                            return text
                                         resp = None
                                         last_exc = None
                                         for mt in order:
@@ -517,32 +706,39 @@ async def ws_handler(websocket: WebSocket) -> None:
                                                 continue
                                         if resp is None and last_exc:
                                             raise last_exc
-                                        text = extract_text_from_vertex_response(resp)
+                                        return extract_text_from_vertex_response(resp)
+                                    # Sync SDK call runs in a thread while holding a scheduler slot
+                                    async with provider_slot():
+                                        text = await run_blocking(call_vertex)
                                     try:
                                         print(f"WS vertex idx={idx} text_len={len(text or '')}")
                                     except Exception:
                                         pass
                                     try:
-                                        if ev.get("segment_id") and text:
-                                            append_transcript(int(ev["segment_id"]), "vertex", text)
-                                    except Exception:
-                                        pass
-                                    msg = {"type": "segment_transcript_vertex", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": ev.get("segment_id")}
-                                    await safe_send_json(msg)
-                                    try:
-                                        await sse_publish(msg)
+                                        if segment_id and text:
+                                            append_transcript(int(segment_id), "vertex", text)
                                     except Exception:
                                         pass
+                                    msg = {"type": "segment_transcript_vertex", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                    await emit_ordered("vertex", idx, msg)
                                 except Exception as e:
                                     print(f"WS error vertex segment: {e}")
-                            asyncio.create_task(do_vertex(segment_index, seg_bytes, seg_ext))
+                            seg_tasks["vertex"] = session_tasks.spawn(do_vertex(segment_index, seg_audio, seg_ext, segment_id, client_id, client_ts))
                         # Dispatch Gemini using the centralized helper (identical to /test_transcribe path)
                         if transcribe_enabled and service_enabled("gemini") and getattr(app_state, 'gemini_model', None) is not None:
                             print(f"WS dispatch: gemini idx={segment_index} ext={seg_ext} bytes={len(seg_bytes)}")
-                            async def do_gemini(idx: int, b: bytes, ext: str):
+                            async def do_gemini(idx: int, audio: SegmentAudio, ext: str, segment_id: Optional[int], client_id: Any, client_ts: int):
                                 try:
                                     mime_hint = "audio/ogg" if ext == "ogg" else "audio/webm"
-                                    text = tx_gemini(b, mime_hint)
+                                    if gemini_streaming_enabled():
+                                        # Forward text as it is generated; the final event below replaces it
+                                        async def on_partial(partial: str) -> None:
+                                            pmsg = {"type": "segment_transcript_gemini_partial", "idx": idx, "transcript": partial, "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                            await emit(pmsg)
+                                        text = await tx_gemini_stream(await audio.read_async(), mime_hint, on_partial)
+                                    else:
+                                        async with provider_slot():
+                                            text = await run_blocking(tx_gemini, await audio.read_async(), mime_hint)
                                     try:
                                         print(f"WS gemini transcript idx={idx} text_len={len(text or '')}")
                                     except Exception:
@@ -553,63 +749,68 @@ async def ws_handler(websocket: WebSocket) -> None:
                                     except Exception:
                                         pass
                                     try:
-                                        if ev.get("segment_id") and text:
-                                            append_transcript(int(ev["segment_id"]), "gemini", text)
-                                    except Exception:
-                                        pass
-                                    msg = {"type": "segment_transcript_gemini", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": ev.get("segment_id")}
-                                    await safe_send_json(msg)
-                                    try:
-                                        await sse_publish(msg)
+                                        if segment_id and text:
+                                            append_transcript(int(segment_id), "gemini", text)
                                     except Exception:
                                         pass
+                                    msg = {"type": "segment_transcript_gemini", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                    await emit_ordered("gemini", idx, msg)
                                 except Exception as e:
                                     print(f"WS error gemini segment: {e}")
                                     try:
-                                        err_msg = {"type": "segment_transcript_gemini", "idx": idx, "error": str(e), "id": client_id, "ts": client_ts, "segment_id": ev.get("segment_id")}
-                                        await safe_send_json(err_msg)
-                                        try:
-                                            await sse_publish(err_msg)
-                                        except Exception:
-                                            pass
+                                        err_msg = {"type": "segment_transcript_gemini", "idx": idx, "error": str(e), "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                        await emit_ordered("gemini", idx, err_msg)
                                     except Exception:
                                         pass
-                            asyncio.create_task(do_gemini(segment_index, seg_bytes, seg_ext))
+                            seg_tasks["gemini"] = session_tasks.spawn(do_gemini(segment_index, seg_audio, seg_ext, segment_id, client_id, client_ts))
 
-                        # Dispatch AWS Transcribe (placeholder) if enabled and available
+                        # Dispatch AWS Transcribe streaming if enabled and available (one stream per WS session)
                         if transcribe_enabled and service_enabled("aws") and aws_transcribe.is_available():
                             print(f"WS dispatch: aws idx={segment_index} ext={seg_ext}")
-                            async def do_aws(idx: int, b: bytes, ext: str):
+                            async def do_aws(idx: int, audio: SegmentAudio, ext: str, segment_id: Optional[int], client_id: Any, client_ts: int):
                                 try:
-                                    # Placeholder returns empty string; can be expanded to S3+job flow
-                                    text = aws_transcribe.recognize_segment_placeholder(b, media_format=("ogg" if ext=="ogg" else "webm"))
+                                    # The slot is taken inside the session's stream lock, and the audio read under it
+                                    text = await aws_transcribe.recognize_segment(audio.read_async, session_key=f"ws_{session_ts}", slot=provider_slot)
                                     try:
                                         print(f"WS aws idx={idx} text_len={len(text or '')}")
                                     except Exception:
                                         pass
                                     try:
-                                        if ev.get("segment_id") and text:
-                                            append_transcript(int(ev["segment_id"]), "aws", text)
+                                        if segment_id and text:
+                                            append_transcript(int(segment_id), "aws", text)
                                     except Exception:
                                         pass
-                                    msg = {"type": "segment_transcript_aws", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": ev.get("segment_id")}
-                                    await safe_send_json(msg)
+                                    msg = {"type": "segment_transcript_aws", "idx": idx, "transcript": text, "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                    await emit_ordered("aws", idx, msg)
+                                except Exception as e:
+                                    print(f"WS error aws segment: {e}")
                                     try:
-                                        await sse_publish(msg)
+                                        err_msg = {"type": "segment_transcript_aws", "idx": idx, "error": str(e), "id": client_id, "ts": client_ts, "segment_id": segment_id}
+                                        await emit_ordered("aws", idx, err_msg)
                                     except Exception:
                                         pass
-                                except Exception as e:
-                                    print(f"WS error aws segment: {e}")
-                            asyncio.create_task(do_aws(segment_index, seg_bytes, seg_ext))
+                            seg_tasks["aws"] = session_tasks.spawn(do_aws(segment_index, seg_audio, seg_ext, segment_id, client_id, client_ts))
+                        if sess.sequencer is not None:
+                            for prov, task in seg_tasks.items():
+                                sess.sequencer.expect(prov, segment_index)
+                                task.add_done_callback(lambda _t, prov=prov, i=segment_index: sess.sequencer.settle(prov, i))
+                        session_tasks.spawn(finish_ingest(ingest, seg_tasks, ev, seg_audio))
+                        ingest = None
                         segment_index += 1
+                        sess.segment_index = segment_index
                     except Exception as e:
                         print(f"WS error segment save: {e}")
+                        if ingest:
+                            release_ingest(ingest)
+                            if seg_audio is not None:
+                                seg_audio.release()
                     continue
 
                 if audio_data_b64:
                     try:
                         decoded_chunk = base64.b64decode(audio_data_b64)
-                        server_file.write(decoded_chunk); server_file.flush()
+                        # Not awaited: chunks are queued in order and coalesced by the writer
+                        disk_writer.append(server_filepath, decoded_chunk)
                     except Exception as e:
                         print(f"WS error writing chunk: {e}")
                 elif pcm_b64 and transcribe_enabled and app_state.speech_client and app_state.streaming_config:
@@ -626,10 +827,21 @@ async def ws_handler(websocket: WebSocket) -> None:
                         break
         finally:
             try:
-                if not server_file.closed:
-                    server_file.close()
+                await disk_writer.close(server_filepath)
             except Exception:
                 pass
+            # Let queued control messages (e.g. the final `saved`) go out before stopping the writer
+            # (a resumable session keeps queueing for the next connection to adopt)
+            await outbox.close(flush_timeout=WS_OUTBOX_FLUSH_S, hold=sess.resumable and sess.outbox is outbox)
+            # A newer connection that resumed this session owns it now
+            if sess.websocket is websocket:
+                sess.websocket = None
+                if sess.resumable:
+                    # Keep tasks and results for a reconnect; cancel (or drain) them if none comes
+                    sess.expiry = spawn_background(_expire_session(sess))
+                else:
+                    # Outstanding provider work: cancel it, or let it finish and persist results without sending
+                    await _close_session_work(sess)
             # Do not force-close here; allow graceful close initiated by client or app shutdown
 
     await receive_from_frontend()
@@ -0,0 +1,199 @@
+"""
+server/ws_outbox.py
+
+Single-writer outbound queue for a WebSocket connection.
+
+Provider tasks used to await `send_json` on the shared socket directly, so a
+slow client stalled every task and sends interleaved in no particular order.
+Now callers `put()` without blocking and one writer task drains the queue:
+
+- control messages (ack, pong, ready, segment_saved, saved, status, ...) go
+  ahead of transcript events;
+- transcript events are coalesced per (provider, idx): a newer event replaces
+  the pending one, except that a partial never replaces a pending final;
+- the queue is bounded (WS_OUTBOX_MAX); when full, the oldest pending partial is
+  evicted, otherwise a new transcript event is dropped (control messages are
+  always accepted).
+
+Messages are queued as `server.event_codec.Event`s and written with
+`send_text` from the event's cached encoding, so the same bytes can also go to
+SSE subscribers.
+
+`stats()` reports depth, coalesced/dropped counts and send latency so
+backpressure from slow clients is visible (served at `/ws_stats`).
+"""
+import asyncio
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from server.config import WS_OUTBOX_MAX, WS_SLOW_SEND_MS
+from server.event_codec import Event, as_event
+
+_TRANSCRIPT_PREFIX = "segment_transcript_"
+_PARTIAL_SUFFIX = "_partial"
+
+_live: "weakref.WeakSet[Outbox]" = weakref.WeakSet()
+_totals: Dict[str, int] = {"sent": 0, "coalesced": 0, "dropped": 0, "slow_sends": 0}
+
+
+def _coalesce_key(payload: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    """(provider, idx) for transcript events; None for control messages."""
+    mtype = str(payload.get("type") or "")
+    if not mtype.startswith(_TRANSCRIPT_PREFIX):
+        return None
+    provider = mtype[len(_TRANSCRIPT_PREFIX):]
+    if provider.endswith(_PARTIAL_SUFFIX):
+        provider = provider[:-len(_PARTIAL_SUFFIX)]
+    return (provider, payload.get("idx"))
+
+
+def _is_partial(payload: Dict[str, Any]) -> bool:
+    return str(payload.get("type") or "").endswith(_PARTIAL_SUFFIX)
+
+
+class Outbox:
+    def __init__(self, websocket: Any, name: str = "") -> None:
+        self.websocket = websocket
+        self.name = name
+        self._control: Deque[Event] = deque()
+        self._events: "OrderedDict[Tuple[str, Any], Event]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.slow_sends = 0
+        self.max_depth = 0
+        self._send_ms_total = 0.0
+        self._send_ms_max = 0.0
+        _live.add(self)
+
+    @property
+    def depth(self) -> int:
+        return len(self._control) + len(self._events)
+
+    def put(self, message: Union[Dict[str, Any], Event]) -> bool:
+        """Queue a message without blocking; False if it was dropped."""
+        if self.closed:
+            return False
+        payload = as_event(message)
+        key = _coalesce_key(payload.message)
+        if key is None:
+            if self.depth >= WS_OUTBOX_MAX:
+                self._evict_partial()
+            self._control.append(payload)
+        else:
+            pending = self._events.get(key)
+            if pending is not None:
+                if _is_partial(payload.message) and not _is_partial(pending.message):
+                    self._count("coalesced")
+                    return True
+                # Keep the slot's queue position; the newer text supersedes the pending one
+                self._events[key] = payload
+                self._count("coalesced")
+                return True
+            if self.depth >= WS_OUTBOX_MAX and not self._evict_partial():
+                self._count("dropped")
+                return False
+            self._events[key] = payload
+        self.max_depth = max(self.max_depth, self.depth)
+        self._wake.set()
+        return True
+
+    def _evict_partial(self) -> bool:
+        for key, pending in self._events.items():
+            if _is_partial(pending.message):
+                del self._events[key]
+                self._count("dropped")
+                return True
+        return False
+
+    def _count(self, what: str) -> None:
+        setattr(self, what, getattr(self, what) + 1)
+        _totals[what] += 1
+
+    def _next(self) -> Optional[Event]:
+        if self._control:
+            return self._control.popleft()
+        if self._events:
+            return self._events.popitem(last=False)[1]
+        return None
+
+    def start(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            payload = self._next()
+            if payload is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            t0 = time.perf_counter()
+            try:
+                await self.websocket.send_text(payload.text())
+            except Exception:
+                # Socket gone: stop writing; the unsent message and the rest stay for a resumed connection to adopt
+                key = _coalesce_key(payload.message)
+                if key is None:
+                    self._control.appendleft(payload)
+                else:
+                    self._events.setdefault(key, payload)
+                return
+            ms = (time.perf_counter() - t0) * 1000.0
+            self.sent += 1
+            _totals["sent"] += 1
+            self._send_ms_total += ms
+            self._send_ms_max = max(self._send_ms_max, ms)
+            if ms >= WS_SLOW_SEND_MS:
+                self._count("slow_sends")
+
+    def adopt(self, other: "Outbox") -> None:
+        """Take over messages still queued on a previous connection's outbox (session resume)."""
+        if other is self:
+            return
+        pending = list(other._control) + list(other._events.values())
+        other._control.clear()
+        other._events.clear()
+        for payload in pending:
+            self.put(payload)
+
+    async def close(self, flush_timeout: float = 0.0, hold: bool = False) -> None:
+        """Stop the writer, first giving it up to `flush_timeout` seconds to send what is queued.
+
+        hold=True keeps accepting messages (bounded as usual) so a resumed connection can adopt them.
+        """
+        if flush_timeout > 0 and self._writer is not None and not self._writer.done():
+            deadline = time.monotonic() + flush_timeout
+            while self.depth and time.monotonic() < deadline and not self._writer.done():
+                await asyncio.sleep(0.01)
+        self.closed = not hold
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except BaseException:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "writing": self._writer is not None and not self._writer.done(),
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "slow_sends": self.slow_sends,
+            "send_ms_avg": round(self._send_ms_total / self.sent, 2) if self.sent else 0.0,
+            "send_ms_max": round(self._send_ms_max, 2),
+        }
+
+
+def stats() -> Dict[str, Any]:
+    conns: List[Dict[str, Any]] = [o.stats() for o in list(_live) if not o.closed]
+    return {"connections": conns, "totals": dict(_totals)}
@@ -0,0 +1,240 @@
+"""
+server/youtube_cache.py
+
+Persistent cache for YouTube transcriptions.
+
+Entries are keyed by the canonical video id plus everything that changes the
+output: enabled providers, model names, translation settings and the chunk
+plan. Each entry directory under static/recordings/yt_cache/<key>/ holds:
+
+- audio.ogg          full recording produced by the ingest
+- chunk_<i>.ogg      served chunk audio
+- chunks/<i>.json    per-chunk provider results (lets a partial run resume)
+- record.json        the assembled record returned to the client
+
+An index.json tracks size and last use per entry. When the total size goes
+over YT_CACHE_MAX_BYTES, the least recently used entries are evicted.
+Entries in use by a running job are pinned and never evicted.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from server.config import (
+    YT_CACHE_MAX_BYTES,
+    LONG_AUDIO_CHUNK_MS,
+    YT_STREAM_FIRST_CHUNK_MS,
+    LANGUAGE_CODE,
+)
+from server.state import app_state
+
+
+_lock = threading.Lock()
+_pinned: Set[str] = set()
+
+_VIDEO_ID_RES = [
+    re.compile(r"(?:youtube\.com/.*[?&]v=)([A-Za-z0-9_-]{11})"),
+    re.compile(r"(?:youtu\.be/)([A-Za-z0-9_-]{11})"),
+    re.compile(r"(?:youtube\.com/(?:shorts|embed|live|v)/)([A-Za-z0-9_-]{11})"),
+]
+
+
+def cache_root() -> str:
+    root = os.path.join(os.path.abspath('static'), 'recordings', 'yt_cache')
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def url_prefix(key: str) -> str:
+    return f"/static/recordings/yt_cache/{key}"
+
+
+def video_id_from_url(url: str) -> Optional[str]:
+    """Canonical 11-char video id for common YouTube URL shapes, else None."""
+    for rx in _VIDEO_ID_RES:
+        m = rx.search(url or "")
+        if m:
+            return m.group(1)
+    return None
+
+
+def cache_key(video_id: str, providers: List[str]) -> str:
+    """Key over the video id and all settings that change transcription output."""
+    parts = {
+        "video": video_id,
+        "providers": sorted(providers),
+        "gemini_model": getattr(app_state, 'gemini_model_name', ''),
+        "vertex_model": getattr(app_state, 'vertex_model_name', ''),
+        "language": LANGUAGE_CODE,
+        "translation": [
+            bool(getattr(app_state, 'enable_translation', False)),
+            getattr(app_state, 'translation_lang', ''),
+            getattr(app_state, 'translation_prompt', ''),
+        ],
+        "chunks": [LONG_AUDIO_CHUNK_MS, YT_STREAM_FIRST_CHUNK_MS],
+    }
+    blob = json.dumps(parts, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def entry_dir(key: str) -> str:
+    d = os.path.join(cache_root(), key)
+    os.makedirs(os.path.join(d, "chunks"), exist_ok=True)
+    return d
+
+
+def audio_path(key: str) -> str:
+    return os.path.join(entry_dir(key), "audio.ogg")
+
+
+def _index_path() -> str:
+    return os.path.join(cache_root(), "index.json")
+
+
+def _load_index() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(_index_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_index(index: Dict[str, Dict[str, Any]]) -> None:
+    tmp = _index_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, _index_path())
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except Exception:
+                pass
+    return total
+
+
+def _update(key: str, **fields: Any) -> Dict[str, Any]:
+    with _lock:
+        index = _load_index()
+        meta = index.setdefault(key, {})
+        meta.update(fields)
+        meta["last_used"] = time.time()
+        _save_index(index)
+        return dict(meta)
+
+
+def get_meta(key: str) -> Dict[str, Any]:
+    with _lock:
+        return dict(_load_index().get(key) or {})
+
+
+def pin(key: str) -> None:
+    _pinned.add(key)
+    _update(key)
+
+
+def unpin(key: str) -> None:
+    _pinned.discard(key)
+
+
+def has_audio(key: str) -> bool:
+    return bool(get_meta(key).get("audio_complete")) and os.path.isfile(os.path.join(cache_root(), key, "audio.ogg"))
+
+
+def mark_audio_complete(key: str, duration_ms: int) -> None:
+    _update(key, audio_complete=True, duration_ms=int(duration_ms or 0))
+
+
+def load_record(key: str) -> Optional[Dict[str, Any]]:
+    """Return the cached record (and refresh its LRU position), or None."""
+    path = os.path.join(cache_root(), key, "record.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except Exception:
+        return None
+    _update(key)
+    return record
+
+
+def save_record(key: str, record: Dict[str, Any]) -> None:
+    with open(os.path.join(entry_dir(key), "record.json"), "w", encoding="utf-8") as f:
+        json.dump(record, f)
+
+
+def load_chunks(key: str) -> Dict[int, Dict[str, Any]]:
+    """Per-chunk results already stored for key, by chunk idx."""
+    out: Dict[int, Dict[str, Any]] = {}
+    d = os.path.join(cache_root(), key, "chunks")
+    try:
+        names = os.listdir(d)
+    except Exception:
+        return out
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(d, name), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            out[int(entry["idx"])] = entry
+        except Exception:
+            continue
+    return out
+
+
+def save_chunk(key: str, entry: Dict[str, Any]) -> None:
+    data = {k: v for k, v in entry.items() if k != "audio"}
+    with open(os.path.join(entry_dir(key), "chunks", f"{int(entry['idx'])}.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def evict(max_bytes: int = YT_CACHE_MAX_BYTES) -> List[str]:
+    """Remove least recently used unpinned entries until the cache fits max_bytes."""
+    removed: List[str] = []
+    with _lock:
+        index = _load_index()
+        root = cache_root()
+        sizes = {}
+        for key in list(index.keys()):
+            d = os.path.join(root, key)
+            if not os.path.isdir(d):
+                index.pop(key, None)
+                continue
+            sizes[key] = _dir_size(d)
+            index[key]["bytes"] = sizes[key]
+        total = sum(sizes.values())
+        for key in sorted(sizes.keys(), key=lambda k: index[k].get("last_used", 0)):
+            if total <= max_bytes:
+                break
+            if key in _pinned:
+                continue
+            shutil.rmtree(os.path.join(root, key), ignore_errors=True)
+            total -= sizes[key]
+            index.pop(key, None)
+            removed.append(key)
+        _save_index(index)
+    return removed
+
+
+def rebase_record(record: Dict[str, Any], start_ts: int) -> Dict[str, Any]:
+    """Copy a cached record under a fresh id/start time so it opens as a new tab."""
+    rec = json.loads(json.dumps(record))
+    shift = int(start_ts) - int(rec.get("startTs") or start_ts)
+    rec["id"] = f"rec-{start_ts}"
+    rec["startTs"] = start_ts
+    rec["stopTs"] = int(rec.get("stopTs") or start_ts) + shift
+    for seg in rec.get("segments") or []:
+        for k in ("ts", "startMs", "endMs"):
+            if isinstance(seg.get(k), int):
+                seg[k] = seg[k] + shift
+    return rec
@@ -0,0 +1,379 @@
+"""
+server/youtube_jobs.py
+
+Background job queue for YouTube transcription.
+
+`/transcribe_youtube` only enqueues a job and returns its id. A small pool of
+asyncio workers drains a bounded queue; each job streams the download through
+ffmpeg's segmenter (server/services/stream_ingest.py) and transcribes chunks as
+they are cut, publishing progress over the SSE bus:
+
+- youtube_progress: { job_id, stage, pct }
+- youtube_chunk:    { job_id, record_id, idx, start_ms, end_ms, url, size, results }
+- youtube_done:     { job_id, record }
+- youtube_error:    { job_id, error }
+
+Job state is also kept in memory so clients can poll `/youtube_status`;
+finished jobs are dropped after YT_JOB_TTL_S or beyond YT_JOB_KEEP_MAX.
+
+Audio, per-chunk results and the final record are stored in the persistent
+cache (server/youtube_cache.py). A repeat URL is answered from the cache by the
+route; a partially cached video only transcribes the chunks that are missing.
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from server.config import YT_JOB_WORKERS, YT_JOB_QUEUE_MAX, YT_JOB_TTL_S, YT_JOB_KEEP_MAX
+from server.sse_bus import publish as sse_publish
+from server import youtube_cache
+
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_id_counter = itertools.count(1)
+_key_locks: Dict[str, asyncio.Lock] = {}
+# Jobs holding or waiting on each key lock; the lock is dropped when this reaches 0
+_key_users: Dict[str, int] = {}
+
+PROVIDER_KEYS = ("google", "vertex", "gemini", "aws")
+
+
+class QueueFull(Exception):
+    """Raised when the YouTube job queue is at capacity."""
+
+
+def _ensure_workers() -> asyncio.Queue:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=YT_JOB_QUEUE_MAX)
+    alive = [t for t in _workers if not t.done()]
+    _workers[:] = alive
+    while len(_workers) < YT_JOB_WORKERS:
+        _workers.append(asyncio.create_task(_worker()))
+    return _queue
+
+
+def _prune(now: Optional[float] = None) -> None:
+    """Forget finished jobs past YT_JOB_TTL_S, then the oldest beyond YT_JOB_KEEP_MAX."""
+    now = time.time() if now is None else now
+    finished = sorted(
+        ((job.get("finished_at") or 0.0, job_id) for job_id, job in _jobs.items() if job.get("finished_at") is not None),
+    )
+    excess = len(finished) - YT_JOB_KEEP_MAX
+    for i, (finished_at, job_id) in enumerate(finished):
+        if i < excess or now - finished_at > YT_JOB_TTL_S:
+            _jobs.pop(job_id, None)
+
+
+async def submit(url: str) -> str:
+    """Enqueue a YouTube URL for transcription and return the job id."""
+    _prune()
+    q = _ensure_workers()
+    job_id = f"yt_{int(time.time()*1000)}_{next(_id_counter)}"
+    _jobs[job_id] = {
+        "status": "queued",
+        "stage": "queued",
+        "pct": 0,
+        "url": url,
+        "record": None,
+        "error": None,
+        "finished_at": None,
+    }
+    try:
+        q.put_nowait(job_id)
+    except asyncio.QueueFull:
+        _jobs.pop(job_id, None)
+        raise QueueFull()
+    await _progress(job_id, "queued", 0)
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    _prune()
+    return _jobs.get(job_id)
+
+
+async def _progress(job_id: str, stage: str, pct: float) -> None:
+    job = _jobs.get(job_id)
+    if job is None:
+        return
+    pct_i = max(0, min(100, int(pct)))
+    job["stage"] = stage
+    job["pct"] = pct_i
+    if stage not in ("queued",):
+        job["status"] = "running"
+    try:
+        await sse_publish({"type": "youtube_progress", "job_id": job_id, "stage": stage, "pct": pct_i})
+    except Exception:
+        pass
+
+
+async def _fail(job_id: str, error: str) -> None:
+    job = _jobs.get(job_id)
+    if job is not None:
+        job["status"] = "error"
+        job["error"] = error
+        job["finished_at"] = time.time()
+    try:
+        await sse_publish({"type": "youtube_error", "job_id": job_id, "error": error})
+    except Exception:
+        pass
+
+
+async def _worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await _fail(job_id, f"server_error: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _probe(url: str) -> Dict[str, Any]:
+    """Fetch metadata only (id, duration); runs in a worker thread."""
+    import yt_dlp as ydl
+
+    opts = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+    with ydl.YoutubeDL(opts) as dl:
+        info = dl.extract_info(url, download=False) or {}
+    return {"id": info.get("id"), "duration": info.get("duration"), "title": info.get("title")}
+
+
+async def _transcribe_chunks(job_id: str, record_id: str, cache_key: str, duration_ms: int,
+                             url: str = "", path: str = "") -> List[Dict[str, Any]]:
+    """Segment the source into the cache entry and transcribe each chunk as it is cut.
+
+    Streams the download when url is given, else re-segments the cached audio
+    at path. Chunks with stored results are not sent to providers again.
+    """
+    from server.services.long_audio import transcribe_stream
+    from server.services.stream_ingest import stream_segments, segment_times
+
+    expected = len(segment_times(duration_ms)) + 1 if duration_ms else 1
+    entry_dir = youtube_cache.entry_dir(cache_key)
+    chunk_url_prefix = youtube_cache.url_prefix(cache_key)
+    cached = {idx: c.get("results") or {} for idx, c in youtube_cache.load_chunks(cache_key).items()}
+    done: List[Dict[str, Any]] = []
+
+    async def on_chunk(chunk: Dict[str, Any]) -> None:
+        audio = chunk.get("audio")
+        size = len(audio) if audio else 0
+        if not size:
+            try:
+                size = os.path.getsize(os.path.join(entry_dir, chunk["name"]))
+            except Exception:
+                size = 0
+        entry = {
+            "idx": chunk["idx"],
+            "start_ms": chunk["start_ms"],
+            "end_ms": chunk["end_ms"],
+            "url": f"{chunk_url_prefix}/{chunk['name']}",
+            "size": size,
+            "results": chunk["results"],
+        }
+        done.append(entry)
+        if not chunk.get("cached") and not any(k.endswith("_error") for k in chunk["results"]):
+            try:
+                youtube_cache.save_chunk(cache_key, entry)
+            except Exception:
+                pass
+        try:
+            await sse_publish({"type": "youtube_chunk", "job_id": job_id, "record_id": record_id, **entry})
+        except Exception:
+            pass
+        await _progress(job_id, "transcribe", min(99, 100 * len(done) / expected))
+
+    if url:
+        source = stream_segments(entry_dir, youtube_cache.audio_path(cache_key), url=url,
+                                 duration_ms=duration_ms, skip=set(cached))
+    else:
+        source = stream_segments(entry_dir, None, path=path, duration_ms=duration_ms, skip=set(cached))
+    await transcribe_stream(source, 'audio/ogg', on_chunk=on_chunk, cached=cached)
+    return sorted(done, key=lambda c: c["idx"])
+
+
+def build_record(record_id: str, server_url: str, size_bytes: int, start_ts: int, duration_ms: int,
+                 chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble a record compatible with the frontend renderers from per-chunk results.
+
+    Each chunk is { idx, start_ms, end_ms, url, size, results } with offsets
+    relative to the start of the audio.
+    """
+    from server.services.long_audio import stitch_texts
+
+    stop_ts = start_ts + (duration_ms or 0)
+    n = max(1, len(chunks))
+    transcripts: Dict[str, List[str]] = {k: [] for k in PROVIDER_KEYS}
+    segments: List[Dict[str, Any]] = []
+    for i, chunk in enumerate(chunks):
+        res = chunk.get("results") or {}
+        segments.append({
+            'idx': i,
+            'url': chunk.get("url") or server_url,
+            'mime': 'audio/ogg',
+            'size': chunk.get("size"),
+            'ts': start_ts + int(chunk.get("start_ms") or 0),
+            'startMs': start_ts + int(chunk.get("start_ms") or 0),
+            'endMs': start_ts + int(chunk.get("end_ms") or duration_ms or 0),
+        })
+        keys = list(PROVIDER_KEYS) + (['translation'] if 'translation' in res else [])
+        for k in keys:
+            val = res.get(k)
+            if val is not None:
+                arr = transcripts.setdefault(k, [])
+                while len(arr) < i:
+                    arr.append('')
+                arr.append(str(val))
+    full_append: Dict[str, str] = {}
+    for k, arr in transcripts.items():
+        if arr:
+            # Streamed chunks are cut without overlap: plain ordered join
+            full_append[k] = stitch_texts(arr, max_overlap_words=0)
+    return {
+        'id': record_id,
+        'audioUrl': None,
+        'serverUrl': server_url,
+        'serverSizeBytes': size_bytes,
+        'clientSizeBytes': None,
+        'startTs': start_ts,
+        'stopTs': stop_ts,
+        'durationMs': duration_ms,
+        'segments': segments,
+        'transcripts': transcripts,
+        'fullAppend': full_append,
+        'timeouts': {k: [False] * n for k in PROVIDER_KEYS},
+    }
+
+
+def cache_key_for(url: str, video_id: Optional[str] = None) -> Optional[str]:
+    """Cache key for a URL under the current provider/model/translation settings."""
+    from server.services.transcription import enabled_providers
+
+    vid = video_id or youtube_cache.video_id_from_url(url)
+    if not vid:
+        return None
+    return youtube_cache.cache_key(vid, enabled_providers())
+
+
+def cached_record(url: str) -> Optional[Dict[str, Any]]:
+    """A fresh copy of the cached record for url, or None on a miss."""
+    key = cache_key_for(url)
+    if not key:
+        return None
+    record = youtube_cache.load_record(key)
+    if record is None:
+        return None
+    return youtube_cache.rebase_record(record, int(time.time()*1000))
+
+
+async def _finish(job_id: str, record: Dict[str, Any]) -> None:
+    job = _jobs.get(job_id)
+    if job is not None:
+        job["record"] = record
+        job["status"] = "done"
+        job["stage"] = "done"
+        job["pct"] = 100
+        job["finished_at"] = time.time()
+    try:
+        await sse_publish({"type": "youtube_done", "job_id": job_id, "record": record})
+    except Exception:
+        pass
+
+
+async def _run_job(job_id: str) -> None:
+    job = _jobs.get(job_id)
+    if job is None:
+        return
+    url = job["url"]
+    from server.services.transcription import PRIORITY_BATCH, set_job_class
+
+    # YouTube chunks are batch work; jobs share the batch slots fairly
+    set_job_class(PRIORITY_BATCH, f"yt_{job_id}")
+
+    await _progress(job_id, "probe", 0)
+    try:
+        info = await asyncio.to_thread(_probe, url)
+    except Exception as e:
+        await _fail(job_id, f"download_failed: {e}")
+        return
+    duration_ms = 0
+    try:
+        duration_ms = int(float(info.get('duration') or 0)) * 1000
+    except Exception:
+        duration_ms = 0
+
+    key = cache_key_for(url, info.get("id"))
+    if not key:
+        await _fail(job_id, "download_failed: no video id")
+        return
+    lock = _key_locks.setdefault(key, asyncio.Lock())
+    _key_users[key] = _key_users.get(key, 0) + 1
+    try:
+        async with lock:
+            youtube_cache.pin(key)
+            try:
+                await _run_cached(job_id, key, url, duration_ms)
+            finally:
+                youtube_cache.unpin(key)
+    finally:
+        _key_users[key] -= 1
+        if _key_users[key] <= 0:
+            _key_users.pop(key, None)
+            _key_locks.pop(key, None)
+    try:
+        await asyncio.to_thread(youtube_cache.evict)
+    except Exception:
+        pass
+
+
+async def _run_cached(job_id: str, key: str, url: str, duration_ms: int) -> None:
+    ts = int(time.time()*1000)
+    record_id = f"rec-{ts}"
+
+    # Another job may have completed this key while we waited on the lock
+    record = youtube_cache.load_record(key)
+    if record is not None:
+        await _finish(job_id, youtube_cache.rebase_record(record, ts))
+        return
+
+    # Download, transcode and segment in one streaming pass unless the audio is already cached
+    audio_path = youtube_cache.audio_path(key)
+    meta = youtube_cache.get_meta(key)
+    have_audio = youtube_cache.has_audio(key)
+    if have_audio:
+        duration_ms = duration_ms or int(meta.get("duration_ms") or 0)
+    await _progress(job_id, "transcribe", 0)
+    try:
+        if have_audio:
+            chunks = await _transcribe_chunks(job_id, record_id, key, duration_ms, path=audio_path)
+        else:
+            chunks = await _transcribe_chunks(job_id, record_id, key, duration_ms, url=url)
+    except Exception as e:
+        await _fail(job_id, f"transcribe_failed: {e}")
+        return
+    if chunks and not duration_ms:
+        duration_ms = max(int(c.get("end_ms") or 0) for c in chunks)
+    if not have_audio:
+        youtube_cache.mark_audio_complete(key, duration_ms)
+
+    size_bytes = 0
+    try:
+        size_bytes = os.path.getsize(audio_path)
+    except Exception:
+        size_bytes = 0
+    record = build_record(record_id, f"{youtube_cache.url_prefix(key)}/audio.ogg", size_bytes, ts, duration_ms, chunks)
+    complete = all(not any(k.endswith("_error") for k in (c.get("results") or {})) for c in chunks)
+    if complete:
+        try:
+            youtube_cache.save_record(key, record)
+        except Exception:
+            pass
+    await _finish(job_id, record)
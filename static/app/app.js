@@ -5,6 +5,7 @@ import { renderRecordingPanel as renderPanel } from '/static/ui/renderers.js';
 import { showPendingCountdown, prependSegmentRow } from '/static/ui/segments.js';
 import { acquireWakeLock, releaseWakeLock, initWakeLockVisibilityReacquire } from '/static/app/wake_lock.js';
 import { createMediaRecorderWithFallback, safelyStopStream } from '/static/app/recorder_utils.js';
+import { onServerEvent } from '/static/app/events.js';
 import { pendingRowsByIdx, pendingRowsByClientId, pendingRowsByServerId, insertedRows, pendingInsertTimers, segmentIdToIndex, idxKey, clientKey, serverKey, mergePending, setPending, getServerId, resetSegmentsState } from '/static/app/segments_state.js';
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -344,40 +345,77 @@ document.addEventListener('DOMContentLoaded', () => {
             try {
                 const summaryDiv = document.getElementById(`summarytable-${currentRecording.id}`);
                 if (summaryDiv) {
-                    const compact = { id: currentRecording.id, stopTs: currentRecording.stopTs, fullAppend: currentRecording.fullAppend, transcripts: currentRecording.transcripts };
-                    // Prefer JSON to avoid HTML parsing inconsistencies; render ourselves
-                    const fd = new FormData();
-                    fd.append('record', JSON.stringify(compact));
-                    fetch('/render/full_row_json', { method: 'POST', body: fd })
-                      .then(r => r.json())
-                      .then(data => {
-                          try {
-                              if (!data || data.ok === false) throw new Error('no_summary');
-                              const md = String(data.summary_text || '').trim();
-                              summaryDiv.innerHTML = '';
-                              const holder = document.createElement('div');
-                              holder.className = 'marked';
-                              holder.textContent = md;
-                              summaryDiv.appendChild(holder);
-                              summaryDiv.style.display = 'block';
-                          } catch(_) {
-                              summaryDiv.innerHTML = '<small style="color:#aaa">No summary.</small>';
-                              summaryDiv.style.display = 'block';
-                          }
-                          // Render markdown
-                          try {
-                              const el = summaryDiv.querySelector('.marked');
-                              if (el) {
-                                  const src = el.textContent || '';
-                                  if (src && window.marked && typeof window.marked.parse === 'function') el.innerHTML = window.marked.parse(src);
+                    // The server keeps this recording's full transcripts (keyed by startTs); post ids only
+                    const compact = { id: currentRecording.id, startTs: currentRecording.startTs, stopTs: currentRecording.stopTs };
+                    const recId = currentRecording.id;
+                    const showSummary = (md) => {
+                        try {
+                            md = String(md || '').trim();
+                            if (!md) throw new Error('no_summary');
+                            let el = summaryDiv.querySelector('.marked');
+                            if (!el) {
+                                summaryDiv.innerHTML = '';
+                                el = document.createElement('div');
+                                el.className = 'marked';
+                                summaryDiv.appendChild(el);
+                            }
+                            // Render markdown
+                            if (window.marked && typeof window.marked.parse === 'function') el.innerHTML = window.marked.parse(md);
+                            else el.textContent = md;
+                            summaryDiv.style.display = 'block';
+                        } catch(_) {
+                            summaryDiv.innerHTML = '<small style="color:#aaa">No summary.</small>';
+                            summaryDiv.style.display = 'block';
+                        }
+                        try { const full = document.getElementById(`fulltable-${recId}`); if (full && summaryDiv.textContent && summaryDiv.textContent.trim()) full.style.display = 'none'; } catch(_) {}
+                    };
+                    // Non-streaming JSON fallback; render ourselves to avoid HTML parsing inconsistencies
+                    const fetchSummaryJson = () => {
+                        const fd = new FormData();
+                        fd.append('record', JSON.stringify(compact));
+                        return fetch('/render/full_row_json', { method: 'POST', body: fd })
+                          .then(r => r.json())
+                          .then(data => {
+                              if (!data || data.ok === false) { showSummary(''); return; }
+                              showSummary(data.summary_text);
+                          })
+                          .catch(() => {
+                              // Fallback: if fetch fails, try HTMX once
+                              try { if (window && window.htmx && typeof window.htmx.ajax === 'function') window.htmx.ajax('POST', '/render/full_row', { target: summaryDiv, swap: 'innerHTML', values: { record: JSON.stringify(compact) } }); } catch(_) {}
+                          });
+                    };
+                    // Stream the summary: append Markdown deltas as they are generated
+                    const sfd = new FormData();
+                    sfd.append('record', JSON.stringify(compact));
+                    fetch('/render/summary_stream', { method: 'POST', body: sfd })
+                      .then(async (r) => {
+                          if (!r.ok || !r.body || typeof r.body.getReader !== 'function') throw new Error('no_stream');
+                          const reader = r.body.getReader();
+                          const decoder = new TextDecoder();
+                          let buf = '';
+                          let md = '';
+                          let finished = false;
+                          while (true) {
+                              const { value, done } = await reader.read();
+                              if (done) break;
+                              buf += decoder.decode(value, { stream: true });
+                              let cut;
+                              while ((cut = buf.indexOf('\n\n')) >= 0) {
+                                  const frame = buf.slice(0, cut); buf = buf.slice(cut + 2);
+                                  let evName = 'message'; let dataStr = '';
+                                  frame.split('\n').forEach(line => {
+                                      if (line.startsWith('event:')) evName = line.slice(6).trim();
+                                      else if (line.startsWith('data:')) dataStr += line.slice(5).trim();
+                                  });
+                                  let ev = {}; try { ev = JSON.parse(dataStr || '{}'); } catch(_) {}
+                                  if (evName === 'delta' && ev.text) { md += ev.text; showSummary(md); }
+                                  else if (evName === 'done') { md = String(ev.summary_text || md); finished = true; }
                               }
-                          } catch(_) {}
-                          try { const full = document.getElementById(`fulltable-${currentRecording.id}`); if (full && summaryDiv.textContent && summaryDiv.textContent.trim()) full.style.display = 'none'; } catch(_) {}
+                          }
+                          if (!finished) throw new Error('stream_incomplete');
+                          showSummary(md);
                       })
-                      .catch(() => {
-                          // Fallback: if fetch fails, try HTMX once
-                          try { if (window && window.htmx && typeof window.htmx.ajax === 'function') window.htmx.ajax('POST', '/render/full_row', { target: summaryDiv, swap: 'innerHTML', values: { record: JSON.stringify(compact) } }); } catch(_) {}
-                      });
+                      .catch(() => { fetchSummaryJson(); });
                 }
             } catch(_) {}
             finalizeRequested = false;
@@ -463,6 +501,43 @@ document.addEventListener('DOMContentLoaded', () => {
         } catch(_) {}
     }
 
+    // AWS batch results for long segments and per-segment translations arrive after the upload response
+    try { onServerEvent('segment_transcript_aws', (m) => { markFinalTranscript(m); handleTranscript(m); }); } catch(_) {}
+    try { onServerEvent('segment_transcript_translation', (m) => { handleTranscript(m); }); } catch(_) {}
+
+    // Partial Gemini text while a segment is still generating. Shown in the cell only;
+    // the final result (upload response or segment_transcript_gemini) replaces it and
+    // later partials for that cell are ignored.
+    const finalTranscripts = new Set();
+    function finalKey(recId, idx, svc) { return `${recId}:${idx}:${svc}`; }
+    function markFinalTranscript(msg) {
+        try {
+            const rec = currentRecording || (recordings.find(r => r && r.id === lastRecordingId) || null);
+            const svc = (msg.type || '').replace('segment_transcript_', '');
+            if (rec && typeof msg.idx === 'number' && svc) finalTranscripts.add(finalKey(rec.id, msg.idx, svc));
+        } catch(_) {}
+    }
+    async function handlePartialTranscript(msg) {
+        try {
+            const rec = currentRecording;
+            if (!rec || typeof msg.idx !== 'number' || typeof msg.transcript !== 'string') return;
+            if (msg.recording_id && String(msg.recording_id) !== String(rec.startTs)) return;
+            const svc = (msg.type || '').replace('segment_transcript_', '').replace(/_partial$/, '');
+            if (!svc || finalTranscripts.has(finalKey(rec.id, msg.idx, svc))) return;
+            let row = document.getElementById(`segrow-${rec.id}-${msg.idx}`);
+            if (!row) {
+                const seg = rec.segments[msg.idx] || {};
+                const startMs = (typeof seg.startMs === 'number') ? seg.startMs : (msg.ts || Date.now());
+                const endMs = (typeof seg.endMs === 'number') ? seg.endMs : startMs;
+                row = await prependSegmentRow(rec, msg.idx, { url: '', ts: msg.ts }, startMs, endMs);
+            }
+            if (finalTranscripts.has(finalKey(rec.id, msg.idx, svc))) return;
+            const td = row && row.querySelector(`td[data-svc="${svc}"]`);
+            if (td) td.textContent = `${msg.transcript} …`;
+        } catch(_) {}
+    }
+    try { onServerEvent('segment_transcript_gemini_partial', (m) => { handlePartialTranscript(m); }); } catch(_) {}
+
     function handleSaved(data) {
         try {
             const rec = currentRecording || (recordings.find(r => r && r.id === lastRecordingId) || null);
@@ -678,31 +753,92 @@ document.addEventListener('DOMContentLoaded', () => {
         } catch(_) {}
     });
 
-    // Transcribe YouTube
+    // Transcribe YouTube (background job; progress and per-chunk results arrive over /events)
     try {
         if (ytBtn && ytUrlInput) {
             ytBtn.addEventListener('click', async () => {
+                const url = String(ytUrlInput.value || '').trim();
+                if (!url) { alert('Enter a YouTube URL'); return; }
+                ytBtn.disabled = true; ytBtn.textContent = 'Queued…';
+                let jobId = null;
+                let partial = null;
+                let finished = false;
+                const unsubs = [];
+                const finish = () => {
+                    finished = true;
+                    unsubs.forEach(u => { try { u(); } catch(_) {} });
+                    ytBtn.disabled = false; ytBtn.textContent = 'Transcribe YouTube';
+                };
+                const onDone = async (record) => {
+                    if (finished || !record) return;
+                    finish();
+                    try {
+                        const i = recordings.findIndex(r => r && r.id === record.id);
+                        if (i >= 0) recordings[i] = record; else recordings.push(record);
+                        lastRecordingId = record.id;
+                        await renderRecordingPanel(record);
+                        activateUITab(document.getElementById('recordTabs'), record.id);
+                    } catch(_) {}
+                };
+                const onError = (err) => {
+                    if (finished) return;
+                    finish();
+                    alert(`YouTube transcribe failed: ${err || 'unknown'}`);
+                };
+                unsubs.push(onServerEvent('youtube_progress', (m) => {
+                    if (!m || m.job_id !== jobId || finished) return;
+                    ytBtn.textContent = `${m.stage} ${m.pct}%`;
+                }));
+                unsubs.push(onServerEvent('youtube_chunk', async (m) => {
+                    try {
+                        if (!m || m.job_id !== jobId || finished) return;
+                        if (!partial) {
+                            const ts = Date.now();
+                            partial = { id: m.record_id || `rec-${ts}`, audioUrl: null, serverUrl: null, startTs: ts, stopTs: null, segments: [], transcripts: {}, fullAppend: {}, timeouts: {} };
+                            recordings.push(partial);
+                        }
+                        const idx = Number(m.idx || 0);
+                        while (partial.segments.length <= idx) partial.segments.push(null);
+                        const segStart = partial.startTs + Number(m.start_ms || 0);
+                        partial.segments[idx] = { idx, url: m.url || '', mime: 'audio/ogg', size: m.size || null, ts: segStart, startMs: segStart, endMs: partial.startTs + Number(m.end_ms || 0) };
+                        const results = m.results || {};
+                        Object.keys(results).forEach(svc => {
+                            if (svc.endsWith('_error')) return;
+                            const arr = (partial.transcripts[svc] = partial.transcripts[svc] || []);
+                            while (arr.length <= idx) arr.push('');
+                            arr[idx] = String(results[svc] || '');
+                        });
+                        recomputeFullAppendFromTranscripts(partial);
+                        await renderRecordingPanel(partial);
+                    } catch(_) {}
+                }));
+                unsubs.push(onServerEvent('youtube_done', (m) => { if (m && m.job_id === jobId) onDone(m.record); }));
+                unsubs.push(onServerEvent('youtube_error', (m) => { if (m && m.job_id === jobId) onError(m.error); }));
                 try {
-                    const url = String(ytUrlInput.value || '').trim();
-                    if (!url) { alert('Enter a YouTube URL'); return; }
-                    ytBtn.disabled = true; ytBtn.textContent = 'Transcribing…';
                     const body = new URLSearchParams(); body.append('url', url);
                     const res = await fetch('/transcribe_youtube', { method: 'POST', headers: { 'Content-Type': 'application/x-www-form-urlencoded' }, body });
                     const data = await res.json();
-                    if (data && data.ok && data.record) {
-                        const record = data.record;
-                        recordings.push(record);
-                        lastRecordingId = record.id;
-                        await renderRecordingPanel(record);
-                        try { activateUITab(document.getElementById('recordTabs'), record.id); } catch(_) {}
-                    } else {
-                        alert(`YouTube transcribe failed: ${(data && data.error) || 'unknown'}`);
-                    }
+                    if (data && data.ok && data.record) { onDone(data.record); return; }
+                    if (!(data && data.ok && data.job_id)) { onError(data && data.error); return; }
+                    jobId = data.job_id;
                 } catch (e) {
-                    alert(`YouTube transcribe failed: ${e && e.message ? e.message : 'network'}`);
-                } finally {
-                    ytBtn.disabled = false; ytBtn.textContent = 'Transcribe YouTube';
+                    onError(e && e.message ? e.message : 'network');
+                    return;
                 }
+                // Poll as a fallback in case the event stream is unavailable or events were missed
+                const poll = async () => {
+                    if (finished) return;
+                    try {
+                        const r = await fetch(`/youtube_status?job_id=${encodeURIComponent(jobId)}`);
+                        const j = await r.json();
+                        if (j && j.ok) {
+                            if (j.status === 'done' && j.record) { onDone(j.record); return; }
+                            if (j.status === 'error') { onError(j.error); return; }
+                        }
+                    } catch(_) {}
+                    setTimeout(poll, 3000);
+                };
+                setTimeout(poll, 3000);
             });
         }
     } catch(_) {}
@@ -976,6 +1112,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         const results = data.results || {};
                         Object.keys(results).forEach(svc => {
                             const txt = results[svc] || '';
+                            finalTranscripts.add(finalKey(currentRecording.id, thisIdx, svc));
                             const arr = (currentRecording.transcripts[svc] = currentRecording.transcripts[svc] || []);
                             while (arr.length <= thisIdx) arr.push('');
                             arr[thisIdx] = txt;
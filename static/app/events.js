@@ -0,0 +1,32 @@
+// Shared Server-Sent Events subscription for /events
+// The server emits named events (event: <type>) with a JSON data payload.
+let source = null;
+
+function ensureSource() {
+    if (source) return source;
+    try {
+        if (typeof window === 'undefined' || typeof window.EventSource === 'undefined') return null;
+        source = new EventSource('/events');
+    } catch(_) { source = null; }
+    return source;
+}
+
+/**
+ * Subscribe to a named server event.
+ * @param {string} type - event type (matches the payload's `type`)
+ * @param {(data: object) => void} handler - receives the parsed JSON payload
+ * @returns {() => void} unsubscribe function
+ */
+export function onServerEvent(type, handler) {
+    const es = ensureSource();
+    if (!es) return () => {};
+    const listener = (e) => {
+        try { handler(JSON.parse(e.data)); } catch(_) {}
+    };
+    es.addEventListener(type, listener);
+    return () => { try { es.removeEventListener(type, listener); } catch(_) {} };
+}
+
+export function hasServerEvents() {
+    return !!ensureSource();
+}
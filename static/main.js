@@ -686,7 +686,7 @@ document.addEventListener('DOMContentLoaded', () => {
                                 if (socket && socket.readyState === WebSocket.OPEN) {
                                     segBlob.arrayBuffer().then(buf => {
                                         const b64 = ab2b64(buf);
-                                        try { socket.send(JSON.stringify({ type: 'segment', audio: b64, id: ts, idx: segIndex, ts, mime: segBlob.type, duration_ms: segmentMs })); } catch(_) {}
+                                        try { socket.send(JSON.stringify({ type: 'segment', audio: b64, id: ts, idx: segIndex, ts, mime: segBlob.type, duration_ms: segmentMs, recording_id: currentRecording ? String(currentRecording.startTs) : undefined })); } catch(_) {}
                                     }).catch(()=>{});
                                 }
                             } catch(_) {}
@@ -1083,7 +1083,7 @@ document.addEventListener('DOMContentLoaded', () => {
                                                         const joined = Array.isArray(arr) ? arr.filter(Boolean).join(' ') : '';
                                                         rec.fullAppend = rec.fullAppend || {};
                                                         rec.fullAppend[svc] = joined;
-                                                        setFullAssignedText(rec.id, svc, joined);
+                                                        if (!appendOrderedFullText(rec, svc, segIndex, msg)) setFullAssignedText(rec.id, svc, joined);
                                                     } catch(_) {}
                                         }
                                     } catch(_) {}
@@ -1186,7 +1186,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 },
                 // uploadSegment: encode and send to WS
                 async (ts, blob) => {
-                    try { const arrayBuffer = await blob.arrayBuffer(); const b64 = ab2b64(arrayBuffer); socket.send(JSON.stringify({ type: 'segment', audio: b64, id: ts, ts, mime: blob.type })); } catch(_) {}
+                    try { const arrayBuffer = await blob.arrayBuffer(); const b64 = ab2b64(arrayBuffer); socket.send(JSON.stringify({ type: 'segment', audio: b64, id: ts, ts, mime: blob.type, recording_id: currentRecording ? String(currentRecording.startTs) : undefined })); } catch(_) {}
                 },
                 () => currentRecording,
                 () => segmentLoopActive,
@@ -1471,6 +1471,30 @@ document.addEventListener('DOMContentLoaded', () => {
             });
         } catch(_) {}
     }
+    // Results released by the server's reorder buffer (`ordered`, see server/reorder.py) arrive in idx order,
+    // so a piece past the last one shown extends the full text instead of rebuilding the cell.
+    // Late, repeated or unsequenced results return false and the caller rebuilds from rec.transcripts.
+    function appendOrderedFullText(rec, svc, segIndex, msg) {
+        try {
+            rec._fullTail = rec._fullTail || {};
+            const tail = rec._fullTail[svc];
+            const arr = (rec.transcripts && rec.transcripts[svc]) || [];
+            let last = -1;
+            for (let i = arr.length - 1; i >= 0; i--) { if (arr[i]) { last = i; break; } }
+            if (msg && msg.ordered && !msg.late && typeof tail === 'number' && segIndex > tail && segIndex === last) {
+                const cell = ensureFullCell(rec.id, svc);
+                const span = cell ? cell.querySelector('span.full-text') : null;
+                if (span) {
+                    span.appendChild(document.createTextNode((span.textContent ? ' ' : '') + msg.transcript));
+                    rec._fullTail[svc] = segIndex;
+                    return true;
+                }
+            }
+            // The caller rebuilds the cell from the array; later ordered pieces append after its last entry
+            rec._fullTail[svc] = last;
+        } catch(_) {}
+        return false;
+    }
     function setFullAssignedText(recordId, svc, text) {
         try {
             const cell = ensureFullCell(recordId, svc);
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from server.services import aws_transcribe
+from utils.aws_batch_standin import StandinError, install
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_TRANSCRIBE_BUCKET", "bucket")
+    monkeypatch.setattr(aws_transcribe, "_clients", {})
+    monkeypatch.setattr(aws_transcribe, "_poller", aws_transcribe.BatchPoller())
+    monkeypatch.setattr(aws_transcribe, "AWS_BATCH_POLL_MIN_S", 0.01)
+    monkeypatch.setattr(aws_transcribe, "AWS_BATCH_POLL_MAX_S", 0.02)
+    return install()
+
+
+async def _started(tc, n=1):
+    for _ in range(200):
+        if len(tc.jobs) >= n:
+            return list(tc.jobs)
+        await asyncio.sleep(0.005)
+    raise AssertionError("job not started")
+
+
+async def _settle():
+    # Cleanup runs in background tasks after the result is delivered
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_completed_jobs_delivered_from_one_poller(aws):
+    s3, tc = aws
+
+    async def run():
+        tasks = [asyncio.ensure_future(aws_transcribe.transcribe_batch(b"audio%d" % i, "audio/ogg")) for i in range(2)]
+        names = await _started(tc, 2)
+        assert tc.jobs[names[0]]["MediaFormat"] == "ogg"
+        tc.complete(names[0], "first text")
+        tc.complete(names[1], "second text")
+        out = await asyncio.gather(*tasks)
+        await _settle()
+        return names, out
+
+    names, out = asyncio.run(run())
+    assert sorted(out) == ["first text", "second text"]
+    # Inputs and outputs are removed, and so are the jobs
+    assert s3.objects == {}
+    assert set(tc.deleted) >= set(names)
+
+
+def test_failed_job_raises_with_reason(aws):
+    s3, tc = aws
+
+    async def run():
+        task = asyncio.ensure_future(aws_transcribe.transcribe_batch(b"audio", "webm"))
+        name = (await _started(tc))[0]
+        tc.fail(name, "unsupported media")
+        with pytest.raises(RuntimeError, match="aws_job_failed: unsupported media"):
+            await task
+        await _settle()
+
+    asyncio.run(run())
+    assert s3.objects == {}
+
+
+def test_job_past_deadline_times_out(aws, monkeypatch):
+    s3, tc = aws
+    monkeypatch.setattr(aws_transcribe, "AWS_BATCH_JOB_TIMEOUT_S", 0.05)
+
+    async def run():
+        with pytest.raises(RuntimeError, match="aws_job_timeout"):
+            await asyncio.wait_for(aws_transcribe.transcribe_batch(b"audio", "webm"), timeout=2)
+        await _settle()
+
+    asyncio.run(run())
+    assert aws_transcribe._poller.pending == 0
+    assert s3.objects == {}
+
+
+def test_list_statuses_pages_until_wanted_jobs_seen(aws):
+    _, tc = aws
+    for i in range(250):
+        tc.start_transcription_job(TranscriptionJobName=f"p-{i}", Media={})
+    tc.list_calls = 0
+    # Newest first: the most recent jobs are on the first page
+    assert "p-249" in aws_transcribe._list_statuses("p-", ["p-249"])
+    assert tc.list_calls == 1
+    tc.list_calls = 0
+    assert len(aws_transcribe._list_statuses("p-", ["p-0"])) == 250
+    assert tc.list_calls == 3
+
+
+def test_multipart_upload_reassembles_parts(aws):
+    s3, _ = aws
+    data = bytes(range(256)) * 4
+    asyncio.run(aws_transcribe.upload_s3("in/key", data, part_bytes=100, concurrency=3))
+    assert s3.objects[("bucket", "in/key")] == data
+    assert s3.calls.count("upload_part") == 11
+    assert s3.uploads == {}
+
+
+def test_small_upload_is_a_single_put(aws):
+    s3, _ = aws
+    asyncio.run(aws_transcribe.upload_s3("in/small", b"tiny", part_bytes=100))
+    assert s3.calls == ["put_object"]
+
+
+def test_failed_part_aborts_the_upload(aws, monkeypatch):
+    s3, _ = aws
+    real = s3.upload_part
+
+    def flaky(**kw):
+        if kw["PartNumber"] == 3:
+            raise StandinError("SlowDown")
+        return real(**kw)
+
+    monkeypatch.setattr(s3, "upload_part", flaky)
+    with pytest.raises(StandinError):
+        asyncio.run(aws_transcribe.upload_s3("in/key", b"x" * 500, part_bytes=100))
+    assert len(s3.aborted) == 1
+    assert s3.uploads == {}
+    assert ("bucket", "in/key") not in s3.objects
@@ -0,0 +1,209 @@
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import struct
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+
+from server.services import aws_transcribe
+
+
+class _Frozen:
+    access_key = "AK"
+    secret_key = "SK"
+    token = None
+
+
+class _Creds:
+    def get_frozen_credentials(self):
+        return _Frozen()
+
+
+class _FakeBoto3:
+    def __init__(self):
+        self.resolves = 0
+
+    def Session(self):
+        fake = self
+
+        class _Session:
+            def get_credentials(self):
+                fake.resolves += 1
+                return _Creds()
+
+        return _Session()
+
+
+def _fresh(monkeypatch, boto3):
+    monkeypatch.setattr(aws_transcribe, "_boto3", lambda: boto3)
+    monkeypatch.setattr(aws_transcribe, "_creds_source", None)
+    monkeypatch.setattr(aws_transcribe, "_creds_resolved", False)
+    for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.delenv(var, raising=False)
+
+
+def test_credential_chain_resolved_once(monkeypatch):
+    boto3 = _FakeBoto3()
+    _fresh(monkeypatch, boto3)
+    assert not aws_transcribe.has_credentials()
+    assert aws_transcribe.resolve_credentials()
+    for _ in range(5):
+        assert aws_transcribe._credentials() == ("AK", "SK", None)
+        assert aws_transcribe.has_credentials()
+    assert boto3.resolves == 1
+
+
+def test_environment_fallback_without_boto3(monkeypatch):
+    _fresh(monkeypatch, None)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "envak")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "envsk")
+    assert aws_transcribe.has_credentials()
+    assert aws_transcribe._credentials() == ("envak", "envsk", None)
+
+
+def test_event_stream_round_trip():
+    msg = aws_transcribe.encode_event({":message-type": "event", ":event-type": "AudioEvent"}, b"pcm")
+    headers, payload = aws_transcribe.decode_event(msg)
+    assert headers[":event-type"] == "AudioEvent"
+    assert payload == b"pcm"
+
+
+def _env_creds(monkeypatch, token=None):
+    _fresh(monkeypatch, None)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    if token:
+        monkeypatch.setenv("AWS_SESSION_TOKEN", token)
+
+
+def test_presigned_url_signature_verifies(monkeypatch):
+    _env_creds(monkeypatch, token="tok/en")
+    monkeypatch.delenv("AWS_TRANSCRIBE_STREAM_ENDPOINT", raising=False)
+    url = aws_transcribe.presigned_url("en-US", 16000, region="eu-west-1")
+    parsed = urlparse(url)
+    assert parsed.scheme == "wss"
+    assert parsed.netloc == "transcribestreaming.eu-west-1.amazonaws.com:8443"
+    signed, sig = parsed.query.rsplit("&X-Amz-Signature=", 1)
+    params = dict(parse_qsl(signed))
+    assert params["X-Amz-Security-Token"] == "tok/en"
+    assert params["sample-rate"] == "16000"
+    # Recompute the SigV4 signature from the URL itself
+    date = params["X-Amz-Date"]
+    scope = params["X-Amz-Credential"].split("/", 1)[1]
+    assert scope == f"{date[:8]}/eu-west-1/transcribe/aws4_request"
+    canonical = "\n".join(["GET", parsed.path, signed, f"host:{parsed.netloc}", "", "host", hashlib.sha256(b"").hexdigest()])
+    to_sign = "\n".join(["AWS4-HMAC-SHA256", date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+    key = ("AWS4secret").encode()
+    for part in (date[:8], "eu-west-1", "transcribe", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    assert sig == hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+# --- Streaming session against utils/aws_transcribe_standin.py ---
+
+def _speech(ms, rate=16000):
+    n = rate * ms // 1000
+    return struct.pack(f"<{n}h", *([2000, -2000] * (n // 2)))
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    pytest.importorskip("websockets")
+    from utils import aws_transcribe_standin
+
+    _env_creds(monkeypatch)
+    monkeypatch.setattr(aws_transcribe, "AWS_STREAM_SETTLE_S", 1.0)
+    monkeypatch.setattr(aws_transcribe, "AWS_STREAM_RESULT_TIMEOUT_S", 3.0)
+
+    def run(scenario):
+        async def main():
+            websockets = aws_transcribe._websockets()
+            async with websockets.serve(aws_transcribe_standin.handler, "127.0.0.1", 0, max_size=None) as server:
+                port = list(server.sockets)[0].getsockname()[1]
+                monkeypatch.setenv("AWS_TRANSCRIBE_STREAM_ENDPOINT", f"ws://127.0.0.1:{port}")
+                sess = aws_transcribe.AwsStreamSession()
+                try:
+                    return await scenario(sess)
+                finally:
+                    await sess.close()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_session_reuses_one_stream_across_segments(standin):
+    async def scenario(sess):
+        first = await sess.transcribe_pcm(_speech(300))
+        ws = sess._ws
+        second = await sess.transcribe_pcm(_speech(300))
+        return first, second, ws is sess._ws
+
+    assert standin(scenario) == ("utterance 1", "utterance 2", True)
+
+
+def test_concurrent_segments_are_serialized_by_the_lock(standin):
+    async def scenario(sess):
+        return await asyncio.gather(sess.transcribe_pcm(_speech(200)), sess.transcribe_pcm(_speech(200)))
+
+    assert standin(scenario) == ["utterance 1", "utterance 2"]
+
+
+def test_scheduler_slot_taken_only_inside_the_session_lock(standin):
+    held = []
+    peak = []
+
+    @contextlib.asynccontextmanager
+    async def slot():
+        held.append(1)
+        peak.append(len(held))
+        try:
+            yield
+        finally:
+            held.pop()
+
+    async def load():
+        # Loaders run under the slot
+        assert held
+        return _speech(200)
+
+    async def scenario(sess):
+        return await asyncio.gather(*[sess.transcribe_pcm(load, slot=slot) for _ in range(3)])
+
+    assert standin(scenario) == ["utterance 1", "utterance 2", "utterance 3"]
+    # Segments queued behind the stream never held a slot while waiting
+    assert peak == [1, 1, 1]
+
+
+def test_cancelled_segment_marks_stream_stale_and_next_reconnects(standin, monkeypatch):
+    async def scenario(sess):
+        assert await sess.transcribe_pcm(_speech(200)) == "utterance 1"
+        ws = sess._ws
+        pad = aws_transcribe.AWS_STREAM_PAD_MS
+        # Without trailing silence the utterance never finalizes, so the call is still waiting when cancelled
+        monkeypatch.setattr(aws_transcribe, "AWS_STREAM_PAD_MS", 0)
+        task = asyncio.ensure_future(sess.transcribe_pcm(_speech(200)))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        stale = sess._stale
+        monkeypatch.setattr(aws_transcribe, "AWS_STREAM_PAD_MS", pad)
+        # A fresh stream: the stand-in numbers utterances per connection
+        text = await sess.transcribe_pcm(_speech(200))
+        return stale, text, ws is sess._ws
+
+    assert standin(scenario) == (True, "utterance 1", False)
+
+
+def test_unsigned_url_is_rejected(standin, monkeypatch):
+    async def scenario(sess):
+        endpoint = aws_transcribe.os.environ["AWS_TRANSCRIBE_STREAM_ENDPOINT"]
+        monkeypatch.setattr(aws_transcribe, "presigned_url", lambda *a, **k: f"{endpoint}/stream-transcription-websocket?sample-rate=16000")
+        with pytest.raises(Exception):
+            await sess.transcribe_pcm(_speech(200))
+        return sess._error
+
+    assert standin(scenario).startswith("BadRequestException")
@@ -0,0 +1,96 @@
+import asyncio
+
+from server import disk_writer
+from server.disk_writer import _Writer
+
+
+def _batch(writer, cmds):
+    """Run (op, path, data) commands as one batch; returns each command's (result, error)."""
+    async def run():
+        loop = asyncio.get_running_loop()
+        futs = [loop.create_future() for _ in cmds]
+        writer.run_batch([(op, path, data, loop, fut) for (op, path, data), fut in zip(cmds, futs)])
+        return await asyncio.gather(*futs, return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+def test_appends_to_one_file_are_coalesced(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_writer, "DISK_WRITER_FSYNC_MS", 0)
+    path = str(tmp_path / "rec.webm")
+    writes, coalesced = disk_writer._stats["writes"], disk_writer._stats["coalesced"]
+    writer = _Writer()
+    _batch(writer, [("append", path, b"a"), ("append", path, b"b"), ("append", path, b"c")])
+    assert disk_writer._stats["writes"] - writes == 1
+    assert disk_writer._stats["coalesced"] - coalesced == 2
+    assert open(path, "rb").read() == b"abc"
+
+
+def test_write_file_replaces_and_close_returns_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_writer, "DISK_WRITER_FSYNC_MS", 0)
+    path = str(tmp_path / "segment_0.webm")
+    writer = _Writer()
+    results = _batch(writer, [
+        ("append", path, b"old data"),
+        ("write_file", path, b"new"),
+        ("append", path, b"!"),
+        ("close", path, b""),
+    ])
+    assert results == [None, None, None, 4]
+    assert open(path, "rb").read() == b"new!"
+    assert path not in writer._open
+
+
+def test_failed_command_rejects_only_its_future(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_writer, "DISK_WRITER_FSYNC_MS", 0)
+    good = str(tmp_path / "ok.webm")
+    bad = str(tmp_path / "missing" / "x.webm")
+    results = _batch(_Writer(), [("append", bad, b"x"), ("append", good, b"y")])
+    assert isinstance(results[0], OSError)
+    assert results[1] is None
+    assert open(good, "rb").read() == b"y"
+
+
+def test_group_commit_acknowledges_after_fsync(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_writer, "DISK_WRITER_FSYNC_MS", 60_000)
+    path = str(tmp_path / "rec.webm")
+    writer = _Writer()
+    writer.run_batch([("append", path, b"a", None, None)])
+    # Interval not due yet: flushed but held back from acknowledgement
+    assert open(path, "rb").read() == b"a"
+    assert len(writer._unacked) == 1
+    assert writer.fsync_due_in() > 0
+    fsyncs = disk_writer._stats["fsyncs"]
+    writer._last_fsync -= 120
+    writer.sync()
+    assert writer._unacked == []
+    assert writer.fsync_due_in() is None
+    assert disk_writer._stats["fsyncs"] - fsyncs == 1
+
+
+def test_module_api_round_trip(tmp_path):
+    path = str(tmp_path / "rec.webm")
+
+    async def run():
+        disk_writer.append(path, b"one ")
+        await disk_writer.append(path, b"two")
+        return await disk_writer.close(path)
+
+    assert asyncio.run(run()) == 7
+    assert open(path, "rb").read() == b"one two"
+
+
+def test_close_fsyncs_dirty_file_in_group_commit_mode(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_writer, "DISK_WRITER_FSYNC_MS", 60_000)
+    synced = []
+    monkeypatch.setattr(disk_writer.os, "fsync", lambda fd: synced.append(fd))
+    path = str(tmp_path / "rec.webm")
+    writer = _Writer()
+    # Interval not due: only the close itself may fsync
+    writer.run_batch([("append", path, b"a", None, None), ("close", path, b"", None, None)])
+    assert len(synced) == 1
+    assert path not in writer._open and path not in writer._dirty
+    assert open(path, "rb").read() == b"a"
+    # Closing a clean file does not fsync again
+    writer.run_batch([("close", path, b"", None, None)])
+    assert len(synced) == 1
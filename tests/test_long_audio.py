@@ -0,0 +1,64 @@
+import asyncio
+
+from server.services import long_audio
+from server.services.long_audio import plan_chunks, stitch_results, stitch_texts
+
+
+def test_stitch_drops_words_repeated_across_overlap():
+    assert stitch_texts(["the quick brown fox", "Brown fox jumps over"]) == "the quick brown fox jumps over"
+
+
+def test_stitch_prefers_longest_overlap_and_skips_empty_chunks():
+    texts = ["a b a b", "", "a b a b c"]
+    assert stitch_texts(texts) == "a b a b c"
+
+
+def test_stitch_without_overlap_keeps_repeated_words():
+    assert stitch_texts(["we said no", "no means no"], max_overlap_words=0) == "we said no no means no"
+
+
+def test_stitch_results_orders_by_idx_and_keeps_errors():
+    chunks = [
+        {"idx": 1, "results": {"google": "world", "gemini_error": "boom"}},
+        {"idx": 0, "results": {"google": "hello world"}},
+    ]
+    out = stitch_results(chunks, ["google"], max_overlap_words=0)
+    assert out["google"] == "hello world world"
+    assert out["gemini_error"] == "boom"
+
+
+def test_plan_chunks_overlaps_each_cut():
+    bounds = plan_chunks(100000, chunk_ms=45000, overlap_ms=2000)
+    assert bounds == [(0, 45000), (43000, 90000), (88000, 100000)]
+
+
+def test_stream_reads_chunk_files_only_inside_the_window(monkeypatch, tmp_path):
+    live = []
+    peak = []
+
+    async def fake_transcribe_chunk(audio, mime, keys, sem, do_translate):
+        live.append(audio)
+        peak.append(len(live))
+        await asyncio.sleep(0.01)
+        live.remove(audio)
+        return {"google": audio.decode()}
+
+    monkeypatch.setattr(long_audio, "transcribe_chunk", fake_transcribe_chunk)
+    monkeypatch.setattr(long_audio, "translation_enabled", lambda: False)
+    for i in range(10):
+        (tmp_path / f"chunk_{i}.ogg").write_bytes(f"text{i}".encode())
+    emitted = []
+
+    async def source():
+        for i in range(10):
+            path = None if i == 3 else str(tmp_path / f"chunk_{i}.ogg")
+            yield {"idx": i, "start_ms": i * 1000, "end_ms": (i + 1) * 1000, "name": f"chunk_{i}.ogg", "path": path}
+
+    async def on_chunk(chunk):
+        emitted.append(chunk)
+
+    out = asyncio.run(long_audio.transcribe_stream(source(), providers=["google"], on_chunk=on_chunk,
+                                                   cached={3: {"google": "text3"}}, window=2))
+    assert max(peak) == 2
+    assert out["google"] == " ".join(f"text{i}" for i in range(10))
+    assert all("audio" not in c for c in emitted)
@@ -0,0 +1,33 @@
+import asyncio
+import threading
+import types
+
+from server import provider_clients, state
+from server.state import app_state
+
+
+def test_key_change_from_worker_thread_warms_on_server_loop(monkeypatch):
+    touched = threading.Event()
+    legacy = types.SimpleNamespace(configure=lambda api_key: None, GenerativeModel=lambda name: object())
+    monkeypatch.setattr(state, "_genai", lambda: (None, None))
+    monkeypatch.setattr(state, "_legacy_gemini", lambda: legacy)
+    monkeypatch.setattr(provider_clients, "_touch_gemini", lambda model, name: touched.set())
+    monkeypatch.setattr(provider_clients, "_status", {})
+    monkeypatch.setattr(app_state, "_gemini_key_fp", "", raising=False)
+    monkeypatch.setattr(app_state, "gemini_model", None, raising=False)
+    monkeypatch.setattr(app_state, "speech_client", None, raising=False)
+    monkeypatch.setattr(app_state, "vertex_client", None, raising=False)
+
+    async def run():
+        monkeypatch.setattr(provider_clients, "_loop", asyncio.get_running_loop())
+        # As a sync route does: the handler runs in the threadpool, with no running loop
+        ok = await asyncio.to_thread(app_state.set_gemini_api_key, "test-key-12345678")
+        for _ in range(100):
+            if provider_clients.status().get("gemini", {}).get("state") == "warm":
+                break
+            await asyncio.sleep(0.01)
+        return ok
+
+    assert asyncio.run(run()) is True
+    assert touched.is_set()
+    assert provider_clients.status()["gemini"]["state"] == "warm"
@@ -0,0 +1,95 @@
+import asyncio
+
+from server.reorder import Sequencer
+
+
+def _run(scenario):
+    released = []
+
+    async def release(msg):
+        released.append(msg["idx"])
+
+    async def main():
+        seq = Sequencer(release, window=3, timeout_s=0.1)
+        seq.start()
+        try:
+            await scenario(seq, released)
+        finally:
+            seq.stop()
+        return seq
+
+    seq = asyncio.run(main())
+    return released, seq
+
+
+def test_results_released_in_idx_order():
+    async def scenario(seq, released):
+        for i in range(3):
+            seq.expect("google", i)
+        seq.push("google", 2, {"idx": 2})
+        seq.push("google", 1, {"idx": 1})
+        await asyncio.sleep(0.01)
+        seq.push("google", 0, {"idx": 0})
+        await asyncio.sleep(0.01)
+
+    released, _ = _run(scenario)
+    assert released == [0, 1, 2]
+
+
+def test_settled_segment_without_result_does_not_block():
+    async def scenario(seq, released):
+        seq.expect("vertex", 0)
+        seq.expect("vertex", 1)
+        seq.push("vertex", 1, {"idx": 1})
+        seq.settle("vertex", 0)
+        await asyncio.sleep(0.01)
+
+    released, seq = _run(scenario)
+    assert released == [1]
+    assert seq.skipped == 0
+
+
+def test_stuck_segment_skipped_after_timeout():
+    async def scenario(seq, released):
+        seq.expect("gemini", 0)
+        seq.expect("gemini", 1)
+        seq.push("gemini", 1, {"idx": 1})
+        await asyncio.sleep(0.05)
+        assert released == []
+        await asyncio.sleep(0.15)
+
+    released, seq = _run(scenario)
+    assert released == [1]
+    assert seq.skipped == 1
+
+
+def test_window_full_skips_head_and_late_result_is_refused():
+    async def scenario(seq, released):
+        for i in range(4):
+            seq.expect("aws", i)
+        for i in (1, 2, 3):
+            seq.push("aws", i, {"idx": i})
+        await asyncio.sleep(0.01)
+        assert seq.push("aws", 0, {"idx": 0}) is False
+
+    released, seq = _run(scenario)
+    assert released == [1, 2, 3]
+    assert seq.skipped == 1
+
+
+def test_released_messages_are_marked_ordered():
+    marked = []
+
+    async def release(msg):
+        marked.append(msg.get("ordered"))
+
+    async def main():
+        seq = Sequencer(release)
+        seq.start()
+        seq.expect("google", 0)
+        seq.push("google", 0, {"idx": 0})
+        await asyncio.sleep(0.01)
+        seq.stop()
+
+    asyncio.run(main())
+    assert marked == [True]
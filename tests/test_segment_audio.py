@@ -0,0 +1,39 @@
+from server import segment_audio
+from server.segment_audio import SegmentAudio
+
+
+def _budget(monkeypatch, mb):
+    monkeypatch.setattr(segment_audio, "SEGMENT_MEMORY_BUDGET_MB", mb)
+    monkeypatch.setattr(segment_audio, "_held_bytes", 0)
+
+
+def test_within_budget_stays_in_memory_and_release_returns_budget(monkeypatch, tmp_path):
+    _budget(monkeypatch, 1)
+    audio = SegmentAudio(str(tmp_path / "missing.webm"), b"x" * 1000)
+    assert not audio.spilled
+    assert audio.read() == b"x" * 1000
+    assert segment_audio.stats()["held_bytes"] == 1000
+    audio.release()
+    assert segment_audio.stats()["held_bytes"] == 0
+
+
+def test_over_budget_spills_and_reads_the_file(monkeypatch, tmp_path):
+    _budget(monkeypatch, 1)
+    path = tmp_path / "segment_0.webm"
+    data = b"a" * (2 * 1024 * 1024)
+    path.write_bytes(data)
+    audio = SegmentAudio(str(path), data)
+    assert audio.spilled
+    assert segment_audio.stats()["held_bytes"] == 0
+    first, second = audio.read(), audio.read()
+    assert first == data and second == data and first is not second
+
+
+def test_read_after_release_goes_to_the_file(monkeypatch, tmp_path):
+    _budget(monkeypatch, 1)
+    path = tmp_path / "segment_1.webm"
+    path.write_bytes(b"on disk")
+    audio = SegmentAudio(str(path), b"in ram")
+    audio.release()
+    assert audio.spilled
+    assert audio.read() == b"on disk"
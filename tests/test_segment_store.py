@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from server import segment_store
+from server.segment_store import FullTranscript
+
+
+def test_full_transcript_orders_pieces_and_tracks_offsets():
+    ft = FullTranscript()
+    ft.add(0, "hello")
+    ft.add(2, "again")
+    ft.add(1, "world")
+    assert ft.text() == "hello world again"
+    assert ft.offsets() == [(0, 0, 5), (1, 6, 11), (2, 12, 17)]
+    assert ft.pieces_after(0) == [(1, "world"), (2, "again")]
+
+
+def test_full_transcript_replace_does_not_duplicate():
+    ft = FullTranscript()
+    ft.add(0, "first")
+    ft.add(0, "first", replace=True)
+    ft.add(0, "more")
+    assert ft.text() == "first more"
+
+
+def test_ws_and_http_pieces_share_the_client_recording_id():
+    rec = "1700000000000-test"
+    row = segment_store.insert_segment(recording_id=rec, idx=0, url="", mime="audio/webm", size=1,
+                                       client_id=None, ts=0, start_ms=0, end_ms=10000)
+    segment_store.append_transcript(row["segment_id"], "google", "from ws")
+    segment_store.record_results(rec, 1, {"google": "from http"})
+    assert segment_store.get_full(rec, "google").text() == "from ws from http"
+
+
+def test_duplicate_ingest_attaches_to_the_owner():
+    async def run():
+        key = segment_store.ingest_key("rec-dup", 0, b"audio")
+        fut, owner = segment_store.claim_ingest(key)
+        again, second_owner = segment_store.claim_ingest(key)
+        assert owner and not second_owner and again is fut
+        segment_store.complete_ingest(key, {"ok": True})
+        return await asyncio.shield(again)
+
+    assert asyncio.run(run()) == {"ok": True}
+
+
+def test_released_ingest_fails_waiters_and_can_be_claimed_again():
+    async def run():
+        key = segment_store.ingest_key("rec-rel", 0, b"audio")
+        fut, _ = segment_store.claim_ingest(key)
+        segment_store.release_ingest(key)
+        with pytest.raises(segment_store.IngestAbandoned):
+            await fut
+        _, owner = segment_store.claim_ingest(key)
+        segment_store.release_ingest(key)
+        return owner
+
+    assert asyncio.run(run()) is True
+
+
+def test_full_transcripts_evicted_by_ttl_and_cap(monkeypatch):
+    monkeypatch.setattr(segment_store, "_full", segment_store.OrderedDict())
+    monkeypatch.setattr(segment_store, "_full_touched", {})
+    monkeypatch.setattr(segment_store, "FULL_TRANSCRIPT_KEEP_MAX", 2)
+    for rec in ("a", "b", "c"):
+        segment_store.add_full_piece(rec, "google", 0, f"text {rec}")
+    # Writing to a recording makes it most recent again
+    segment_store.add_full_piece("b", "google", 1, "more")
+    segment_store.add_full_piece("d", "google", 0, "text d")
+    assert list(segment_store._full) == ["b", "d"]
+    assert segment_store.get_full("a", "google") is None
+    segment_store._prune_full(now=segment_store._full_touched["d"] + segment_store.FULL_TRANSCRIPT_TTL_S + 1)
+    assert segment_store._full == {}
+    assert segment_store._full_touched == {}
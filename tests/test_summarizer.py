@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from server.services import summarizer
+from server.state import app_state
+
+
+class _Resp:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Model:
+    """Fake Gemini model: `reply(parts)` returns the response text."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def generate_content(self, parts):
+        self.calls.append(parts)
+        return _Resp(self.reply(parts))
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    def install(reply):
+        model = _Model(reply)
+        monkeypatch.setattr(app_state, "gemini_model", model, raising=False)
+        monkeypatch.setattr(app_state, "gemini_model_name", "fake", raising=False)
+        monkeypatch.setattr(app_state, "enable_summarization", True, raising=False)
+        monkeypatch.setattr(summarizer, "_cache", summarizer.OrderedDict())
+        monkeypatch.setattr(summarizer, "_rolling", {})
+        return model
+
+    return install
+
+
+def test_segments_fold_into_running_summary(gemini, monkeypatch):
+    monkeypatch.setattr(summarizer, "SUMMARY_ROLLING_MIN_CHARS", 10)
+
+    def reply(parts):
+        prev = next((p["text"].split("\n", 1)[1] for p in parts if p["text"].startswith("Running summary:")), "")
+        new = parts[-1]["text"].split("\n", 1)[1]
+        return (prev + " | " + new).strip(" |")
+
+    model = gemini(reply)
+
+    async def run():
+        summarizer.observe_segment("rec", 0, {"google": "first segment text", "google_error": "x"})
+        await summarizer._rolling["rec"]["google"].task
+        summarizer.observe_segment("rec", 1, {"google": "second segment text"})
+        await summarizer._rolling["rec"]["google"].task
+        summarizer.observe_segment("rec", 2, {"google": "tail"})
+        return await summarizer.final_parts("rec", "google", "unused", "Summarize.")
+
+    parts = asyncio.run(run())
+    state = summarizer._rolling["rec"]["google"]
+    assert state.summary == "first segment text | second segment text"
+    assert len(model.calls) == 2
+    assert "google_error" not in summarizer._rolling["rec"]
+    # Stop merges only the unfolded delta
+    assert parts[1]["text"].endswith(state.summary)
+    assert parts[2]["text"] == "Latest transcript:\ntail"
+
+
+def test_short_text_is_not_condensed(gemini):
+    model = gemini(lambda parts: "never")
+    assert asyncio.run(summarizer.condense("short text", budget_tokens=100)) == "short text"
+    assert model.calls == []
+
+
+LONG = " ".join(f"Sentence number {i} is here." for i in range(2000))
+
+
+def test_condense_maps_chunks_then_reduces(gemini):
+    def reply(parts):
+        return "m" if parts[0]["text"] == summarizer.MAP_PROMPT else "r"
+
+    model = gemini(reply)
+    out = asyncio.run(summarizer.condense(LONG, budget_tokens=2))
+    prompts = [c[0]["text"] for c in model.calls]
+    assert len(summarizer.chunk_text(LONG)) > 1
+    assert prompts.count(summarizer.MAP_PROMPT) == len(summarizer.chunk_text(LONG))
+    assert prompts.count(summarizer.REDUCE_PROMPT) == 1
+    assert out == "r"
+
+
+def test_condense_retry_reuses_finished_chunks(gemini):
+    failed = []
+
+    def reply(parts):
+        if "number 1500 " in parts[1]["text"] and not failed:
+            failed.append(True)
+            raise RuntimeError("boom")
+        return "s"
+
+    model = gemini(reply)
+    with pytest.raises(RuntimeError):
+        asyncio.run(summarizer.condense(LONG, budget_tokens=100))
+    first = len(model.calls)
+    assert first == len(summarizer.chunk_text(LONG))
+    asyncio.run(summarizer.condense(LONG, budget_tokens=100))
+    # Only the failed chunk is summarized again
+    assert len(model.calls) - first == 1
+
+
+def test_near_identical_transcripts_share_a_summary(gemini):
+    model = gemini(lambda parts: "summary of " + parts[1]["text"][:5])
+    text = " ".join(f"word{i}" for i in range(50))
+    rec = {"startTs": "r1", "stopTs": 1, "fullAppend": {"google": text, "vertex": text + " extra", "gemini": "something else entirely"}}
+    out = asyncio.run(summarizer.summarize_record(rec, ["google", "vertex", "gemini"]))
+    assert out["google"] == out["vertex"]
+    assert out["gemini"] != out["google"]
+    assert len(model.calls) == 2
+
+
+def test_stream_summary_yields_deltas_then_done(gemini, monkeypatch):
+    gemini(lambda parts: "unused")
+
+    async def fake_stream(parts):
+        for d in ("Hello ", "world"):
+            yield d
+
+    monkeypatch.setattr(summarizer, "stream_generate", fake_stream)
+    rec = {"startTs": "r2", "stopTs": 1, "fullAppend": {"vertex": "some transcript"}}
+
+    async def run():
+        return [ev async for ev in summarizer.stream_summary(rec, ["google", "vertex"])]
+
+    events = asyncio.run(run())
+    assert [e["type"] for e in events] == ["delta", "delta", "done"]
+    assert events[-1] == {"type": "done", "key": "vertex", "summary_text": "Hello world"}
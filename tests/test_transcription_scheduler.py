@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+import pytest
+
+from server.services import transcription
+from server.services.transcription import (
+    PRIORITY_BATCH,
+    PRIORITY_LIVE,
+    DeadlineExceeded,
+    TranscriptionScheduler,
+    set_job_class,
+)
+
+
+async def _call(sched, order, name, priority, session, hold=0.01):
+    set_job_class(priority, session)
+    async with sched.slot():
+        order.append(name)
+        await asyncio.sleep(hold)
+
+
+async def _queue_behind(sched, calls):
+    """Run calls while one slot is already taken, so they all queue before dispatch."""
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        async with sched.slot():
+            await gate.wait()
+
+    first = asyncio.ensure_future(blocker())
+    await asyncio.sleep(0)
+    tasks = [asyncio.ensure_future(_call(sched, order, *c)) for c in calls]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *tasks)
+    return order
+
+
+def test_live_is_served_before_batch():
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+    order = asyncio.run(_queue_behind(sched, [
+        ("batch", PRIORITY_BATCH, "yt"),
+        ("live", PRIORITY_LIVE, "ws"),
+    ]))
+    assert order == ["live", "batch"]
+
+
+def test_sessions_share_a_class_fairly():
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+    calls = [(f"a{i}", PRIORITY_BATCH, "a") for i in range(3)] + [(f"b{i}", PRIORITY_BATCH, "b") for i in range(3)]
+    order = asyncio.run(_queue_behind(sched, calls))
+    assert order[:4] in (["a0", "b0", "a1", "b1"], ["b0", "a0", "b1", "a1"])
+
+
+def test_stats_with_queued_calls():
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def hold():
+            async with sched.slot():
+                await gate.wait()
+
+        tasks = [asyncio.ensure_future(hold()) for _ in range(3)]
+        await asyncio.sleep(0)
+        stats = sched.stats()
+        gate.set()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = asyncio.run(run())["classes"]["interactive"]
+    assert stats["running"] == 1
+    assert stats["queued"] == 2
+
+
+def test_queued_call_past_deadline_is_dropped():
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with sched.slot():
+                await gate.wait()
+
+        first = asyncio.ensure_future(blocker())
+        await asyncio.sleep(0)
+        transcription._deadline.set(asyncio.get_running_loop().time() + 0.05)
+        with pytest.raises(DeadlineExceeded):
+            async with sched.slot():
+                pass
+        gate.set()
+        await first
+
+    asyncio.run(run())
+    assert sched.stats()["classes"]["interactive"]["dropped_expired"] == 1
+
+
+def test_running_call_cancelled_at_deadline():
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+
+    async def run():
+        transcription._deadline.set(asyncio.get_running_loop().time() + 0.05)
+        with pytest.raises(DeadlineExceeded):
+            async with sched.slot():
+                await asyncio.sleep(1)
+
+    asyncio.run(run())
+    stats = sched.stats()["classes"]["interactive"]
+    assert stats["cancelled_at_deadline"] == 1
+    assert stats["running"] == 0
+
+
+def test_abandoned_thread_keeps_its_slot(monkeypatch):
+    sched = TranscriptionScheduler(slots=1, live_reserved=0)
+    monkeypatch.setattr(transcription, "scheduler", sched)
+    release = threading.Event()
+
+    async def run():
+        transcription._deadline.set(asyncio.get_running_loop().time() + 0.05)
+        with pytest.raises(DeadlineExceeded):
+            async with sched.slot():
+                await transcription.run_blocking(release.wait, 5)
+        during = sched.stats()["classes"]["interactive"]
+        release.set()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if sched.stats()["classes"]["interactive"]["running"] == 0:
+                break
+        return during, sched.stats()["classes"]["interactive"]
+
+    during, after = asyncio.run(run())
+    assert during["running"] == 1
+    assert during["abandoned_running"] == 1
+    assert after["running"] == 0
+    assert after["abandoned_running"] == 0
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from server.services import translator
+from server.state import app_state
+
+
+class _Resp:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Model:
+    """Fake Gemini model: `reply(parts)` returns the response text."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def generate_content(self, parts):
+        self.calls.append(parts)
+        return _Resp(self.reply(parts))
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    def install(reply):
+        model = _Model(reply)
+        monkeypatch.setattr(app_state, "gemini_model", model, raising=False)
+        monkeypatch.setattr(app_state, "gemini_model_name", "fake", raising=False)
+        monkeypatch.setattr(app_state, "translation_prompt", "Translate.", raising=False)
+        monkeypatch.setattr(app_state, "translation_lang", "fr", raising=False)
+        monkeypatch.setattr(translator, "_cache", translator.OrderedDict())
+        monkeypatch.setattr(translator, "_queue", None)
+        monkeypatch.setattr(translator, "_worker", None)
+        monkeypatch.setattr(translator, "_slots", None)
+        return model
+
+    return install
+
+
+def test_batch_splits_on_markers_in_any_order(gemini):
+    gemini(lambda parts: "noise\n<<<1>>>\nB!\n<<<0>>>\nA!\n")
+    assert translator._translate_batch(["a", "b", "c"], "Translate.", "fr") == ["A!", "B!", None]
+
+
+def test_dropped_marker_falls_back_to_single_call(gemini):
+    def reply(parts):
+        body = parts[1]["text"]
+        if "<<<" in body:
+            return "<<<0>>>\nONE\n"
+        return body.upper()
+
+    model = gemini(reply)
+
+    async def run():
+        return await asyncio.gather(translator.translate("one"), translator.translate("two"))
+
+    assert asyncio.run(run()) == ["ONE", "TWO"]
+    assert len(model.calls) == 2
+
+
+def test_cache_key_uses_settings_at_queue_time(gemini):
+    gemini(lambda parts: parts[1]["text"] + "!")
+
+    async def run():
+        task = asyncio.ensure_future(translator.translate("hello"))
+        await asyncio.sleep(0)
+        app_state.translation_lang = "de"
+        return await task
+
+    assert asyncio.run(run()) == "hello!"
+    assert translator.cache_key("hello", ("Translate.", "fr")) in translator._cache
+    assert translator.cache_key("hello", ("Translate.", "de")) not in translator._cache
+
+
+def test_hung_call_times_out_without_blocking_other_batches(gemini, monkeypatch):
+    release = threading.Event()
+
+    def reply(parts):
+        if parts[1]["text"] == "stuck":
+            release.wait(5)
+        return "ok"
+
+    gemini(reply)
+    monkeypatch.setattr(translator, "TRANSLATION_TIMEOUT_S", 0.2)
+    monkeypatch.setattr(translator, "TRANSLATION_BATCH_WINDOW_MS", 10)
+
+    async def run():
+        stuck = asyncio.ensure_future(translator.translate("stuck"))
+        await asyncio.sleep(0.05)
+        other = await asyncio.wait_for(translator.translate("fine"), timeout=1.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await stuck
+        release.set()
+        return other
+
+    try:
+        assert asyncio.run(run()) == "ok"
+    finally:
+        release.set()
@@ -0,0 +1,45 @@
+import asyncio
+
+from server import youtube_jobs
+
+
+def _job(finished_at=None):
+    return {"status": "done" if finished_at else "running", "finished_at": finished_at}
+
+
+def test_prune_drops_finished_jobs_past_ttl(monkeypatch):
+    monkeypatch.setattr(youtube_jobs, "_jobs", {
+        "old": _job(finished_at=100.0),
+        "recent": _job(finished_at=1000.0),
+        "running": _job(),
+    })
+    monkeypatch.setattr(youtube_jobs, "YT_JOB_TTL_S", 500)
+    youtube_jobs._prune(now=1100.0)
+    assert set(youtube_jobs._jobs) == {"recent", "running"}
+
+
+def test_prune_caps_finished_jobs_oldest_first(monkeypatch):
+    monkeypatch.setattr(youtube_jobs, "_jobs", {f"j{i}": _job(finished_at=float(i)) for i in range(5)})
+    monkeypatch.setattr(youtube_jobs, "YT_JOB_KEEP_MAX", 2)
+    youtube_jobs._prune(now=10.0)
+    assert set(youtube_jobs._jobs) == {"j3", "j4"}
+
+
+def test_key_lock_dropped_when_unused(monkeypatch):
+    async def fake_run_cached(job_id, key, url, duration_ms):
+        assert key in youtube_jobs._key_locks
+
+    monkeypatch.setattr(youtube_jobs, "_jobs", {"j": {"url": "u"}})
+    monkeypatch.setattr(youtube_jobs, "_probe", lambda url: {"id": "vid", "duration": 1})
+    monkeypatch.setattr(youtube_jobs, "cache_key_for", lambda url, vid=None: "key")
+    monkeypatch.setattr(youtube_jobs, "_run_cached", fake_run_cached)
+    monkeypatch.setattr(youtube_jobs.youtube_cache, "pin", lambda key: None)
+    monkeypatch.setattr(youtube_jobs.youtube_cache, "unpin", lambda key: None)
+    monkeypatch.setattr(youtube_jobs.youtube_cache, "evict", lambda: None)
+
+    async def run():
+        await youtube_jobs._run_job("j")
+
+    asyncio.run(run())
+    assert "key" not in youtube_jobs._key_locks
+    assert "key" not in youtube_jobs._key_users
@@ -0,0 +1,168 @@
+"""
+utils/aws_batch_standin.py
+
+In-process stand-ins for the S3 and Transcribe batch clients used by
+server/services/aws_transcribe.py, for tests and offline development. They
+implement only the calls the batch path makes, with the same request and
+response shapes as boto3:
+
+- S3: put_object, create/upload_part/complete/abort multipart upload,
+  get_object, delete_object; completed multipart objects are the parts joined
+  in PartNumber order;
+- Transcribe: start_transcription_job, list_transcription_jobs (JobNameContains
+  filter, MaxResults/NextToken paging, newest first), get_transcription_job,
+  delete_transcription_job.
+
+Jobs stay IN_PROGRESS until the test calls `complete(name, text)` (writes the
+output JSON to OutputKey in the S3 stand-in) or `fail(name, reason)`.
+
+Use:
+    s3, tc = install()   # registers both as aws_transcribe's cached clients
+"""
+import io
+import itertools
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StandinError(Exception):
+    """Raised where boto3 would raise a ClientError (missing key or job)."""
+
+
+class StandinS3:
+    def __init__(self) -> None:
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.aborted: List[str] = []
+        self.calls: List[str] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **_: Any) -> Dict[str, Any]:
+        self.calls.append("put_object")
+        with self._lock:
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {"ETag": '"put"'}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{next(self._ids)}"
+        with self._lock:
+            self.uploads[upload_id] = {"bucket": Bucket, "key": Key, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes, **_: Any) -> Dict[str, Any]:
+        self.calls.append("upload_part")
+        with self._lock:
+            upload = self.uploads.get(UploadId)
+            if upload is None:
+                raise StandinError(f"NoSuchUpload: {UploadId}")
+            etag = f'"part-{PartNumber}"'
+            upload["parts"][int(PartNumber)] = (etag, bytes(Body))
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict[str, Any], **_: Any) -> Dict[str, Any]:
+        self.calls.append("complete_multipart_upload")
+        with self._lock:
+            upload = self.uploads.pop(UploadId, None)
+            if upload is None:
+                raise StandinError(f"NoSuchUpload: {UploadId}")
+            body = b""
+            for part in MultipartUpload.get("Parts") or []:
+                etag, data = upload["parts"][int(part["PartNumber"])]
+                if etag != part["ETag"]:
+                    raise StandinError(f"InvalidPart: {part['PartNumber']}")
+                body += data
+            self.objects[(Bucket, Key)] = body
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **_: Any) -> Dict[str, Any]:
+        self.calls.append("abort_multipart_upload")
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+            self.aborted.append(UploadId)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise StandinError(f"NoSuchKey: {Key}")
+        return {"Body": io.BytesIO(data)}
+
+    def delete_object(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+
+class StandinTranscribe:
+    def __init__(self, s3: StandinS3) -> None:
+        self.s3 = s3
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.list_calls = 0
+        self.deleted: List[str] = []
+        self._lock = threading.Lock()
+
+    def start_transcription_job(self, TranscriptionJobName: str, Media: Dict[str, str],
+                                OutputBucketName: str = "", OutputKey: str = "", **kwargs: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.jobs[TranscriptionJobName] = {
+                "TranscriptionJobName": TranscriptionJobName,
+                "TranscriptionJobStatus": "IN_PROGRESS",
+                "Media": Media,
+                "OutputBucketName": OutputBucketName,
+                "OutputKey": OutputKey,
+                **kwargs,
+            }
+        return {"TranscriptionJob": dict(self.jobs[TranscriptionJobName])}
+
+    def complete(self, name: str, text: str) -> None:
+        """Finish a job: write its transcript JSON to the output key, then report COMPLETED."""
+        job = self.jobs[name]
+        body = json.dumps({"jobName": name, "results": {"transcripts": [{"transcript": text}]}}).encode("utf-8")
+        self.s3.put_object(Bucket=job["OutputBucketName"], Key=job["OutputKey"], Body=body)
+        job["TranscriptionJobStatus"] = "COMPLETED"
+
+    def fail(self, name: str, reason: str) -> None:
+        job = self.jobs[name]
+        job["TranscriptionJobStatus"] = "FAILED"
+        job["FailureReason"] = reason
+
+    def list_transcription_jobs(self, JobNameContains: str = "", MaxResults: int = 100,
+                                NextToken: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.list_calls += 1
+            names = [n for n in reversed(list(self.jobs)) if JobNameContains in n]
+            start = int(NextToken or 0)
+            page = names[start:start + int(MaxResults)]
+            summaries = [{k: v for k, v in self.jobs[n].items() if k in ("TranscriptionJobName", "TranscriptionJobStatus", "FailureReason")}
+                         for n in page]
+        resp: Dict[str, Any] = {"TranscriptionJobSummaries": summaries}
+        if start + len(page) < len(names):
+            resp["NextToken"] = str(start + len(page))
+        return resp
+
+    def get_transcription_job(self, TranscriptionJobName: str, **_: Any) -> Dict[str, Any]:
+        job = self.jobs.get(TranscriptionJobName)
+        if job is None:
+            raise StandinError(f"NotFoundException: {TranscriptionJobName}")
+        return {"TranscriptionJob": dict(job)}
+
+    def delete_transcription_job(self, TranscriptionJobName: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.jobs.pop(TranscriptionJobName, None)
+            self.deleted.append(TranscriptionJobName)
+        return {}
+
+
+def install() -> Tuple[StandinS3, StandinTranscribe]:
+    """Register fresh stand-ins as aws_transcribe's cached "s3" and "transcribe" clients."""
+    from server.services import aws_transcribe
+
+    s3 = StandinS3()
+    tc = StandinTranscribe(s3)
+    aws_transcribe._clients["s3"] = s3
+    aws_transcribe._clients["transcribe"] = tc
+    return s3, tc
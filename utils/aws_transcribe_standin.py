@@ -0,0 +1,128 @@
+"""
+utils/aws_transcribe_standin.py
+
+Local stand-in for the AWS Transcribe streaming WebSocket endpoint, for tests
+and offline development. It speaks the same event-stream framing as AWS:
+
+- accepts /stream-transcription-websocket with a SigV4 query (signature is
+  required but not verified);
+- treats each run of non-silent PCM followed by >= 500 ms of silence as one
+  utterance and returns a final TranscriptEvent "utterance <n>" with its
+  StartTime/EndTime in stream seconds;
+- closes with a BadRequestException after 15 s without audio, like AWS.
+
+Run:
+    python -m utils.aws_transcribe_standin --port 8765
+    AWS_TRANSCRIBE_STREAM_ENDPOINT=ws://127.0.0.1:8765 python main.py
+"""
+import argparse
+import asyncio
+import json
+import struct
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+from server.services.aws_transcribe import decode_event, encode_event
+
+SILENCE_THRESHOLD = 500
+UTTERANCE_GAP_MS = 500
+IDLE_TIMEOUT_S = 15.0
+
+
+def _is_silent(frame: bytes) -> bool:
+    n = len(frame) // 2
+    if n == 0:
+        return True
+    samples = struct.unpack(f"<{n}h", frame[:n * 2])
+    return max(abs(s) for s in samples) < SILENCE_THRESHOLD
+
+
+def _transcript_event(start_ms: int, end_ms: int, text: str, partial: bool = False) -> bytes:
+    payload = {"Transcript": {"Results": [{
+        "ResultId": f"r{start_ms}",
+        "StartTime": start_ms / 1000.0,
+        "EndTime": end_ms / 1000.0,
+        "IsPartial": partial,
+        "Alternatives": [{"Transcript": text}],
+    }]}}
+    return encode_event({
+        ":content-type": "application/json",
+        ":event-type": "TranscriptEvent",
+        ":message-type": "event",
+    }, json.dumps(payload).encode("utf-8"))
+
+
+def _exception_event(kind: str, message: str) -> bytes:
+    return encode_event({
+        ":content-type": "application/json",
+        ":exception-type": kind,
+        ":message-type": "exception",
+    }, json.dumps({"Message": message}).encode("utf-8"))
+
+
+async def handler(ws, path: Optional[str] = None) -> None:
+    path = path or getattr(getattr(ws, "request", None), "path", None) or getattr(ws, "path", "")
+    parsed = urlparse(path)
+    query = parse_qs(parsed.query)
+    if parsed.path != "/stream-transcription-websocket" or "X-Amz-Signature" not in query:
+        await ws.send(_exception_event("BadRequestException", "missing or invalid signature"))
+        await ws.close()
+        return
+    rate = int((query.get("sample-rate") or ["16000"])[0])
+    bytes_per_ms = rate * 2 / 1000.0
+
+    offset_ms = 0
+    speech_start: Optional[int] = None
+    speech_end = 0
+    count = 0
+    while True:
+        try:
+            message = await asyncio.wait_for(ws.recv(), timeout=IDLE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            await ws.send(_exception_event("BadRequestException", "no new audio was received for 15 seconds"))
+            break
+        except Exception:
+            break
+        try:
+            headers, payload = decode_event(message)
+        except Exception:
+            await ws.send(_exception_event("BadRequestException", "could not decode event"))
+            break
+        if headers.get(":event-type") != "AudioEvent":
+            continue
+        if not payload:
+            if speech_start is not None:
+                count += 1
+                await ws.send(_transcript_event(speech_start, speech_end, f"utterance {count}"))
+            break
+        dur_ms = int(len(payload) / bytes_per_ms)
+        if not _is_silent(payload):
+            if speech_start is None:
+                speech_start = offset_ms
+            speech_end = offset_ms + dur_ms
+            await ws.send(_transcript_event(speech_start, speech_end, f"utterance {count + 1}", partial=True))
+        elif speech_start is not None and offset_ms + dur_ms - speech_end >= UTTERANCE_GAP_MS:
+            count += 1
+            await ws.send(_transcript_event(speech_start, speech_end, f"utterance {count}"))
+            speech_start = None
+        offset_ms += dur_ms
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765) -> None:
+    async with websockets.serve(handler, host, port, max_size=None):
+        print(f"AWS Transcribe stand-in listening on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local AWS Transcribe streaming stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
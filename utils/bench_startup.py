@@ -0,0 +1,81 @@
+"""
+utils/bench_startup.py
+
+Startup benchmark: imports a module (default `app`) in a fresh interpreter
+with `-X importtime` and reports
+
+- total wall time of the import,
+- the slowest modules by cumulative import time (self + children),
+- the same grouped by top-level package (e.g. `google`, `grpc`, `fasthtml`).
+
+Run from the project root:
+    python -m utils.bench_startup
+    python -m utils.bench_startup --module server.state --top 30
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# "import time:       123 |       4567 |   google.cloud.speech"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) per line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        depth = (len(m.group(3)) - 1) // 2
+        rows.append((m.group(4).strip(), int(m.group(1)), int(m.group(2)), depth))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package (cumulative would double count)."""
+    out: Dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        top = name.split(".", 1)[0]
+        out[top] = out.get(top, 0) + self_us
+    return out
+
+
+def run(module: str) -> Tuple[float, str, int]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True,
+    )
+    return time.perf_counter() - t0, proc.stderr, proc.returncode
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import time per module")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    wall, stderr, code = run(args.module)
+    rows = parse_importtime(stderr)
+    if code != 0:
+        errors = [l for l in stderr.splitlines() if not l.startswith("import time:")]
+        print(f"import {args.module} failed (exit {code}):")
+        print("\n".join(errors[-10:]))
+
+    print(f"import {args.module}: {wall * 1000:.0f} ms wall, {len(rows)} modules")
+    print(f"\nTop {args.top} modules by cumulative import time:")
+    for name, _, cum_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cum_us / 1000:9.1f} ms  {'  ' * min(depth, 6)}{name}")
+    print(f"\nTop {args.top} packages by self time:")
+    for name, us in sorted(by_package(rows).items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()